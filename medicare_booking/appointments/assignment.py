@@ -0,0 +1,45 @@
+import heapq
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from doctor_associations.models import Doctor_Hospital
+from .models import DoctorDailyLoad
+
+def available_doctors(hospital_id, appointment_date):
+    """
+    Accepted, available doctors at the hospital annotated with `load`, their number
+    of active appointments on the given date, least loaded first.
+    Loads come from DoctorDailyLoad (one indexed lookup per doctor) instead of
+    counting the day's appointments.
+    """
+    load = DoctorDailyLoad.objects.filter(
+        doctor_instance=OuterRef('pk'),
+        appointment_date=appointment_date
+    ).values('active_count')[:1]
+
+    return Doctor_Hospital.objects.filter(
+        hospital_id=hospital_id,
+        is_accepted=True,
+        is_available=True
+    ).annotate(
+        load=Coalesce(Subquery(load), 0)
+    ).order_by('load', 'pk')
+
+def pick_doctor(hospital_id, appointment_date):
+    """Returns the least loaded available doctor at the hospital, or None if there is none."""
+    return available_doctors(hospital_id, appointment_date).first()
+
+def spread_across_doctors(doctors, count):
+    """
+    Assigns `count` new appointments one at a time to whichever doctor currently has
+    the lowest load, using each doctor's `load` annotation as the starting point.
+    :return: A list of `count` doctors, one per appointment in order.
+    """
+    heap = [(doctor.load, index, doctor) for index, doctor in enumerate(doctors)]
+    heapq.heapify(heap)
+
+    assigned = []
+    for _ in range(count):
+        load, index, doctor = heapq.heappop(heap)
+        assigned.append(doctor)
+        heapq.heappush(heap, (load + 1, index, doctor))
+    return assigned
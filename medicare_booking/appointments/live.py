@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from doctor_associations.models import Doctor_Hospital
+from medicare_booking.pubsub import get_broker
+from .models import Appoints
+
+# Paths served by queue_stream_app (see medicare_booking/asgi.py)
+LIVE_PATH_PREFIX = '/api/v1/live/'
+LIVE_PATH = re.compile(r'^/api/v1/live/(?P<kind>doctor|hospital)/(?P<key>[^/]+)/$')
+
+# Seconds between keep-alive comments, so proxies don't close idle streams
+HEARTBEAT_INTERVAL = 15
+
+BOOKED = 'booked'
+STATUS_CHANGED = 'status_changed'
+TOKEN_CALLED = 'token_called'
+REMOVED = 'removed'
+
+def doctor_topic(doctor_instance_id):
+    return f"doctor_instance:{doctor_instance_id}"
+
+def hospital_topic(hospital_id):
+    return f"hospital:{hospital_id}"
+
+def hospital_of(appointment):
+    """Hospital id of the appointment's doctor, None if the association no longer exists."""
+    if Appoints.doctor_instance.is_cached(appointment):
+        return appointment.doctor_instance.hospital_id
+    return Doctor_Hospital.objects.filter(pk=appointment.doctor_instance_id).values_list('hospital_id', flat=True).first()
+
+def publish_queue_event(appointment, event, hospital_id=None):
+    """
+    Sends a queue delta for the appointment to its doctor's and hospital's streams once
+    the current transaction commits (immediately outside a transaction).
+    """
+    if hospital_id is None:
+        hospital_id = hospital_of(appointment)
+    message = {
+        'event': event,
+        'appointment_id': appointment.appointment_id,
+        'doctor_instance': appointment.doctor_instance_id,
+        'hospital': hospital_id,
+        'patient_contact': appointment.patient_contact_id,
+        'appointment_date': appointment.appointment_date,
+        'token_no': appointment.token_no,
+        'token_seq': appointment.token_seq,
+        'urgency_score': appointment.urgency_score,
+        'appointment_status': appointment.appointment_status,
+    }
+
+    def send():
+        broker = get_broker()
+        broker.publish(doctor_topic(appointment.doctor_instance_id), message)
+        if hospital_id is not None:
+            broker.publish(hospital_topic(hospital_id), message)
+
+    transaction.on_commit(send)
+
+def format_event(message):
+    data = json.dumps(message, cls=DjangoJSONEncoder)
+    return f"event: {message['event']}\ndata: {data}\n\n".encode()
+
+async def queue_stream_app(scope, receive, send):
+    """
+    ASGI app streaming queue deltas as Server-Sent Events:
+        /api/v1/live/doctor/<doctor_instance_id>/
+        /api/v1/live/hospital/<hospital_id>/
+    Requires an ASGI server (e.g. uvicorn/daphne serving medicare_booking.asgi).
+    """
+    match = LIVE_PATH.match(scope['path'])
+    if scope['method'] != 'GET' or not match:
+        await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Not Found'})
+        return
+
+    if match['kind'] == 'doctor':
+        topic = doctor_topic(match['key'])
+    else:
+        topic = hospital_topic(match['key'])
+
+    subscription = get_broker().subscribe(topic)
+    disconnected = next_message = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'access-control-allow-origin', b'*'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+        disconnected = asyncio.ensure_future(receive())
+        while True:
+            if next_message is None:
+                next_message = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({next_message, disconnected}, timeout=HEARTBEAT_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                if disconnected.result()['type'] == 'http.disconnect':
+                    break
+                # The (empty) request body, keep listening for the disconnect
+                disconnected = asyncio.ensure_future(receive())
+                continue
+            if next_message in done:
+                body = format_event(next_message.result())
+                next_message = None
+            else:
+                body = b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        for task in (disconnected, next_message):
+            if task is not None:
+                task.cancel()
+        subscription.close()
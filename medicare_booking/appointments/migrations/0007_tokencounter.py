@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_appoints_appointment_status'),
+        ('doctor_associations', '0003_doctor_hospital_is_accepted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_date', models.DateField()),
+                ('prefix', models.CharField(max_length=5)),
+                ('last_value', models.IntegerField(default=0)),
+                ('doctor_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='doctor_associations.doctor_hospital')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor_instance', 'appointment_date', 'prefix'), name='unique_token_counter')],
+            },
+        ),
+    ]
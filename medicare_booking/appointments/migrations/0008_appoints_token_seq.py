@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+def backfill_token_seq(apps, schema_editor):
+    Appoints = apps.get_model('appointments', 'Appoints')
+    batch = []
+    for appointment in Appoints.objects.only('appointment_id', 'token_no').iterator():
+        digits = ''.join(ch for ch in appointment.token_no if ch.isdigit())
+        appointment.token_seq = int(digits) if digits else 0
+        batch.append(appointment)
+        if len(batch) >= 1000:
+            Appoints.objects.bulk_update(batch, ['token_seq'])
+            batch = []
+    if batch:
+        Appoints.objects.bulk_update(batch, ['token_seq'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_tokencounter'),
+        ('doctor_associations', '0003_doctor_hospital_is_accepted'),
+        ('patients', '0003_remove_patient_password'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appoints',
+            name='token_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_token_seq, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appoints',
+            index=models.Index(fields=['doctor_instance', 'appointment_date', '-urgency_score', 'token_seq'], name='appoints_queue_idx'),
+        ),
+    ]
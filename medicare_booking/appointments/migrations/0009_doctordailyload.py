@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_load(apps, schema_editor):
+    Appoints = apps.get_model('appointments', 'Appoints')
+    DoctorDailyLoad = apps.get_model('appointments', 'DoctorDailyLoad')
+    rows = Appoints.objects.exclude(appointment_status='Cancelled').values(
+        'doctor_instance_id', 'appointment_date'
+    ).annotate(active_count=Count('pk')).order_by()
+    DoctorDailyLoad.objects.bulk_create(
+        (DoctorDailyLoad(**row) for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_appoints_token_seq'),
+        ('doctor_associations', '0003_doctor_hospital_is_accepted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDailyLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_date', models.DateField()),
+                ('active_count', models.IntegerField(default=0)),
+                ('doctor_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='doctor_associations.doctor_hospital')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor_instance', 'appointment_date'), name='unique_doctor_daily_load')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_load, migrations.RunPython.noop),
+    ]
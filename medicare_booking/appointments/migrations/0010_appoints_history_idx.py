@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_doctordailyload'),
+        ('doctor_associations', '0003_doctor_hospital_is_accepted'),
+        ('patients', '0003_remove_patient_password'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appoints',
+            index=models.Index(fields=['-appointment_date', '-urgency_score', 'token_seq', 'appointment_id'], name='appoints_history_idx'),
+        ),
+    ]
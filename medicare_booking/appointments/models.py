@@ -1,38 +1,194 @@
 import uuid
-from django.db import models
+from collections import Counter
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Coalesce
 from patients.models import Patient
 from doctor_associations.models import Doctor_Hospital
 
+# Queue order for a doctor's day: urgent first, then by token number
+QUEUE_ORDERING = ('-urgency_score', 'token_seq')
+
+CANCELLED = 'Cancelled'
+
+def token_number(token_no):
+    """Returns the numeric part of a token like 'T12' (0 if there is none)."""
+    digits = ''.join(ch for ch in token_no or '' if ch.isdigit())
+    return int(digits) if digits else 0
+
+def load_key(state):
+    """(doctor_instance_id, appointment_date) an appointment in this queue_state adds load to, None if cancelled."""
+    if state is None or state[2] == CANCELLED:
+        return None
+    return state[:2]
+
+def token_prefix(urgency_score):
+    """Urgent patients (score above 80) get their own 'U' token series."""
+    return 'U' if urgency_score > 80 else 'T'
+
+class TokenCounter(models.Model):
+    # Last token number handed out per doctor, day and token prefix (T/U).
+    doctor_instance = models.ForeignKey(Doctor_Hospital, on_delete=models.CASCADE)
+    appointment_date = models.DateField()
+    prefix = models.CharField(max_length=5)
+    last_value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor_instance', 'appointment_date', 'prefix'], name='unique_token_counter'),
+        ]
+
+    @classmethod
+    def allocate(cls, doctor_instance, appointment_date, prefix, count=1):
+        """
+        Atomically reserves `count` token numbers and returns the first one.
+        The counter row is incremented with a single UPDATE, which holds the row lock
+        until the surrounding transaction commits, so concurrent bookings never share a token.
+        """
+        counters = cls.objects.filter(doctor_instance=doctor_instance, appointment_date=appointment_date, prefix=prefix)
+        with transaction.atomic():
+            if not counters.update(last_value=F('last_value') + count):
+                # First booking of the day for this prefix: continue after the highest token of any
+                # appointments created before the counter existed (a count would reuse one after a delete)
+                start = Appoints.objects.filter(
+                    doctor_instance=doctor_instance,
+                    appointment_date=appointment_date,
+                    token_no__startswith=prefix
+                ).aggregate(start=Coalesce(Max('token_seq'), 0))['start']
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            doctor_instance=doctor_instance,
+                            appointment_date=appointment_date,
+                            prefix=prefix,
+                            last_value=start + count
+                        )
+                    return start + 1
+                except IntegrityError:
+                    counters.update(last_value=F('last_value') + count)
+            last_value = counters.values_list('last_value', flat=True).get()
+        return last_value - count + 1
+
+class DoctorDailyLoad(models.Model):
+    # Number of non-cancelled appointments a doctor has on a day, kept up to date by appointments.signals
+    # and AppointsQuerySet.update
+    doctor_instance = models.ForeignKey(Doctor_Hospital, on_delete=models.CASCADE)
+    appointment_date = models.DateField()
+    active_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor_instance', 'appointment_date'], name='unique_doctor_daily_load'),
+        ]
+
+    @classmethod
+    def adjust(cls, doctor_instance_id, appointment_date, delta):
+        """Adds `delta` to the doctor's load for the day, creating the row on first use."""
+        loads = cls.objects.filter(doctor_instance_id=doctor_instance_id, appointment_date=appointment_date)
+        with transaction.atomic():
+            if loads.update(active_count=F('active_count') + delta):
+                return
+            # No row yet: count the day once, which already includes the change being recorded
+            count = Appoints.objects.filter(
+                doctor_instance_id=doctor_instance_id,
+                appointment_date=appointment_date
+            ).exclude(appointment_status=CANCELLED).count()
+            if not count:
+                # Nothing to record (also the case when the doctor association itself is being deleted)
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(doctor_instance_id=doctor_instance_id, appointment_date=appointment_date, active_count=count)
+            except IntegrityError:
+                loads.update(active_count=F('active_count') + delta)
+
+# Fields whose change moves an appointment to another doctor's load
+LOAD_FIELDS = ('doctor_instance', 'doctor_instance_id', 'appointment_date', 'appointment_status')
+
+class AppointsQuerySet(models.QuerySet):
+
+    def _queue_states(self):
+        """{(doctor_instance_id, appointment_date, appointment_status): rows} in one grouped query."""
+        rows = self.order_by().values_list('doctor_instance_id', 'appointment_date', 'appointment_status').annotate(rows=Count('pk'))
+        return {
+            (doctor_instance_id, appointment_date, appointment_status): count
+            for doctor_instance_id, appointment_date, appointment_status, count in rows
+        }
+
+    def update(self, **kwargs):
+        """
+        QuerySet.update() that also drops the cached queues of the rows and, when it changes
+        a load field, moves their doctor loads, as the save signals do for a single save.
+        """
+        from .queue_cache import invalidate_queue
+
+        with transaction.atomic(using=self.db):
+            rows = Appoints.objects.filter(pk__in=list(self.select_for_update().values_list('pk', flat=True)))
+            before = rows._queue_states()
+            updated = super().update(**kwargs)
+            after = rows._queue_states() if any(name in kwargs for name in LOAD_FIELDS) else before
+            loads = Counter()
+            for states, sign in ((before, -1), (after, 1)):
+                for state, count in states.items():
+                    loads[load_key(state)] += sign * count
+            for key, delta in loads.items():
+                if key is not None and delta:
+                    DoctorDailyLoad.adjust(*key, delta)
+            for doctor_instance_id, appointment_date in {state[:2] for state in before.keys() | after.keys()}:
+                invalidate_queue(doctor_instance_id, appointment_date)
+        return updated
+
 class Appoints(models.Model):
     appointment_id = models.CharField(max_length=100, primary_key=True)
     doctor_instance = models.ForeignKey(Doctor_Hospital, on_delete=models.CASCADE)
     # Using mobile no as patient_id reference since it's the PK of Patient
     patient_contact = models.ForeignKey(Patient, on_delete=models.CASCADE)
     token_no = models.CharField(max_length=50, blank=True)
+    # Numeric part of token_no, so the queue sorts T2 before T10 and can use an index
+    token_seq = models.PositiveIntegerField(default=0)
     appointment_date = models.DateField()
     urgency_score = models.IntegerField(default=1)
 
     appointment_status = models.CharField(max_length=20, default='Pending') # Pending, Consulting, Completed, Cancelled
 
+    # Bulk status changes and reschedules go through AppointsQuerySet.update, which keeps loads in step
+    objects = AppointsQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor_instance', 'appointment_date', '-urgency_score', 'token_seq'], name='appoints_queue_idx'),
+            # Matches AppointmentKeysetPagination's order for the hospital history listing
+            models.Index(fields=['-appointment_date', '-urgency_score', 'token_seq', 'appointment_id'], name='appoints_history_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.appointment_id:
              self.appointment_id = str(uuid.uuid4())
         
-        if not self.token_no:
-            prefix = 'T'
-            if self.urgency_score > 80:
-                prefix = 'U'
-            
-            # Count existing appointments with the same prefix for this doctor on this date
-            existing_count = Appoints.objects.filter(
-                doctor_instance=self.doctor_instance, 
-                appointment_date=self.appointment_date,
-                token_no__startswith=prefix
-            ).count()
-            
-            self.token_no = f"{prefix}{existing_count + 1}"
-            
-        super().save(*args, **kwargs)
+        # Token allocation and insert commit together, so a failed insert doesn't burn a token
+        with transaction.atomic():
+            if not self.token_no:
+                prefix = token_prefix(self.urgency_score)
+                number = TokenCounter.allocate(self.doctor_instance, self.appointment_date, prefix)
+                self.token_no = f"{prefix}{number}"
+                self.token_seq = number
+            elif not self.token_seq:
+                self.token_seq = token_number(self.token_no)
+                
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where this row sat in the queues, so a later save or delete can update loads, caches and streams
+        if all(name in instance.__dict__ for name in ('doctor_instance_id', 'appointment_date', 'appointment_status')):
+            instance._loaded_state = instance.queue_state()
+        return instance
+
+    def queue_state(self):
+        """(doctor_instance_id, appointment_date, appointment_status) as currently set on the instance."""
+        appointment_date = self._meta.get_field('appointment_date').to_python(self.appointment_date)
+        return (self.doctor_instance_id, appointment_date, self.appointment_status)
 
     def __str__(self):
         return f"Appt {self.appointment_id}: {self.patient_contact.name}"
@@ -0,0 +1,93 @@
+import base64
+import datetime
+import json
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class AppointmentKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination in hospital list order: newest date first, then queue order.
+    The cursor holds the sort key of the last row served, so each page is a
+    "rows after this key" range filter instead of an OFFSET that grows with history.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # (field, descending) pairs; the last one is unique so the order is total
+    keys = (
+        ('appointment_date', True),
+        ('urgency_score', True),
+        ('token_seq', False),
+        ('appointment_id', False),
+    )
+    # JSON types of the key values in a cursor (the date is an ISO string)
+    key_types = (str, int, int, str)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self):
+        return [f"-{field}" if descending else field for field, descending in self.keys]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        values = [getattr(instance, field) for field, _ in self.keys]
+        values[0] = values[0].isoformat()
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError
+            if any(type(value) is not expected for value, expected in zip(values, self.key_types)):
+                raise ValueError
+            values[0] = datetime.date.fromisoformat(values[0])
+        except ValueError:
+            # Covers bad base64, UTF-8 and JSON too
+            raise ParseError(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        """Q matching rows that sort strictly after the given key."""
+        condition = Q()
+        for index, (field, descending) in enumerate(self.keys):
+            lookup = {name: values[position] for position, (name, _) in enumerate(self.keys[:index])}
+            lookup[f"{field}__{'lt' if descending else 'gt'}"] = values[index]
+            condition |= Q(**lookup)
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.get_ordering())
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
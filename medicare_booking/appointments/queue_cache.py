@@ -0,0 +1,95 @@
+import time
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+from doctor_associations.models import Doctor_Hospital
+from .models import Appoints, QUEUE_ORDERING
+
+# Snapshots are invalidated on every appointment write; the timeout only bounds how long
+# edits to related rows (patient names, doctor details) can take to show up.
+QUEUE_CACHE_TIMEOUT = 10 * 60
+
+# Snapshots, versions and doctor lookups are dropped by whichever worker handles the write,
+# so they live in the 'shared' cache that every worker process reads. That cache is Redis or
+# process memory (see settings), so a warm read runs no database query.
+cache = ConnectionProxy(caches, 'shared')
+
+def _queue_key(doctor_instance_id, version, appointment_date):
+    return f"queue:{doctor_instance_id}:{version}:{appointment_date.isoformat()}"
+
+def _version_key(doctor_instance_id):
+    return f"queue_version:{doctor_instance_id}"
+
+def _doctor_key(doctor_id):
+    return f"doctor_instances:{doctor_id}"
+
+def _versions(doctor_instance_ids):
+    """
+    Current snapshot version per doctor association. A missing version (never set, or evicted)
+    starts a fresh one, so snapshots cached under an older version are never served.
+    """
+    keys = {_version_key(pk): pk for pk in doctor_instance_ids}
+    versions = cache.get_many(list(keys))
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return {pk: versions[key] for key, pk in keys.items()}
+
+def bump_version(doctor_instance_id):
+    """Drops every cached day of the association's queue (e.g. after its details changed)."""
+    cache.set(_version_key(doctor_instance_id), time.time_ns(), None)
+
+def invalidate_queue(doctor_instance_id, appointment_date):
+    """Drops the cached snapshot now and again at commit, so a read racing the write can't re-cache stale rows."""
+    def drop():
+        version = _versions([doctor_instance_id])[doctor_instance_id]
+        cache.delete(_queue_key(doctor_instance_id, version, appointment_date))
+    drop()
+    transaction.on_commit(drop)
+
+def invalidate_doctor(doctor_id):
+    cache.delete(_doctor_key(doctor_id))
+
+def doctor_instance_ids(doctor_id):
+    ids = cache.get(_doctor_key(doctor_id))
+    if ids is None:
+        ids = list(Doctor_Hospital.objects.filter(doctor_id=doctor_id).values_list('pk', flat=True))
+        cache.set(_doctor_key(doctor_id), ids, QUEUE_CACHE_TIMEOUT)
+    return ids
+
+def doctor_queue(doctor_id, appointment_date):
+    """
+    Serialized queue of a doctor (across all their hospitals) for one day, in queue order.
+    Served from per-(doctor_instance, date) snapshots; only missing snapshots hit the database.
+    """
+    from .serializers import AppointsSerializer
+
+    instance_ids = doctor_instance_ids(doctor_id)
+    versions = _versions(instance_ids)
+    keys = {pk: _queue_key(pk, versions[pk], appointment_date) for pk in instance_ids}
+    cached = cache.get_many(list(keys.values()))
+
+    snapshots = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in instance_ids if pk not in snapshots]
+    if missing:
+        appointments = Appoints.objects.filter(
+            doctor_instance_id__in=missing,
+            appointment_date=appointment_date
+        ).select_related(
+            'patient_contact',
+            'doctor_instance__doctor',
+            'doctor_instance__hospital',
+            'doctor_instance__specialization'
+        ).order_by(*QUEUE_ORDERING)
+        for pk in missing:
+            snapshots[pk] = []
+        for row in AppointsSerializer(appointments, many=True).data:
+            snapshots[row['doctor_instance']].append(dict(row))
+        cache.set_many({keys[pk]: snapshots[pk] for pk in missing}, QUEUE_CACHE_TIMEOUT)
+
+    if len(instance_ids) == 1:
+        return snapshots[instance_ids[0]]
+    # Doctor works at several hospitals: merge the per-association queues
+    rows = [row for pk in instance_ids for row in snapshots[pk]]
+    rows.sort(key=lambda row: (-row['urgency_score'], row['token_seq']))
+    return rows
@@ -0,0 +1,65 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from doctor_associations.models import Doctor_Hospital
+from .models import Appoints, DoctorDailyLoad, load_key
+from .live import BOOKED, REMOVED, STATUS_CHANGED, TOKEN_CALLED, publish_queue_event
+from . import queue_cache
+
+# Status a doctor moves a patient to when calling their token
+CONSULTING = 'Consulting'
+
+@receiver(pre_save, sender=Appoints)
+def remember_previous_state(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._previous_state = None
+    elif hasattr(instance, '_loaded_state'):
+        instance._previous_state = instance._loaded_state
+    else:
+        # Instance wasn't loaded from the database, read the stored row once
+        stored = Appoints.objects.filter(pk=instance.pk).first()
+        instance._previous_state = stored.queue_state() if stored else None
+
+@receiver(post_save, sender=Appoints)
+def update_load_on_save(sender, instance, **kwargs):
+    previous = load_key(getattr(instance, '_previous_state', None))
+    current = load_key(instance.queue_state())
+    if previous != current:
+        # Create, cancel, reactivation, reschedule or doctor reassignment
+        if previous:
+            DoctorDailyLoad.adjust(*previous, -1)
+        if current:
+            DoctorDailyLoad.adjust(*current, 1)
+
+@receiver(post_save, sender=Appoints)
+def invalidate_queue_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    current = instance.queue_state()
+    queue_cache.invalidate_queue(*current[:2])
+    if previous and previous[:2] != current[:2]:
+        queue_cache.invalidate_queue(*previous[:2])
+
+@receiver(post_save, sender=Appoints)
+def push_queue_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if created:
+        publish_queue_event(instance, BOOKED)
+    elif previous is None or previous[2] != instance.appointment_status:
+        publish_queue_event(instance, TOKEN_CALLED if instance.appointment_status == CONSULTING else STATUS_CHANGED)
+    # The saved values are what a later save or delete should compare against
+    instance._loaded_state = instance.queue_state()
+
+@receiver(post_delete, sender=Appoints)
+def update_queue_on_delete(sender, instance, **kwargs):
+    state = getattr(instance, '_loaded_state', None) or instance.queue_state()
+    previous = load_key(state)
+    if previous:
+        DoctorDailyLoad.adjust(*previous, -1)
+    queue_cache.invalidate_queue(*state[:2])
+    publish_queue_event(instance, REMOVED)
+
+@receiver(post_save, sender=Doctor_Hospital)
+@receiver(post_delete, sender=Doctor_Hospital)
+def invalidate_doctor_queues(sender, instance, **kwargs):
+    # Queue snapshots embed the association's details, and doctor_id lookups list its associations
+    queue_cache.bump_version(instance.pk)
+    queue_cache.invalidate_doctor(instance.doctor_id)
@@ -1,3 +1,386 @@
+import base64
+import datetime
+import json
+import time
+import uuid
+from collections import Counter
+from importlib import import_module
+from unittest import mock
+from django.apps import apps
+from django.core.cache import caches
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from medicare_booking.idempotency import IN_PROGRESS_TIMEOUT
+from doctor_associations.models import Doctor_Hospital
+from doctors.models import Doctor
+from hospitals.models import Hospital
+from patients.models import Patient
+from specializations.models import Specialization
+from .assignment import pick_doctor
+from .models import Appoints, DoctorDailyLoad, QUEUE_ORDERING
 
-# Create your tests here.
+APPOINTMENT_DATE = datetime.date(2030, 1, 15)
+
+class HospitalFixtureMixin:
+    """A hospital with `doctor_count` accepted doctors and `patient_count` patients."""
+    doctor_count = 3
+    patient_count = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = Hospital.objects.create(hospital_name='City Hospital', contact='1', working_hours='9-5', pincode=600001)
+        specialization = Specialization.objects.create(specialization_name='General')
+        cls.associations = [
+            Doctor_Hospital.objects.create(
+                doctor=Doctor.objects.create(doctor_name=f'Doctor {i}', experience=5),
+                hospital=cls.hospital,
+                specialization=specialization,
+                fees='100',
+                working_hours='9-5',
+                is_accepted=True,
+            )
+            for i in range(cls.doctor_count)
+        ]
+        cls.patients = [
+            Patient.objects.create(name=f'Patient {i}', age=30, pincode=600001, mobileno=f'9{i:09d}', gender='F')
+            for i in range(cls.patient_count)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+class TokenAllocationTests(HospitalFixtureMixin, TestCase):
+
+    def book(self, patient, **kwargs):
+        return Appoints.objects.create(doctor_instance=self.associations[0], patient_contact=patient, appointment_date=APPOINTMENT_DATE, **kwargs)
+
+    def test_tokens_follow_the_counter_per_series(self):
+        tokens = [self.book(patient, urgency_score=score).token_no for patient, score in zip(self.patients, (1, 90, 1, 1, 95))]
+        self.assertEqual(tokens, ['T1', 'U1', 'T2', 'T3', 'U2'])
+
+    def test_counter_is_seeded_past_a_deleted_appointment(self):
+        # Booked with explicit tokens before the day's counter existed
+        for i, patient in enumerate(self.patients[:3], start=1):
+            self.book(patient, token_no=f'T{i}')
+        Appoints.objects.get(token_no='T2').delete()
+
+        self.assertEqual(self.book(self.patients[3]).token_no, 'T4')
+        self.assertEqual(self.book(self.patients[4]).token_no, 'T5')
+
+    def test_queue_sorts_tokens_numerically(self):
+        for patient, token_no in zip(self.patients, ('T10', 'T2', 'T1')):
+            self.book(patient, token_no=token_no)
+        self.book(self.patients[3], token_no='U3', urgency_score=90)
+        queue = Appoints.objects.filter(doctor_instance=self.associations[0]).order_by(*QUEUE_ORDERING)
+        self.assertEqual([appointment.token_no for appointment in queue], ['U3', 'T1', 'T2', 'T10'])
+
+    def test_migration_backfills_token_seq_from_token_no(self):
+        backfill_token_seq = import_module('appointments.migrations.0008_appoints_token_seq').backfill_token_seq
+        for patient, token_no in zip(self.patients, ('T10', 'U7', 'T2', 'legacy')):
+            self.book(patient, token_no=token_no)
+        Appoints.objects.update(token_seq=0)
+
+        backfill_token_seq(apps, None)
+        self.assertEqual(
+            dict(Appoints.objects.values_list('token_no', 'token_seq')),
+            {'T10': 10, 'U7': 7, 'T2': 2, 'legacy': 0},
+        )
+
+class DoctorLoadTests(HospitalFixtureMixin, TestCase):
+
+    def book(self, association, patient, **kwargs):
+        return Appoints.objects.create(doctor_instance=association, patient_contact=patient, appointment_date=APPOINTMENT_DATE, **kwargs)
+
+    def loads(self, appointment_date=APPOINTMENT_DATE):
+        """Recorded load per association, checked against a recount."""
+        recorded = dict(DoctorDailyLoad.objects.filter(appointment_date=appointment_date).values_list('doctor_instance_id', 'active_count'))
+        counted = Counter(Appoints.objects.filter(appointment_date=appointment_date).exclude(appointment_status='Cancelled').values_list('doctor_instance_id', flat=True))
+        self.assertEqual({pk: count for pk, count in recorded.items() if count}, dict(counted))
+        return [recorded.get(association.pk, 0) for association in self.associations]
+
+    def setUp(self):
+        super().setUp()
+        self.first = [self.book(self.associations[0], patient) for patient in self.patients[:3]]
+        self.second = self.book(self.associations[1], self.patients[3])
+
+    def test_cancel_and_reactivate(self):
+        self.first[0].appointment_status = 'Cancelled'
+        self.first[0].save()
+        self.assertEqual(self.loads(), [2, 1, 0])
+        self.first[0].appointment_status = 'Pending'
+        self.first[0].save()
+        self.assertEqual(self.loads(), [3, 1, 0])
+
+    def test_reschedule_and_reassign(self):
+        later = APPOINTMENT_DATE + datetime.timedelta(days=1)
+        self.first[0].appointment_date = later
+        self.first[0].save()
+        self.first[1].doctor_instance = self.associations[2]
+        self.first[1].save()
+        self.assertEqual(self.loads(), [1, 1, 1])
+        self.assertEqual(self.loads(later), [1, 0, 0])
+
+    def test_delete(self):
+        self.first[0].delete()
+        Appoints.objects.filter(pk=self.second.pk).delete()
+        self.assertEqual(self.loads(), [2, 0, 0])
+
+    def test_queryset_updates_move_the_loads(self):
+        Appoints.objects.filter(doctor_instance=self.associations[0]).update(appointment_status='Cancelled')
+        self.assertEqual(self.loads(), [0, 1, 0])
+        Appoints.objects.filter(pk=self.first[0].pk).update(appointment_status='Pending', doctor_instance=self.associations[2])
+        self.assertEqual(self.loads(), [0, 1, 1])
+        later = APPOINTMENT_DATE + datetime.timedelta(days=1)
+        Appoints.objects.exclude(appointment_status='Cancelled').update(appointment_date=later)
+        self.assertEqual(self.loads(), [0, 0, 0])
+        self.assertEqual(self.loads(later), [0, 1, 1])
+
+    def test_least_loaded_doctor_is_picked(self):
+        self.assertEqual(pick_doctor(self.hospital.pk, APPOINTMENT_DATE), self.associations[2])
+        self.book(self.associations[2], self.patients[4])
+        self.book(self.associations[2], self.patients[0])
+        # Ties go to the lowest pk
+        self.assertEqual(pick_doctor(self.hospital.pk, APPOINTMENT_DATE), self.associations[1])
+        Appoints.objects.filter(doctor_instance=self.associations[0]).update(appointment_status='Cancelled')
+        self.assertEqual(pick_doctor(self.hospital.pk, APPOINTMENT_DATE), self.associations[0])
+
+class LiveQueueEventTests(HospitalFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('appointments.live.get_broker')
+        self.broker = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def book(self):
+        return Appoints.objects.create(doctor_instance=self.associations[0], patient_contact=self.patients[0], appointment_date=APPOINTMENT_DATE)
+
+    def published(self):
+        return [(topic, message['event'], message['appointment_id']) for (topic, message), _ in self.broker.publish.call_args_list]
+
+    def test_events_are_published_once_the_write_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.book()
+            self.assertEqual(self.published(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_status = 'Consulting'
+            appointment.save()
+        self.assertEqual(self.published(), [
+            (f'doctor_instance:{self.associations[0].pk}', 'booked', appointment.pk),
+            (f'hospital:{self.hospital.pk}', 'booked', appointment.pk),
+            (f'doctor_instance:{self.associations[0].pk}', 'token_called', appointment.pk),
+            (f'hospital:{self.hospital.pk}', 'token_called', appointment.pk),
+        ])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.book()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.published(), [])
+        self.assertFalse(Appoints.objects.exists())
+
+class BookHospitalIdempotencyTests(HospitalFixtureMixin, TestCase):
+    url = '/api/v1/appointments/book-hospital/'
+
+    def book(self, key, patient=None):
+        body = {
+            'hospital_id': self.hospital.pk,
+            'patient_mobile': (patient or self.patients[0]).pk,
+            'appointment_date': APPOINTMENT_DATE.isoformat(),
+        }
+        return self.client.post(self.url, body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response_without_booking_again(self):
+        key = str(uuid.uuid4())
+        first = self.book(key)
+        self.assertEqual(first.status_code, 201)
+
+        with self.assertNumQueries(0):
+            retry = self.book(key)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Appoints.objects.count(), 1)
+
+    def test_key_reused_with_a_different_body_is_rejected(self):
+        key = str(uuid.uuid4())
+        self.assertEqual(self.book(key).status_code, 201)
+        self.assertEqual(self.book(key, self.patients[1]).status_code, 422)
+        self.assertEqual(Appoints.objects.count(), 1)
+
+    def test_failed_request_can_be_retried_with_the_same_key(self):
+        key = str(uuid.uuid4())
+        Doctor_Hospital.objects.filter(hospital=self.hospital).update(is_available=False)
+        self.assertEqual(self.book(key).status_code, 400)
+
+        Doctor_Hospital.objects.filter(hospital=self.hospital).update(is_available=True)
+        self.assertEqual(self.book(key).status_code, 201)
+
+    def test_key_of_a_request_that_died_midway_is_released_after_a_timeout(self):
+        key = str(uuid.uuid4())
+        # SystemExit isn't an Exception, so like a killed worker it skips the cleanup
+        with mock.patch('appointments.views.pick_doctor', side_effect=SystemExit), self.assertRaises(SystemExit):
+            self.book(key)
+        self.assertEqual(self.book(key).status_code, 409)
+
+        with mock.patch('time.time', return_value=time.time() + IN_PROGRESS_TIMEOUT + 1):
+            self.assertEqual(self.book(key).status_code, 201)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        body = {'hospital_id': self.hospital.pk, 'patient_mobile': self.patients[0].pk, 'appointment_date': APPOINTMENT_DATE.isoformat()}
+        self.client.post(self.url, body, format='json')
+        self.client.post(self.url, body, format='json')
+        self.assertEqual(Appoints.objects.count(), 2)
+
+class BulkBookingTests(HospitalFixtureMixin, TestCase):
+    url = '/api/v1/appointments/book-hospital/bulk/'
+    patient_count = 60
+
+    def book(self, patients, urgency_score=1):
+        return self.client.post(self.url, {
+            'hospital_id': self.hospital.pk,
+            'appointment_date': APPOINTMENT_DATE.isoformat(),
+            'patients': [{'patient_mobile': patient.pk, 'urgency_score': urgency_score} for patient in patients],
+        }, format='json')
+
+    def test_books_every_patient_with_distinct_tokens_spread_over_doctors(self):
+        response = self.book(self.patients[:30])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 30)
+
+        appointments = Appoints.objects.filter(appointment_date=APPOINTMENT_DATE)
+        tokens = list(appointments.values_list('doctor_instance_id', 'token_no'))
+        self.assertEqual(len(tokens), 30)
+        self.assertEqual(len(set(tokens)), 30)
+        per_doctor = {association.pk: appointments.filter(doctor_instance=association).count() for association in self.associations}
+        self.assertEqual(sorted(per_doctor.values()), [10, 10, 10])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # The first booking of the day creates the counters and load rows
+        self.assertEqual(self.book(self.patients[:3]).status_code, 201)
+
+        with CaptureQueriesContext(connection) as small_batch:
+            self.assertEqual(self.book(self.patients[3:9]).status_code, 201)
+        with CaptureQueriesContext(connection) as large_batch:
+            self.assertEqual(self.book(self.patients[9:60]).status_code, 201)
+        self.assertEqual(len(large_batch), len(small_batch))
+
+    def test_unknown_patients_book_nobody(self):
+        response = self.client.post(self.url, {
+            'hospital_id': self.hospital.pk,
+            'appointment_date': APPOINTMENT_DATE.isoformat(),
+            'patients': [{'patient_mobile': self.patients[0].pk}, {'patient_mobile': '0000000000'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['patient_mobiles'], ['0000000000'])
+        self.assertFalse(Appoints.objects.exists())
+
+class HospitalAppointmentListTests(HospitalFixtureMixin, TestCase):
+    patient_count = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i, patient in enumerate(cls.patients):
+            Appoints.objects.create(
+                doctor_instance=cls.associations[i % cls.doctor_count],
+                patient_contact=patient,
+                appointment_date=APPOINTMENT_DATE - datetime.timedelta(days=i % 3),
+                urgency_score=90 if i % 4 == 0 else 1,
+            )
+
+    def url(self):
+        return f'/api/v1/appointments/hospital-list/{self.hospital.pk}/'
+
+    def test_cursor_pages_cover_every_appointment_once_in_order(self):
+        seen = []
+        response = self.client.get(self.url(), {'page_size': 5})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['appointment_id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        expected = list(Appoints.objects.order_by(
+            '-appointment_date', '-urgency_score', 'token_seq', 'appointment_id'
+        ).values_list('appointment_id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_is_one_query_whatever_its_size(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url(), {'page_size': 3})
+        with self.assertNumQueries(1):
+            self.client.get(self.url(), {'page_size': 12})
+
+    def test_malformed_cursors_are_rejected(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        cursors = [
+            'not base64!',
+            encode({'a': 1}),
+            encode('2030-01-15'),
+            encode(['2030-01-15', 1, 2]),
+            encode(['2030-01-15', '1', 2, 'x']),
+            encode(['not a date', 1, 2, 'x']),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url(), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+class DoctorQueueSnapshotTests(HospitalFixtureMixin, TestCase):
+    url = '/api/v1/appointments/'
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        self.doctor = self.associations[0].doctor
+        for i, patient in enumerate(self.patients):
+            Appoints.objects.create(doctor_instance=self.associations[0], patient_contact=patient, appointment_date=APPOINTMENT_DATE, urgency_score=90 if i == 3 else 1)
+
+    def queue(self):
+        response = self.client.get(self.url, {'doctor_id': self.doctor.pk, 'appointment_date': APPOINTMENT_DATE.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        return [row['appointment_id'] for row in response.data]
+
+    def expected(self):
+        return list(Appoints.objects.filter(
+            doctor_instance__doctor=self.doctor, appointment_date=APPOINTMENT_DATE
+        ).order_by('-urgency_score', 'token_seq').values_list('appointment_id', flat=True))
+
+    def test_repeat_reads_are_served_from_the_snapshot(self):
+        first = self.queue()
+        self.assertEqual(first, self.expected())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.queue(), first)
+
+    def test_writes_invalidate_the_snapshot(self):
+        self.queue()
+        Appoints.objects.create(doctor_instance=self.associations[0], patient_contact=self.patients[0], appointment_date=APPOINTMENT_DATE, urgency_score=95)
+        self.assertEqual(self.queue(), self.expected())
+
+        Appoints.objects.filter(doctor_instance=self.associations[0]).first().delete()
+        self.assertEqual(self.queue(), self.expected())
+
+        Appoints.objects.filter(doctor_instance=self.associations[0], urgency_score=1).update(urgency_score=99)
+        self.assertEqual(self.queue(), self.expected())
+
+    def test_queues_of_every_hospital_are_merged(self):
+        other = Hospital.objects.create(hospital_name='Other Hospital', contact='1', working_hours='9-5', pincode=600002)
+        association = Doctor_Hospital.objects.create(
+            doctor=self.doctor, hospital=other, specialization=self.associations[0].specialization,
+            fees='100', working_hours='9-5', is_accepted=True,
+        )
+        Appoints.objects.create(doctor_instance=association, patient_contact=self.patients[1], appointment_date=APPOINTMENT_DATE, urgency_score=50)
+        expected = self.expected()
+        self.assertEqual(self.queue(), expected)
+        # Warm read of both hospitals' snapshots
+        with self.assertNumQueries(0):
+            self.assertEqual(self.queue(), expected)
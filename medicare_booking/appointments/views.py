@@ -1,6 +1,7 @@
 from rest_framework import viewsets
-from .models import Appoints
+from .models import Appoints, QUEUE_ORDERING
 from .serializers import AppointsSerializer
+from .queue_cache import doctor_queue, invalidate_queue
 
 class AppointsViewSet(viewsets.ModelViewSet):
     queryset = Appoints.objects.all()
@@ -31,19 +32,40 @@ class AppointsViewSet(viewsets.ModelViewSet):
             
         # Sorting
         # Primary: Urgency Score (Desc)
-        # Secondary: Token No (Asc) - Note: String sorting might be imperfect for T1 vs T10 but acceptable for now
-        queryset = queryset.order_by('-urgency_score', 'token_no')
+        # Secondary: numeric token sequence (Asc), so T2 comes before T10
+        queryset = queryset.order_by(*QUEUE_ORDERING)
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Doctor Dashboard: a doctor's queue for one day is served from the snapshot cache
+        params = request.query_params
+        doctor_id = params.get('doctor_id')
+        appointment_date = params.get('appointment_date')
+        if doctor_id and appointment_date and not (params.get('patient_mobile') or params.get('hospital_id')):
+            try:
+                appointment_date = datetime.date.fromisoformat(appointment_date)
+            except ValueError:
+                pass
+            else:
+                return Response(doctor_queue(doctor_id, appointment_date))
+        return super().list(request, *args, **kwargs)
+
 from rest_framework import status, views
 from rest_framework.response import Response
-from django.db.models import Count, Q
-from doctor_associations.models import Doctor_Hospital
+from django.db import transaction
 from patients.models import Patient
+from medicare_booking.idempotency import idempotent
+from .assignment import available_doctors, pick_doctor, spread_across_doctors
+from .models import DoctorDailyLoad, TokenCounter, token_prefix
+from .pagination import AppointmentKeysetPagination
+from .live import BOOKED, publish_queue_event
+from collections import Counter
 import datetime
+import uuid
 
 class BookHospitalAppointmentView(views.APIView):
+    @idempotent('book-hospital')
     def post(self, request):
         hospital_id = request.data.get('hospital_id')
         patient_mobile = request.data.get('patient_mobile')
@@ -58,48 +80,142 @@ class BookHospitalAppointmentView(views.APIView):
         except Patient.DoesNotExist:
             return Response({'error': 'Patient not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Find doctors in this hospital who are accepted and available
-        doctors = Doctor_Hospital.objects.filter(
-            hospital__hospital_id=hospital_id, 
-            is_accepted=True, 
-            is_available=True
-        )
+        # Doctor selection, token allocation and the insert succeed or fail together
+        with transaction.atomic():
+            # Load Balancing: pick the accepted, available doctor with the fewest appointments on that date
+            selected_doctor = pick_doctor(hospital_id, appointment_date)
 
-        if not doctors.exists():
-            return Response({'error': 'No available doctors in this hospital'}, status=status.HTTP_400_BAD_REQUEST)
+            if selected_doctor is None:
+                return Response({'error': 'No available doctors in this hospital'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Load Balancing: Find doctor with minimum appointments on that date
-        # We annotate each doctor with the count of appointments for the given date
-        # Note: We need to filter appointments by date first. 
-        # Since we can't easily filter inside Count in simple Django without conditional expressions (which is fine),
-        # an alternative is to iterate if list is small, or use Count with filter.
-        
-        # Using annotation with filtering is cleaner:
-        doctors = doctors.annotate(
-            appt_count=Count('appoints', filter=Q(appoints__appointment_date=appointment_date))
-        ).order_by('appt_count')
-
-        # Pick the one with least appointments
-        selected_doctor = doctors.first()
-
-        # Create Appointment
-        appointment = Appoints.objects.create(
-            doctor_instance=selected_doctor,
-            patient_contact=patient,
-            appointment_date=appointment_date,
-            urgency_score=urgency_score,
-            appointment_status='Pending'
-        )
+            # Create Appointment
+            appointment = Appoints.objects.create(
+                doctor_instance=selected_doctor,
+                patient_contact=patient,
+                appointment_date=appointment_date,
+                urgency_score=urgency_score,
+                appointment_status='Pending'
+            )
 
         serializer = AppointsSerializer(appointment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+class BulkBookHospitalAppointmentView(views.APIView):
+    """
+    Books a batch of patients (e.g. a screening camp) at one hospital for one date.
+    Expects: {"hospital_id": ..., "appointment_date": "YYYY-MM-DD",
+              "patients": [{"patient_mobile": ..., "urgency_score": 1}, ...]}
+    """
+    MAX_BATCH_SIZE = 1000
+
+    @idempotent('book-hospital-bulk')
+    def post(self, request):
+        hospital_id = request.data.get('hospital_id')
+        appointment_date = request.data.get('appointment_date')
+        entries = request.data.get('patients')
+
+        if not all([hospital_id, appointment_date, entries]) or not isinstance(entries, list):
+            return Response({'error': 'Missing required fields'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > self.MAX_BATCH_SIZE:
+            return Response({'error': f'At most {self.MAX_BATCH_SIZE} patients per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            appointment_date = datetime.date.fromisoformat(str(appointment_date))
+            bookings = [(str(entry['patient_mobile']), int(entry.get('urgency_score', 1))) for entry in entries]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return Response({'error': 'Invalid appointment_date or patients entry'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Resolve every patient in one query
+        patients = Patient.objects.in_bulk({mobile for mobile, _ in bookings})
+        missing = sorted({mobile for mobile, _ in bookings if mobile not in patients})
+        if missing:
+            return Response({'error': 'Patients not found', 'patient_mobiles': missing}, status=status.HTTP_404_NOT_FOUND)
+
+        with transaction.atomic():
+            doctors = list(available_doctors(hospital_id, appointment_date).select_related('doctor'))
+            if not doctors:
+                return Response({'error': 'No available doctors in this hospital'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Spread the batch over the doctors in memory, starting from their current loads
+            assigned = spread_across_doctors(doctors, len(bookings))
+
+            # Reserve one token range per (doctor, prefix) instead of one counter update per patient
+            needed = Counter((doctor.pk, token_prefix(urgency)) for doctor, (_, urgency) in zip(assigned, bookings))
+            next_number = {}
+            doctors_by_pk = {doctor.pk: doctor for doctor in doctors}
+            for (doctor_pk, prefix), count in needed.items():
+                next_number[(doctor_pk, prefix)] = TokenCounter.allocate(doctors_by_pk[doctor_pk], appointment_date, prefix, count)
+
+            appointments = []
+            for doctor, (mobile, urgency) in zip(assigned, bookings):
+                prefix = token_prefix(urgency)
+                number = next_number[(doctor.pk, prefix)]
+                next_number[(doctor.pk, prefix)] = number + 1
+                appointments.append(Appoints(
+                    appointment_id=str(uuid.uuid4()),
+                    doctor_instance=doctor,
+                    patient_contact=patients[mobile],
+                    appointment_date=appointment_date,
+                    urgency_score=urgency,
+                    token_no=f"{prefix}{number}",
+                    token_seq=number,
+                    appointment_status='Pending'
+                ))
+            Appoints.objects.bulk_create(appointments, batch_size=500)
+
+            # bulk_create skips the save signals, so update loads, queue snapshots and streams here
+            for doctor_pk, count in Counter(doctor.pk for doctor in assigned).items():
+                DoctorDailyLoad.adjust(doctor_pk, appointment_date, count)
+                invalidate_queue(doctor_pk, appointment_date)
+            for appointment in appointments:
+                publish_queue_event(appointment, BOOKED, hospital_id=appointment.doctor_instance.hospital_id)
+
+        return Response({
+            'count': len(appointments),
+            'results': [{
+                'appointment_id': appointment.appointment_id,
+                'patient_mobile': appointment.patient_contact_id,
+                'doctor_instance': appointment.doctor_instance_id,
+                'doctor_name': appointment.doctor_instance.doctor.doctor_name,
+                'token_no': appointment.token_no,
+                'appointment_date': appointment_date,
+                'urgency_score': appointment.urgency_score,
+            } for appointment in appointments]
+        }, status=status.HTTP_201_CREATED)
+
 class HospitalAppointmentListView(views.APIView):
+    """
+    Appointments of a hospital, newest date first, one keyset page at a time.
+    Optional filters: date_from / date_to (YYYY-MM-DD, inclusive) and appointment_status.
+    """
+    pagination_class = AppointmentKeysetPagination
+
     def get(self, request, hospital_id):
-        # List all appointments for a given hospital
+        # Joined in the same query, so the nested patient/doctor details cost no extra queries per row
         appointments = Appoints.objects.filter(
-            doctor_instance__hospital__hospital_id=hospital_id
-        ).order_by('-appointment_date', 'token_no')
-        
-        serializer = AppointsSerializer(appointments, many=True)
-        return Response(serializer.data)
+            doctor_instance__hospital_id=hospital_id
+        ).select_related(
+            'patient_contact',
+            'doctor_instance__doctor',
+            'doctor_instance__hospital',
+            'doctor_instance__specialization'
+        )
+
+        try:
+            date_from = request.query_params.get('date_from')
+            if date_from:
+                appointments = appointments.filter(appointment_date__gte=datetime.date.fromisoformat(date_from))
+            date_to = request.query_params.get('date_to')
+            if date_to:
+                appointments = appointments.filter(appointment_date__lte=datetime.date.fromisoformat(date_to))
+        except ValueError:
+            return Response({'error': 'Dates must be in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        appointment_status = request.query_params.get('appointment_status')
+        if appointment_status:
+            appointments = appointments.filter(appointment_status=appointment_status)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(appointments, request, view=self)
+        serializer = AppointsSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,79 @@
+import os
+import time
+import datetime
+import django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicare_booking.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.test import RequestFactory
+from pharmacies.models import Pharmacy
+from medicines.models import Medicine
+from manufacturers.models import Manufacturer
+from pharmacy_stock.models import Pharmacy_Medicine
+from pharmacy_stock.serializers import PharmacyMedicineSerializer
+from pharmacy_stock.views import PharmacyStockViewSet
+
+ROWS = 10000
+
+class Rollback(Exception):
+    pass
+
+def timed(label, build):
+    queries = []
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        data = build()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed * 1000:>9.1f} ms {len(queries):>7} queries")
+    return data
+
+def benchmark():
+    print(f"--- Pharmacy stock list, {ROWS} rows ---")
+    # Everything is created inside a transaction that is rolled back at the end
+    try:
+        with transaction.atomic():
+            pharmacies = [
+                Pharmacy.objects.create(pharmacy_name=f"Bench Pharmacy {i}", pincode=600000 + i, contact="0")
+                for i in range(10)
+            ]
+            medicines = Medicine.objects.bulk_create([
+                Medicine(medicine_id=f"BENCHMED{i}", medicine_name=f"Bench Medicine {i}", description="", dosage_form="Tablet")
+                for i in range(500)
+            ])
+            manufacturer = Manufacturer.objects.create(manufacturer_name="Bench Labs")
+            Pharmacy_Medicine.objects.bulk_create([
+                Pharmacy_Medicine(
+                    medicine_instance_id=f"BENCHPHME{i}",
+                    pharmacy=pharmacies[i % len(pharmacies)],
+                    medicine=medicines[i % len(medicines)],
+                    manufacturer=manufacturer,
+                    price=10 + i % 50,
+                    stock_quantity=i % 100,
+                    expiry_date=datetime.date(2030, 1, 1),
+                ) for i in range(ROWS)
+            ], batch_size=1000)
+            stock = Pharmacy_Medicine.objects.filter(medicine_instance_id__startswith="BENCHPHME")
+
+            before = timed("Serializer, no select_related (before)",
+                           lambda: PharmacyMedicineSerializer(stock, many=True).data)
+            timed("Serializer with select_related",
+                  lambda: PharmacyMedicineSerializer(stock.select_related('pharmacy', 'medicine', 'manufacturer'), many=True).data)
+            after = timed("values() fast path (after)",
+                          lambda: PharmacyMedicineSerializer.list_data(stock))
+            print(f"Same output: {[dict(row) for row in before] == after}")
+
+            view = PharmacyStockViewSet.as_view({'get': 'list'})
+            request = RequestFactory().get('/api/v1/pharmacy-stock/')
+            response = timed("GET /api/v1/pharmacy-stock/ (whole table)", lambda: view(request))
+            print(f"Response rows: {len(response.data)}")
+            raise Rollback
+    except Rollback:
+        pass
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from django.db.models import Count
+from hospitals.models import Hospital
+from medicare_booking.services import DISTRICT_SPAN, nearest_by_pincode
+from .models import Doctor_Hospital
+
+def bookable_associations(pincode=None):
+    """Accepted, available doctor associations, limited to the pincode's region if given."""
+    associations = Doctor_Hospital.objects.filter(is_accepted=True, is_available=True)
+    if pincode is not None:
+        region_start = pincode // DISTRICT_SPAN * DISTRICT_SPAN
+        associations = associations.filter(hospital__pincode__gte=region_start, hospital__pincode__lt=region_start + DISTRICT_SPAN)
+    return associations
+
+def facet_counts(associations, specialization_id=None, district=None):
+    """
+    Bookable doctors per specialization and per district, from one query grouped by both.
+    Each facet applies the other facet's filter but not its own, so the counts show what
+    picking a different specialization (or district) would return.
+    """
+    rows = associations.values(
+        'specialization_id', 'specialization__specialization_name', 'hospital__district'
+    ).annotate(doctors=Count('pk')).order_by()
+
+    specializations = defaultdict(int)
+    names = {}
+    districts = defaultdict(int)
+    for row in rows:
+        if district is None or row['hospital__district'] == district:
+            specializations[row['specialization_id']] += row['doctors']
+            names[row['specialization_id']] = row['specialization__specialization_name']
+        if specialization_id is None or row['specialization_id'] == specialization_id:
+            districts[row['hospital__district']] += row['doctors']
+    return {
+        'specializations': sorted(
+            ({'specialization_id': pk, 'specialization_name': names[pk], 'doctors': count} for pk, count in specializations.items()),
+            key=lambda facet: (-facet['doctors'], facet['specialization_name'])
+        ),
+        'districts': sorted(
+            ({'district': name, 'doctors': count} for name, count in districts.items()),
+            key=lambda facet: (-facet['doctors'], facet['district'] or '')
+        ),
+    }
+
+def find_doctors(pincode=None, specialization_id=None, district=None, limit=20):
+    """
+    Hospitals with a bookable doctor matching the filters, nearest pincode first, each with
+    its matching doctors, plus facet counts. Three queries in total.
+    """
+    region = bookable_associations(pincode)
+    associations = region
+    if specialization_id is not None:
+        associations = associations.filter(specialization_id=specialization_id)
+    if district is not None:
+        associations = associations.filter(hospital__district=district)
+
+    hospitals = Hospital.objects.filter(pk__in=associations.values('hospital_id'))
+    if pincode is not None:
+        hospitals = nearest_by_pincode(hospitals, pincode, limit)
+    else:
+        hospitals = list(hospitals.order_by('hospital_name', 'pk')[:limit])
+
+    doctors = defaultdict(list)
+    matching = associations.filter(hospital_id__in=[hospital.pk for hospital in hospitals]).select_related('doctor', 'specialization')
+    for association in matching.order_by('doctor__doctor_name', 'pk'):
+        doctors[association.hospital_id].append({
+            'doctor_instance_id': association.doctor_instance_id,
+            'doctor_id': association.doctor_id,
+            'doctor_name': association.doctor.doctor_name,
+            'specialization_id': association.specialization_id,
+            'specialization_name': association.specialization.specialization_name,
+            'fees': association.fees,
+            'working_hours': association.working_hours,
+        })
+
+    return {
+        'results': [{
+            'hospital_id': hospital.hospital_id,
+            'hospital_name': hospital.hospital_name,
+            'street': hospital.street,
+            'district': hospital.district,
+            'state': hospital.state,
+            'pincode': hospital.pincode,
+            'contact': hospital.contact,
+            'working_hours': hospital.working_hours,
+            'doctors': doctors[hospital.pk],
+        } for hospital in hospitals],
+        'facets': facet_counts(region, specialization_id, district),
+    }
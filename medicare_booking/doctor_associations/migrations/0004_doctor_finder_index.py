@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctor_associations', '0003_doctor_hospital_is_accepted'),
+        ('doctors', '0003_alter_doctor_doctor_id'),
+        ('hospitals', '0008_hospital_geohash'),
+        ('specializations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor_hospital',
+            index=models.Index(fields=['specialization', 'is_accepted', 'is_available'], name='doctor_finder_idx'),
+        ),
+    ]
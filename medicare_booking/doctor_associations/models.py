@@ -2,7 +2,7 @@ from django.db import models
 from doctors.models import Doctor
 from hospitals.models import Hospital
 from specializations.models import Specialization
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
 
 class Doctor_Hospital(models.Model):
     doctor_instance_id = models.CharField(max_length=100, primary_key=True, blank=True)
@@ -14,9 +14,15 @@ class Doctor_Hospital(models.Model):
     is_accepted = models.BooleanField(default=False)
     working_hours = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            # Doctor finder: bookable doctors of a specialization
+            models.Index(fields=['specialization', 'is_accepted', 'is_available'], name='doctor_finder_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.doctor_instance_id:
-            self.doctor_instance_id = generate_custom_id(Doctor_Hospital, 'doctor_instance_id', 'DH')
+            return save_with_custom_id(self, 'doctor_instance_id', 'DH', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
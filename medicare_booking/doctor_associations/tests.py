@@ -1,3 +1,110 @@
+from collections import Counter
+from itertools import product
 from django.test import TestCase
+from doctors.models import Doctor
+from hospitals.models import Hospital
+from specializations.models import Specialization
+from .models import Doctor_Hospital
 
-# Create your tests here.
+class DoctorFinderTests(TestCase):
+    url = '/api/v1/associations/finder/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.specializations = [Specialization.objects.create(specialization_name=name) for name in ('Cardiology', 'Dermatology', 'Neurology')]
+        cls.hospitals = [
+            Hospital.objects.create(hospital_name=name, district=district, contact='1', working_hours='9-5', pincode=pincode)
+            for name, district, pincode in (
+                ('Central', 'Chennai', 600001),
+                ('Anna Nagar', 'Chennai', 600040),
+                ('Tambaram', 'Chengalpattu', 600045),
+                ('Coimbatore General', 'Coimbatore', 641001),
+            )
+        ]
+        cls.associations = []
+        for i, (hospital, specialization) in enumerate(product(cls.hospitals, cls.specializations)):
+            for j in range(1 + i % 3):
+                cls.associations.append(Doctor_Hospital.objects.create(
+                    doctor=Doctor.objects.create(doctor_name=f'Doctor {i}.{j}', experience=5),
+                    hospital=hospital,
+                    specialization=specialization,
+                    fees='100',
+                    working_hours='9-5',
+                    # Some doctors haven't accepted or are unavailable, so they don't count
+                    is_accepted=j != 1,
+                    is_available=i % 4 != 0,
+                ))
+
+    def bookable(self, pincode=None):
+        return [
+            association for association in self.associations
+            if association.is_accepted and association.is_available
+            and (pincode is None or association.hospital.pincode // 1000 == pincode // 1000)
+        ]
+
+    def expected_facets(self, pincode=None, specialization_id=None, district=None):
+        bookable = self.bookable(pincode)
+        specializations = Counter(
+            association.specialization for association in bookable
+            if district is None or association.hospital.district == district
+        )
+        districts = Counter(
+            association.hospital.district for association in bookable
+            if specialization_id is None or association.specialization_id == specialization_id
+        )
+        return {
+            'specializations': [
+                {'specialization_id': specialization.pk, 'specialization_name': specialization.specialization_name, 'doctors': count}
+                for specialization, count in sorted(specializations.items(), key=lambda item: (-item[1], item[0].specialization_name))
+            ],
+            'districts': [
+                {'district': name, 'doctors': count}
+                for name, count in sorted(districts.items(), key=lambda item: (-item[1], item[0]))
+            ],
+        }
+
+    def find(self, **params):
+        response = self.client.get(self.url, {name: value for name, value in params.items() if value is not None})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_facets_match_brute_force_counts(self):
+        for pincode, specialization, district in product(
+            (None, 600001, 641001), (None, *self.specializations), (None, 'Chennai', 'Coimbatore', 'Nowhere')
+        ):
+            specialization_id = specialization.pk if specialization else None
+            with self.subTest(pincode=pincode, specialization_id=specialization_id, district=district):
+                data = self.find(pincode=pincode, specialization_id=specialization_id, district=district)
+                self.assertEqual(data['facets'], self.expected_facets(pincode, specialization_id, district))
+
+    def test_each_facet_ignores_its_own_filter(self):
+        cardiology = self.specializations[0]
+        facets = self.find(specialization_id=cardiology.pk, district='Chennai')['facets']
+        # Every specialization bookable in Chennai, and every district with a bookable cardiologist
+        self.assertEqual(facets['specializations'], self.expected_facets(district='Chennai')['specializations'])
+        self.assertEqual(facets['districts'], self.expected_facets(specialization_id=cardiology.pk)['districts'])
+        self.assertGreater(len(facets['specializations']), 1)
+        self.assertGreater(len(facets['districts']), 1)
+
+    def test_results_are_nearest_first_with_matching_doctors(self):
+        cardiology = self.specializations[0]
+        with self.assertNumQueries(3):
+            data = self.find(pincode=600044, specialization_id=cardiology.pk)
+        expected = [
+            hospital for hospital in sorted(self.hospitals[:3], key=lambda hospital: (abs(hospital.pincode - 600044), hospital.pk))
+            if any(association.hospital_id == hospital.pk and association.specialization_id == cardiology.pk for association in self.bookable())
+        ]
+        self.assertEqual([row['hospital_id'] for row in data['results']], [hospital.pk for hospital in expected])
+        for row in data['results']:
+            self.assertEqual(
+                sorted(doctor['doctor_instance_id'] for doctor in row['doctors']),
+                sorted(
+                    association.pk for association in self.bookable()
+                    if association.hospital_id == row['hospital_id'] and association.specialization_id == cardiology.pk
+                ),
+            )
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'pincode': 'x'}, {'specialization_id': 'cardio'}, {'limit': 0}, {'limit': 'all'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
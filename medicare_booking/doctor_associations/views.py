@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Doctor_Hospital
 from .serializers import DoctorHospitalSerializer
+from .finder import find_doctors
 from doctors.models import Doctor
 from hospitals.models import Hospital
 from specializations.models import Specialization
@@ -31,6 +32,25 @@ class DoctorHospitalViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def finder(self, request):
+        """
+        Hospitals with an accepted, available doctor, nearest first, with facet counts.
+        Optional filters: specialization_id, pincode (same pincode region, i.e. first three
+        digits), district. ?limit= caps the hospitals (default 20, at most 50).
+        """
+        params = request.query_params
+        try:
+            pincode = int(params['pincode']) if params.get('pincode') else None
+            specialization_id = int(params['specialization_id']) if params.get('specialization_id') else None
+            limit = min(int(params.get('limit', 20)), 50)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'pincode, specialization_id and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(find_doctors(pincode, specialization_id, params.get('district') or None, limit))
+
     @action(detail=False, methods=['post'])
     def invite_doctor(self, request):
         hospital_id = request.data.get('hospital_id')
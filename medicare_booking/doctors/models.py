@@ -1,5 +1,5 @@
 from django.db import models
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
 
 class Doctor(models.Model):
     doctor_id = models.CharField(max_length=50, primary_key=True, blank=True)
@@ -9,7 +9,7 @@ class Doctor(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.doctor_id:
-            self.doctor_id = generate_custom_id(Doctor, 'doctor_id', 'DOC')
+            return save_with_custom_id(self, 'doctor_id', 'DOC', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from medicare_booking.authentication import forget_credentials
+from .models import Doctor
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def forget_doctor_credentials(sender, instance, **kwargs):
+    # A changed password or a deleted doctor rejects the tokens issued before
+    forget_credentials('doctor', instance.pk)
@@ -1,3 +1,91 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+import time
+from unittest import mock
+from medicare_booking.authentication import credential_cache, principal_cache
+from .models import Doctor
 
-# Create your tests here.
+class DoctorTokenAuthenticationTests(TestCase):
+    me_url = '/api/v1/login/me/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = Doctor.objects.create(doctor_name='Dr Rao', experience=5, password='secret')
+
+    def setUp(self):
+        self.client = APIClient()
+        principal_cache.clear()
+        credential_cache.clear()
+
+    def login(self, password='secret', doctor_id=None):
+        return self.client.post('/api/v1/login/doctor/', {'doctor_id': doctor_id or self.doctor.pk, 'password': password}, format='json')
+
+    def me(self, token):
+        return self.client.get(self.me_url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_token_identifies_the_doctor(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], settings.AUTH_TOKEN_MAX_AGE)
+
+        me = self.me(response.data['token'])
+        self.assertEqual(me.status_code, 200)
+        self.assertEqual((me.data['role'], me.data['id'], me.data['name']), ('doctor', self.doctor.pk, 'Dr Rao'))
+
+    def test_bad_credentials(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login(doctor_id='DOC999').status_code, 404)
+
+    def test_missing_forged_and_malformed_tokens_are_rejected(self):
+        token = self.login().data['token']
+        self.assertEqual(self.client.get(self.me_url).status_code, 401)
+        self.assertEqual(self.me(token[:-2] + 'xx').data['detail'], 'Invalid token.')
+        self.assertEqual(self.client.get(self.me_url, HTTP_AUTHORIZATION=f'Bearer {token} extra').status_code, 401)
+
+    def test_expired_token_is_rejected(self):
+        token = self.login().data['token']
+        with override_settings(AUTH_TOKEN_MAX_AGE=0):
+            response = self.me(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'Token has expired.')
+
+    def test_password_change_revokes_earlier_tokens(self):
+        token = self.login().data['token']
+        self.assertEqual(self.me(token).status_code, 200)
+
+        self.doctor.password = 'changed'
+        self.doctor.save()
+        response = self.me(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'Token has been revoked.')
+        self.assertEqual(self.me(self.login('changed').data['token']).status_code, 200)
+
+    def test_saving_other_fields_keeps_tokens_valid(self):
+        token = self.login().data['token']
+        self.doctor.experience = 6
+        self.doctor.save()
+        self.assertEqual(self.me(token).status_code, 200)
+
+    def test_deleting_the_doctor_revokes_its_tokens(self):
+        token = self.login().data['token']
+        Doctor.objects.filter(pk=self.doctor.pk).delete()
+        self.assertEqual(self.me(token).status_code, 401)
+
+    def test_authenticating_a_recent_token_reads_no_rows(self):
+        token = self.login().data['token']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me(token).status_code, 200)
+        principal_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me(token).status_code, 200)
+
+    def test_password_change_elsewhere_is_noticed_after_the_ttl(self):
+        token = self.login().data['token']
+        # A queryset update sends no signals, like a save made by another worker process
+        Doctor.objects.filter(pk=self.doctor.pk).update(password='changed')
+        self.assertEqual(self.me(token).status_code, 200)
+
+        later = time.monotonic() + settings.AUTH_CREDENTIAL_CACHE_TTL + 1
+        with mock.patch('time.monotonic', return_value=later), self.assertNumQueries(1):
+            self.assertEqual(self.me(token).data['detail'], 'Token has been revoked.')
@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import PincodeCentroid
+
+@admin.register(PincodeCentroid)
+class PincodeCentroidAdmin(admin.ModelAdmin):
+    list_display = ('pincode', 'district', 'state', 'latitude', 'longitude')
+    search_fields = ('pincode', 'district', 'state')
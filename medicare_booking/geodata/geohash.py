@@ -0,0 +1,83 @@
+# Minimal geohash encoding (https://en.wikipedia.org/wiki/Geohash) used by the spatial index.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE_MAP = {char: index for index, char in enumerate(BASE32)}
+
+def encode(latitude, longitude, precision=7):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # even bits encode longitude
+    while len(chars) < precision:
+        if even:
+            value, interval = longitude, lon_range
+        else:
+            value, interval = latitude, lat_range
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits = bits << 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+def bounds(geohash):
+    """Returns (min_lat, min_lon, max_lat, max_lon) of the geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if (value >> shift) & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def decode(geohash):
+    """Returns the (latitude, longitude) centre of the geohash cell."""
+    min_lat, min_lon, max_lat, max_lon = bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+def cell_size(precision):
+    """Returns (lat_degrees, lon_degrees) spanned by a cell of the given precision."""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+def ring(geohash, distance):
+    """
+    Geohashes of the cells exactly `distance` steps away from `geohash` (a square ring;
+    distance 0 is the cell itself). Cells past the poles are skipped.
+    """
+    precision = len(geohash)
+    latitude, longitude = decode(geohash)
+    lat_step, lon_step = cell_size(precision)
+    if distance == 0:
+        return [geohash]
+
+    cells = []
+    for i in range(-distance, distance + 1):
+        for j in range(-distance, distance + 1):
+            if max(abs(i), abs(j)) != distance:
+                continue
+            lat = latitude + i * lat_step
+            if not -90 < lat < 90:
+                continue
+            lon = (longitude + j * lon_step + 180) % 360 - 180
+            cells.append(encode(lat, lon, precision))
+    return cells
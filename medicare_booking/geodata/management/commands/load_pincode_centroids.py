@@ -0,0 +1,77 @@
+import csv
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from geodata import geohash
+from geodata.models import PincodeCentroid
+from geodata.spatial_index import STORED_PRECISION, index_for
+from hospitals.models import Hospital
+from medicare_booking.table_versions import bump_table_version
+from pharmacies.models import Pharmacy
+
+DEFAULT_CSV = Path(__file__).resolve().parent.parent.parent / 'data' / 'pincode_centroids.csv'
+
+class Command(BaseCommand):
+    help = (
+        "Loads pincode centroids from a CSV with columns pincode, latitude, longitude "
+        "and optionally district, state. Existing pincodes are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', nargs='?', default=str(DEFAULT_CSV), help="Defaults to the bundled sample in geodata/data/.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = Path(options['csv_path'])
+        if not path.exists():
+            raise CommandError(f"CSV not found: {path}")
+
+        rows = []
+        with path.open(newline='', encoding='utf-8') as f:
+            for line, record in enumerate(csv.DictReader(f), start=2):
+                try:
+                    rows.append(PincodeCentroid(
+                        pincode=int(record['pincode']),
+                        latitude=float(record['latitude']),
+                        longitude=float(record['longitude']),
+                        district=(record.get('district') or '').strip(),
+                        state=(record.get('state') or '').strip(),
+                    ))
+                except (KeyError, TypeError, ValueError):
+                    raise CommandError(f"Invalid row at line {line}: {record}")
+
+        PincodeCentroid.objects.bulk_create(
+            rows,
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['pincode'],
+            update_fields=['latitude', 'longitude', 'district', 'state'],
+        )
+        refreshed = self.refresh_geohashes({row.pincode: row for row in rows}, options['batch_size'])
+        # Nearby results depend on the centroids
+        bump_table_version(PincodeCentroid)
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {len(rows)} pincode centroids from {path}, updated {refreshed} hospital/pharmacy geohashes"
+        ))
+
+    def refresh_geohashes(self, centroids, batch_size):
+        """Recomputes the geohash of hospitals and pharmacies located in the loaded pincodes."""
+        refreshed = 0
+        for model_class in (Hospital, Pharmacy):
+            rows = []
+            for row in model_class.objects.only('pk', 'pincode', 'geohash').iterator():
+                centroid = centroids.get(row.pincode)
+                if centroid is None:
+                    continue
+                code = geohash.encode(centroid.latitude, centroid.longitude, STORED_PRECISION)
+                if code != row.geohash:
+                    row.geohash = code
+                    rows.append(row)
+            model_class.objects.bulk_update(rows, ['geohash'], batch_size=batch_size)
+            # bulk_update skips signals: the bump makes other processes rebuild their spatial
+            # index, and this one (which skips rebuilds for its own bumps) drops its copy
+            if rows:
+                bump_table_version(model_class)
+                transaction.on_commit(index_for(model_class).clear)
+            refreshed += len(rows)
+        return refreshed
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PincodeCentroid',
+            fields=[
+                ('pincode', models.IntegerField(primary_key=True, serialize=False)),
+                ('latitude', models.FloatField(db_index=True)),
+                ('longitude', models.FloatField()),
+                ('district', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+    ]
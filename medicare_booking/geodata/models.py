@@ -0,0 +1,12 @@
+from django.db import models
+
+class PincodeCentroid(models.Model):
+    # Approximate centre of a postal pincode area, loaded with `manage.py load_pincode_centroids`
+    pincode = models.IntegerField(primary_key=True)
+    latitude = models.FloatField(db_index=True)
+    longitude = models.FloatField()
+    district = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.pincode} ({self.latitude}, {self.longitude})"
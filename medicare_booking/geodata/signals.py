@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from hospitals.models import Hospital
+from medicare_booking.table_versions import bump_table_version
+from pharmacies.models import Pharmacy
+from .models import PincodeCentroid
+from .spatial_index import index_for
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_save, sender=Pharmacy)
+def update_spatial_index(sender, instance, **kwargs):
+    # Applied at commit: until then other requests must not find the uncommitted position
+    pk, code = instance.pk, instance.geohash
+    transaction.on_commit(lambda: index_for(sender).update(pk, code))
+
+@receiver(post_delete, sender=Hospital)
+@receiver(post_delete, sender=Pharmacy)
+def remove_from_spatial_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: index_for(sender).update(pk, ''))
+
+@receiver(post_save, sender=PincodeCentroid)
+@receiver(post_delete, sender=PincodeCentroid)
+def bump_centroid_table_version(sender, instance, **kwargs):
+    # Cached nearby searches are keyed on the centroid table version
+    bump_table_version(sender)
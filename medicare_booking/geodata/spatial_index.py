@@ -0,0 +1,122 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+from medicare_booking.table_versions import TableSnapshot
+from medicare_booking.utils import haversine_many
+from . import geohash
+from .models import PincodeCentroid
+
+# Precision stored on Hospital/Pharmacy rows (~150 m cells)
+STORED_PRECISION = 7
+# Precision of the in-memory grid cells (~4.9 km cells)
+INDEX_PRECISION = 5
+
+KM_PER_DEGREE = 111.0
+
+_UNKNOWN = object()
+
+def geohash_for_pincode(pincode):
+    """Geohash of the pincode's centroid, '' if the centroid is unknown."""
+    if pincode is None:
+        return ''
+    centroid = PincodeCentroid.objects.filter(pincode=pincode).values_list('latitude', 'longitude').first()
+    return geohash.encode(*centroid, precision=STORED_PRECISION) if centroid else ''
+
+class GeohashFromPincodeMixin:
+    """
+    For models with `pincode` and `geohash` fields. refresh_geohash(), called from save(),
+    only looks the centroid up when the row is new or its pincode changed since it was loaded.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._geohash_pincode = instance.__dict__.get('pincode', _UNKNOWN)
+        return instance
+
+    def refresh_geohash(self):
+        if self._state.adding or self.pincode != getattr(self, '_geohash_pincode', _UNKNOWN):
+            self.geohash = geohash_for_pincode(self.pincode)
+            self._geohash_pincode = self.pincode
+
+class GeoGridIndex(TableSnapshot):
+    """
+    In-memory mirror of a model's `geohash` column, bucketed into geohash cells.
+    nearest() expands square rings of cells around the origin and stops once k hits are
+    guaranteed, so it only looks at entities near the origin instead of the whole table.
+    Each worker process builds its own copy; writes are applied to it in place once they
+    commit (see geodata.signals), and writes from other processes trigger a rebuild (see
+    TableSnapshot).
+    """
+
+    def __init__(self, model_class):
+        super().__init__(model_class)
+        self.model_class = model_class
+        self._cells = {}        # cell -> {pk: (lat, lon)}
+        self._cell_of = {}      # pk -> cell
+
+    def _load(self):
+        cells = defaultdict(dict)
+        cell_of = {}
+        rows = self.model_class.objects.exclude(geohash='').values_list('pk', 'geohash')
+        for pk, code in rows.iterator():
+            cell = code[:INDEX_PRECISION]
+            cells[cell][pk] = geohash.decode(code)
+            cell_of[pk] = cell
+        self._cells, self._cell_of = cells, cell_of
+
+    def update(self, pk, code):
+        """Moves (or adds/removes) one entity; a code of '' removes it."""
+        with self._lock:
+            if not self._loaded:
+                return
+            old_cell = self._cell_of.pop(pk, None)
+            if old_cell is not None:
+                self._cells[old_cell].pop(pk, None)
+                if not self._cells[old_cell]:
+                    del self._cells[old_cell]
+            if code:
+                cell = code[:INDEX_PRECISION]
+                self._cells[cell][pk] = geohash.decode(code)
+                self._cell_of[pk] = cell
+
+    def nearest(self, latitude, longitude, k, radius_km):
+        """
+        Up to k (pk, distance_km) pairs within radius_km of the point, nearest first.
+        """
+        self._ensure_current()
+        origin_cell = geohash.encode(latitude, longitude, INDEX_PRECISION)
+        lat_step, lon_step = geohash.cell_size(INDEX_PRECISION)
+        # Every ring fully covers at least this many more km around the origin
+        step_km = KM_PER_DEGREE * min(lat_step, lon_step * max(math.cos(math.radians(latitude)), 0.01))
+        max_ring = int(math.ceil(radius_km / step_km)) + 1
+
+        hits = []               # the k nearest (distance, pk) so far, sorted
+        for distance in range(max_ring + 1):
+            pks, lats, lons = [], [], []
+            with self._lock:
+                for cell in geohash.ring(origin_cell, distance):
+                    for pk, (lat, lon) in self._cells.get(cell, {}).items():
+                        pks.append(pk)
+                        lats.append(lat)
+                        lons.append(lon)
+            if pks:
+                # Only this ring's entities are measured; earlier rings are already in hits
+                distances = haversine_many(latitude, longitude, lats, lons)
+                new = [(float(d), pk) for pk, d in zip(pks, distances) if d <= radius_km]
+                hits = heapq.nsmallest(k, hits + new)
+            # Entities further out than the rings scanned so far can't beat the k-th hit
+            if len(hits) >= k and hits[k - 1][0] <= distance * step_km:
+                break
+        return [(pk, d) for d, pk in hits]
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def index_for(model_class):
+    """The process wide index for a model with a `geohash` field (Hospital, Pharmacy)."""
+    with _indexes_lock:
+        if model_class not in _indexes:
+            _indexes[model_class] = GeoGridIndex(model_class)
+        return _indexes[model_class]
@@ -0,0 +1,169 @@
+import random
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from hospitals.models import Hospital
+from medicare_booking.table_versions import TableSnapshot
+from medicare_booking.utils import haversine, haversine_many
+from . import geohash
+from .models import PincodeCentroid
+from .spatial_index import index_for
+
+class HaversineTests(SimpleTestCase):
+
+    def test_vectorized_distances_match_the_scalar_formula(self):
+        rng = random.Random(3)
+        origin = (13.08, 80.27)
+        points = [(rng.uniform(-80, 80), rng.uniform(-179, 179)) for _ in range(50)] + [origin]
+        distances = haversine_many(*origin, [lat for lat, lon in points], [lon for lat, lon in points])
+        for (lat, lon), distance in zip(points, distances):
+            self.assertAlmostEqual(float(distance), haversine(*origin, lat, lon), places=6)
+        self.assertEqual(distances[-1], 0)
+        # One degree along a meridian is 6371 * pi / 180 km
+        self.assertAlmostEqual(float(haversine_many(0, 0, [1.0], [0.0])[0]), 111.195, places=3)
+
+class LoadPincodeCentroidsTests(TestCase):
+
+    def load(self, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'centroids.csv'
+            path.write_text(content)
+            call_command('load_pincode_centroids', str(path), stdout=StringIO())
+
+    def test_loads_updates_and_refreshes_geohashes(self):
+        hospital = Hospital.objects.create(hospital_name='City Hospital', contact='1', working_hours='9-5', pincode=600001)
+        self.assertEqual(hospital.geohash, '')
+
+        self.load("pincode,latitude,longitude,district,state\n600001,13.08,80.27,Chennai,Tamil Nadu\n641001,11.00,76.96,,\n")
+        self.assertEqual(PincodeCentroid.objects.count(), 2)
+        hospital.refresh_from_db()
+        self.assertEqual(hospital.geohash, geohash.encode(13.08, 80.27, precision=7))
+
+        self.load("pincode,latitude,longitude\n600001,13.10,80.20\n")
+        centroid = PincodeCentroid.objects.get(pincode=600001)
+        self.assertEqual((centroid.latitude, centroid.longitude), (13.10, 80.20))
+        hospital.refresh_from_db()
+        self.assertEqual(hospital.geohash, geohash.encode(13.10, 80.20, precision=7))
+
+    def test_bundled_sample_loads(self):
+        call_command('load_pincode_centroids', stdout=StringIO())
+        self.assertTrue(PincodeCentroid.objects.filter(pincode=110001).exists())
+
+    def test_bad_input_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'line 3'):
+            self.load("pincode,latitude,longitude\n600001,13.08,80.27\n600002,north,80.27\n")
+        self.assertFalse(PincodeCentroid.objects.exists())
+        with self.assertRaisesMessage(CommandError, 'CSV not found'):
+            call_command('load_pincode_centroids', '/nonexistent/centroids.csv')
+
+class GeoGridIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        cls.centroids = {600000 + i: (rng.uniform(12.0, 14.0), rng.uniform(79.0, 81.0)) for i in range(60)}
+        PincodeCentroid.objects.bulk_create(
+            PincodeCentroid(pincode=pincode, latitude=latitude, longitude=longitude)
+            for pincode, (latitude, longitude) in cls.centroids.items()
+        )
+        for i, pincode in enumerate(cls.centroids):
+            # Two hospitals share some pincodes, so ties are broken by pk
+            for j in range(2 if i % 5 == 0 else 1):
+                Hospital.objects.create(hospital_name=f'Hospital {i}.{j}', contact='1', working_hours='9-5', pincode=pincode)
+
+    def setUp(self):
+        index_for(Hospital).clear()
+
+    def brute_force(self, latitude, longitude, k, radius_km):
+        rows = [(pk, geohash.decode(code)) for pk, code in Hospital.objects.exclude(geohash='').values_list('pk', 'geohash')]
+        distances = haversine_many(latitude, longitude, [lat for pk, (lat, lon) in rows], [lon for pk, (lat, lon) in rows])
+        return sorted((float(d), pk) for (pk, _), d in zip(rows, distances) if d <= radius_km)[:k]
+
+    def assertNearest(self, latitude, longitude, k, radius_km):
+        found = index_for(Hospital).nearest(latitude, longitude, k, radius_km)
+        expected = self.brute_force(latitude, longitude, k, radius_km)
+        self.assertEqual([pk for pk, d in found], [pk for d, pk in expected])
+        for (_, found_km), (expected_km, _) in zip(found, expected):
+            self.assertAlmostEqual(found_km, expected_km, places=6)
+
+    def test_matches_brute_force_haversine(self):
+        rng = random.Random(11)
+        points = [(rng.uniform(11.5, 14.5), rng.uniform(78.5, 81.5)) for _ in range(20)] + [self.centroids[600000]]
+        for latitude, longitude in points:
+            for k, radius_km in ((1, 200), (5, 30), (10, 100), (100, 200)):
+                with self.subTest(point=(latitude, longitude), k=k, radius_km=radius_km):
+                    self.assertNearest(latitude, longitude, k, radius_km)
+
+    def test_saves_and_deletes_are_applied_at_commit(self):
+        origin = self.centroids[600001]
+        index_for(Hospital).nearest(*origin, 1, 50)
+        hospital = Hospital.objects.get(hospital_name='Hospital 30.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            hospital.pincode = 600001
+            hospital.save()
+        self.assertIn(hospital.pk, [pk for pk, d in index_for(Hospital).nearest(*origin, 3, 1)])
+        self.assertNearest(*origin, 5, 50)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            hospital.delete()
+        self.assertNotIn(hospital.pk, [pk for pk, d in index_for(Hospital).nearest(*origin, 3, 1)])
+        self.assertNearest(*origin, 5, 50)
+
+    def test_centroid_is_only_looked_up_when_the_pincode_changes(self):
+        hospital = Hospital.objects.get(hospital_name='Hospital 1.0')
+        hospital.contact = '2'
+        with self.assertNumQueries(1):
+            hospital.save()
+
+        hospital.pincode = 600002
+        with self.assertNumQueries(2):
+            hospital.save()
+        self.assertEqual(hospital.geohash, geohash.encode(*self.centroids[600002], precision=7))
+
+class Snapshot(TableSnapshot):
+    loads = 0
+
+    def _load(self):
+        self.loads += 1
+
+class TableSnapshotTests(TransactionTestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.snapshot = Snapshot(Hospital)
+
+    def later(self, seconds):
+        return mock.patch('time.monotonic', return_value=time.monotonic() + seconds)
+
+    def test_only_other_processes_writes_trigger_a_rebuild(self):
+        self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 1)
+
+        # This process's writes reach the copy through its signal handlers
+        Hospital.objects.create(hospital_name='Own', contact='1', working_hours='9-5', pincode=600001)
+        with self.later(TableSnapshot.check_interval + 1):
+            self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 1)
+
+        # A bump this process didn't make is another worker's write
+        caches['shared'].incr('table_version:hospitals_hospital')
+        self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 1)
+        with self.later(2 * (TableSnapshot.check_interval + 1)):
+            self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 2)
+
+    def test_copy_built_inside_a_transaction_is_reused_until_it_ends(self):
+        with transaction.atomic():
+            self.snapshot._ensure_current()
+            self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 1)
+        # It could hold rows that were rolled back
+        self.snapshot._ensure_current()
+        self.assertEqual(self.snapshot.loads, 2)
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+# Frozen copy of geodata.geohash.encode, so this migration doesn't change with that module
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude, longitude, precision):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # even bits encode longitude
+    while len(chars) < precision:
+        if even:
+            value, interval = longitude, lon_range
+        else:
+            value, interval = latitude, lat_range
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits = bits << 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    Hospital = apps.get_model('hospitals', 'Hospital')
+    PincodeCentroid = apps.get_model('geodata', 'PincodeCentroid')
+    centroids = dict(
+        (pincode, (latitude, longitude))
+        for pincode, latitude, longitude in PincodeCentroid.objects.values_list('pincode', 'latitude', 'longitude')
+    )
+    rows = []
+    for row in Hospital.objects.only('pk', 'pincode').iterator():
+        if row.pincode in centroids:
+            row.geohash = encode_geohash(*centroids[row.pincode], precision=7)
+            rows.append(row)
+    Hospital.objects.bulk_update(rows, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geodata', '0001_initial'),
+        ('hospitals', '0007_remove_hospital_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hospital',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
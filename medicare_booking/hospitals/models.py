@@ -1,7 +1,8 @@
 from django.db import models
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
+from geodata.spatial_index import GeohashFromPincodeMixin
 
-class Hospital(models.Model):
+class Hospital(GeohashFromPincodeMixin, models.Model):
     hospital_id = models.CharField(max_length=50, primary_key=True, blank=True)
     hospital_name = models.CharField(max_length=255)
 
@@ -9,14 +10,17 @@ class Hospital(models.Model):
     district = models.CharField(max_length=100, null=True, blank=True)
     state = models.CharField(max_length=100, null=True, blank=True)
     pincode = models.IntegerField(null=True, blank=True)
+    # Geohash of the pincode centroid, kept in sync on save for nearest-entity lookups
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
     contact = models.CharField(max_length=50)
     # working_hours as CharField for flexibility (e.g., "9AM-5PM") as "timestamp/string" was requested.
     working_hours = models.CharField(max_length=100)
     password = models.CharField(max_length=100, default='password')
 
     def save(self, *args, **kwargs):
+        self.refresh_geohash()
         if not self.hospital_id:
-            self.hospital_id = generate_custom_id(Hospital, 'hospital_id', 'HOS')
+            return save_with_custom_id(self, 'hospital_id', 'HOS', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -5,4 +5,4 @@ class HospitalSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hospital
         fields = '__all__'
-        read_only_fields = ['hospital_id']
+        read_only_fields = ['hospital_id', 'geohash']
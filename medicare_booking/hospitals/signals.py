@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from medicare_booking.authentication import forget_credentials
+from medicare_booking.table_versions import bump_table_version
+from .models import Hospital
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_delete, sender=Hospital)
+def bump_hospital_table_version(sender, instance, **kwargs):
+    # Cached hospital list pages are keyed on the table version
+    bump_table_version(sender)
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_delete, sender=Hospital)
+def forget_hospital_credentials(sender, instance, **kwargs):
+    # A changed password or a deleted hospital rejects the tokens issued before
+    forget_credentials('hospital', instance.pk)
@@ -1,3 +1,141 @@
-from django.test import TestCase
+import time
+from unittest import mock
+from django.core.cache import cache, caches
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from geodata.models import PincodeCentroid
+from geodata.spatial_index import index_for
+from medicare_booking.pages import PAGE_SIZE, list_page_context
+from medicare_booking.services import NEARBY_RADIUS_KM, PincodeSearchCache, pincode_search_cache, search_entities_by_pincode
+from pharmacies.models import Pharmacy
+from sequences.models import Sequence
+from .models import Hospital
 
-# Create your tests here.
+class HospitalCustomIdTests(TestCase):
+
+    def create(self, name, **kwargs):
+        return Hospital.objects.create(hospital_name=name, contact='1', working_hours='9-5', pincode=600001, **kwargs)
+
+    def test_ids_follow_the_counter(self):
+        self.assertEqual([self.create(f'Hospital {i}').pk for i in range(3)], ['HOS1', 'HOS2', 'HOS3'])
+
+    def test_counter_is_seeded_from_existing_ids(self):
+        self.create('Imported', hospital_id='HOS41')
+        self.assertEqual(self.create('New').pk, 'HOS42')
+
+    def test_taken_id_is_skipped_instead_of_overwritten(self):
+        self.create('First')
+        # Added with an explicit ID after the counter was seeded, so the counter doesn't know about it
+        self.create('Imported', hospital_id='HOS7')
+        Sequence.objects.filter(name='HOS').update(last_value=6)
+
+        hospital = self.create('New')
+        self.assertEqual(hospital.pk, 'HOS8')
+        self.assertEqual(Hospital.objects.get(pk='HOS7').hospital_name, 'Imported')
+        self.assertEqual(self.create('Next').pk, 'HOS9')
+
+class HospitalListPageTests(TestCase):
+    url = '/hospitals-list/'
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(2 * PAGE_SIZE + 1):
+            Hospital.objects.create(hospital_name=f'Hospital {i:03}', contact='1', working_hours='9-5', pincode=600001)
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_fragment_is_keyed_on_the_resolved_page(self):
+        request = RequestFactory().get(self.url)
+        for raw, number in (('01', 1), ('abc', 1), ('', 1), ('2', 2), ('999999', 3)):
+            with self.subTest(page=raw):
+                request.GET = QueryDict(f'page={raw}')
+                self.assertEqual(list_page_context(request, Hospital.objects.order_by('pk'), Hospital)['page'].number, number)
+
+    def test_warm_page_runs_no_queries(self):
+        self.get(page=2)
+        with self.assertNumQueries(0):
+            response = self.get(page='02')
+        ordered = Hospital.objects.order_by('pk')
+        self.assertContains(response, ordered[PAGE_SIZE].hospital_name)
+        self.assertNotContains(response, ordered[0].hospital_name)
+
+    def test_write_invalidates_the_fragment(self):
+        self.assertContains(self.get(), 'Hospital 000')
+        hospital = Hospital.objects.get(hospital_name='Hospital 000')
+        hospital.hospital_name = 'Renamed Hospital'
+        hospital.save()
+        response = self.get()
+        self.assertNotContains(response, 'Hospital 000')
+        self.assertContains(response, 'Renamed Hospital')
+
+    def test_pagination_links_keep_the_query(self):
+        response = self.get(q='Hospital', page=2)
+        self.assertContains(response, f'Page 2 of 3 ({2 * PAGE_SIZE + 1} results)')
+        self.assertContains(response, 'href="?q=Hospital&page=1"')
+        self.assertContains(response, 'href="?q=Hospital&page=3"')
+        self.assertNotContains(self.get(q='Hospital 004'), 'class="pagination"')
+
+class PincodeSearchCacheTests(SimpleTestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = PincodeSearchCache(max_entries=2)
+        cache.set('a', 'v1', 1)
+        cache.set('b', 'v1', 2)
+        self.assertEqual(cache.get('a', 'v1'), 1)
+        cache.set('c', 'v1', 3)
+        self.assertIsNone(cache.get('b', 'v1'))
+        self.assertEqual((cache.get('a', 'v1'), cache.get('c', 'v1')), (1, 3))
+
+    def test_entry_is_only_served_under_its_version(self):
+        cache = PincodeSearchCache()
+        cache.set('a', 'v1', 1)
+        self.assertIsNone(cache.get('a', 'v2'))
+        # A miss under a new version drops the stale entry
+        self.assertIsNone(cache.get('a', 'v1'))
+
+    def test_entry_expires(self):
+        cache = PincodeSearchCache(timeout=10)
+        cache.set('a', 'v1', 1)
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 11):
+            self.assertIsNone(cache.get('a', 'v1'))
+
+class HospitalPincodeSearchTests(TestCase):
+    centroids = {600001: (13.08, 80.27), 600040: (13.08, 80.21), 600050: (13.10, 80.20)}
+
+    @classmethod
+    def setUpTestData(cls):
+        PincodeCentroid.objects.bulk_create(
+            PincodeCentroid(pincode=pincode, latitude=latitude, longitude=longitude)
+            for pincode, (latitude, longitude) in cls.centroids.items()
+        )
+        for name, pincode in (('Central', 600001), ('Anna Nagar', 600040)):
+            Hospital.objects.create(hospital_name=name, contact='1', working_hours='9-5', pincode=pincode)
+
+    def setUp(self):
+        index_for(Hospital).clear()
+        pincode_search_cache.clear()
+
+    def test_nearby_results_are_cached_as_values(self):
+        first, message = search_entities_by_pincode(Hospital, 600050, Pharmacy)
+        self.assertIn(f'within {NEARBY_RADIUS_KM} km', message)
+        self.assertEqual([hospital.hospital_name for hospital in first], ['Anna Nagar', 'Central'])
+        first[0].hospital_name = 'Changed by a request'
+
+        with self.assertNumQueries(0):
+            again, _ = search_entities_by_pincode(Hospital, 600050, Pharmacy)
+        self.assertEqual([hospital.hospital_name for hospital in again], ['Anna Nagar', 'Central'])
+        self.assertEqual([hospital.distance_km for hospital in again], [hospital.distance_km for hospital in first])
+        self.assertIsNot(again[0], first[0])
+        self.assertFalse(again[0]._state.adding)
+
+    def test_write_invalidates_cached_results(self):
+        search_entities_by_pincode(Hospital, 600050, Pharmacy)
+        with self.captureOnCommitCallbacks(execute=True):
+            Hospital.objects.create(hospital_name='Local', contact='1', working_hours='9-5', pincode=600050)
+        hospitals, message = search_entities_by_pincode(Hospital, 600050, Pharmacy)
+        self.assertEqual(([hospital.hospital_name for hospital in hospitals], message), (['Local'], ''))
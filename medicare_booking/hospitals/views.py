@@ -36,15 +36,19 @@ class HospitalSearchAPIView(views.APIView):
         })
 
 from django.db.models import Q
+from medicare_booking.pages import list_page_context
 
 def hospital_list(request):
     query = request.GET.get('q')
+    hospitals = Hospital.objects.order_by('pk')
     if query:
-        hospitals = Hospital.objects.filter(
+        hospitals = hospitals.filter(
             Q(hospital_name__icontains=query) | 
-            Q(address__icontains=query) |
+            Q(street__icontains=query) |
+            Q(district__icontains=query) |
             Q(pincode__icontains=query)
         )
-    else:
-        hospitals = Hospital.objects.all()
-    return render(request, 'hospitals/hospital_list.html', {'hospitals': hospitals, 'query': query})
+    return render(request, 'hospitals/hospital_list.html', {
+        'query': query,
+        **list_page_context(request, hospitals, Hospital),
+    })
@@ -1,5 +1,5 @@
 from django.db import models
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
 
 class Manufacturer(models.Model):
     manufacturer_id = models.CharField(max_length=45, primary_key=True, blank=True)
@@ -7,7 +7,7 @@ class Manufacturer(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.manufacturer_id:
-            self.manufacturer_id = generate_custom_id(Manufacturer, 'manufacturer_id', 'M')
+            return save_with_custom_id(self, 'manufacturer_id', 'M', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
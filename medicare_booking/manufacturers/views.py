@@ -7,6 +7,8 @@ class ManufacturerViewSet(viewsets.ModelViewSet):
     queryset = Manufacturer.objects.all()
     serializer_class = ManufacturerSerializer
 
+from medicare_booking.pages import list_page_context
+
 def manufacturer_list(request):
-    manufacturers = Manufacturer.objects.all()
-    return render(request, 'manufacturers/manufacturer_list.html', {'manufacturers': manufacturers})
+    manufacturers = Manufacturer.objects.order_by('pk')
+    return render(request, 'manufacturers/manufacturer_list.html', list_page_context(request, manufacturers, Manufacturer))
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicare_booking.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it loads models
+from appointments.live import LIVE_PATH_PREFIX, queue_stream_app
+
+
+async def application(scope, receive, send):
+    # Live queue streams (Server-Sent Events) are served outside Django's request cycle
+    if scope['type'] == 'http' and scope['path'].startswith(LIVE_PATH_PREFIX):
+        return await queue_stream_app(scope, receive, send)
+    return await django_application(scope, receive, send)
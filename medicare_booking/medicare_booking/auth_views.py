@@ -1,5 +1,7 @@
 from rest_framework import status
-from rest_framework.decorators import api_view
+from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from doctors.models import Doctor
 from hospitals.models import Hospital
@@ -7,6 +9,7 @@ from pharmacies.models import Pharmacy
 from doctors.serializers import DoctorSerializer
 from hospitals.serializers import HospitalSerializer
 from pharmacies.serializers import PharmacySerializer
+from .authentication import issue_token
 
 @api_view(['POST'])
 def login_doctor(request):
@@ -19,6 +22,8 @@ def login_doctor(request):
             return Response({
                 'status': 'success',
                 'role': 'doctor',
+                'token': issue_token('doctor', doctor.doctor_id, doctor.doctor_name, doctor.password),
+                'expires_in': settings.AUTH_TOKEN_MAX_AGE,
                 'data': DoctorSerializer(doctor).data
             })
         else:
@@ -37,6 +42,8 @@ def login_hospital(request):
             return Response({
                 'status': 'success',
                 'role': 'hospital',
+                'token': issue_token('hospital', hospital.hospital_id, hospital.hospital_name, hospital.password),
+                'expires_in': settings.AUTH_TOKEN_MAX_AGE,
                 'data': HospitalSerializer(hospital).data
             })
         else:
@@ -55,9 +62,22 @@ def login_pharmacy(request):
             return Response({
                 'status': 'success',
                 'role': 'pharmacy',
+                'token': issue_token('pharmacy', pharmacy.pharmacy_id, pharmacy.pharmacy_name, pharmacy.password),
+                'expires_in': settings.AUTH_TOKEN_MAX_AGE,
                 'data': PharmacySerializer(pharmacy).data
             })
         else:
             return Response({'status': 'error', 'message': 'Invalid password'}, status=status.HTTP_401_UNAUTHORIZED)
     except Pharmacy.DoesNotExist:
         return Response({'status': 'error', 'message': 'Pharmacy not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def current_principal(request):
+    """Who the request's token belongs to, answered from the token alone."""
+    return Response({
+        'role': request.user.role,
+        'id': request.user.entity_id,
+        'name': request.user.name,
+        'expires_at': request.user.expires_at,
+    })
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import OrderedDict
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils.crypto import salted_hmac
+from rest_framework import authentication, exceptions
+
+# Tokens are signed with SECRET_KEY under this salt, so they can't be forged or reused as other signed values
+TOKEN_SALT = 'medicare_booking.auth'
+
+class Principal:
+    """The doctor, hospital or pharmacy a token was issued to; request.user for token-authenticated requests."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, role, entity_id, name, fingerprint, issued_at):
+        self.role = role
+        self.entity_id = entity_id
+        self.name = name
+        self.fingerprint = fingerprint
+        self.issued_at = issued_at
+        self.expires_at = issued_at + settings.AUTH_TOKEN_MAX_AGE
+
+    @property
+    def pk(self):
+        return f"{self.role}:{self.entity_id}"
+
+    def __str__(self):
+        return self.pk
+
+# Model holding each role's password, as an app label and model name
+ROLE_MODELS = {'doctor': 'doctors.Doctor', 'hospital': 'hospitals.Hospital', 'pharmacy': 'pharmacies.Pharmacy'}
+
+def password_fingerprint(password):
+    """Keyed hash of a stored password, so a token can be tied to it without carrying it."""
+    return salted_hmac(TOKEN_SALT, password or '').hexdigest()[:16]
+
+def issue_token(role, entity_id, name, password):
+    """
+    Signed token identifying the entity, valid for AUTH_TOKEN_MAX_AGE seconds.
+    It carries a fingerprint of the entity's current password, so changing the password
+    or deleting the entity rejects every token issued before.
+    """
+    fingerprint = password_fingerprint(password)
+    credential_cache.set((role, entity_id), fingerprint)
+    return signing.dumps(
+        {'role': role, 'id': entity_id, 'name': name, 'pwd': fingerprint, 'iat': time.time()},
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+def forget_credentials(role, entity_id):
+    """
+    Drops this process's copy of the entity's password fingerprint, so its next request
+    re-reads the row (post_save/post_delete helper). Dropped again on commit, in case a
+    request read the old row in the meantime.
+    """
+    credential_cache.discard((role, entity_id))
+    transaction.on_commit(lambda: credential_cache.discard((role, entity_id)))
+
+class CredentialCache:
+    """
+    Process-local LRU of (role, entity id) -> password fingerprint, or None for a deleted
+    entity. Entries expire after AUTH_CREDENTIAL_CACHE_TTL seconds, which bounds how long
+    another worker's password change or deletion goes unnoticed here.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """(found, fingerprint)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            fingerprint, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, fingerprint
+
+    def set(self, key, fingerprint):
+        with self._lock:
+            self._entries[key] = (fingerprint, time.monotonic() + settings.AUTH_CREDENTIAL_CACHE_TTL)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+credential_cache = CredentialCache()
+
+def current_fingerprint(role, entity_id):
+    """Fingerprint of the entity's stored password, or None if it no longer exists."""
+    found, fingerprint = credential_cache.get((role, entity_id))
+    if not found:
+        password = apps.get_model(ROLE_MODELS[role]).objects.filter(pk=entity_id).values_list('password', flat=True).first()
+        fingerprint = None if password is None else password_fingerprint(password)
+        credential_cache.set((role, entity_id), fingerprint)
+    return fingerprint
+
+class PrincipalCache:
+    """
+    Process-local LRU of token -> Principal, so repeat requests with a token skip verifying
+    its signature and decoding it. Entries are dropped once the token expires; revocation
+    is still checked against the credential cache on every request.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, token):
+        with self._lock:
+            principal = self._entries.get(token)
+            if principal is None:
+                return None
+            if principal.expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def set(self, token, principal):
+        with self._lock:
+            self._entries[token] = principal
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache()
+
+def resolve_principal(token):
+    """
+    The Principal for a token from issue_token. Raises AuthenticationFailed if the token
+    is forged, expired or revoked.
+    """
+    principal = principal_cache.get(token)
+    if principal is None:
+        try:
+            payload = signing.loads(token, salt=TOKEN_SALT)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if payload.get('role') not in ROLE_MODELS:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        principal = Principal(payload['role'], payload['id'], payload['name'], payload.get('pwd'), payload['iat'])
+        if principal.expires_at <= time.time():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        principal_cache.set(token, principal)
+
+    if principal.fingerprint != current_fingerprint(principal.role, principal.entity_id):
+        principal_cache.discard(token)
+        raise exceptions.AuthenticationFailed('Token has been revoked.')
+    return principal
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates 'Authorization: Bearer <token>' headers carrying a token from the login
+    endpoints. request.user is the token's Principal. A token seen recently by this process
+    is checked without any database query; otherwise the entity's password is read once.
+    """
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            token = header[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return resolve_principal(token), token
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,76 @@
+import functools
+import hashlib
+import json
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Marker stored while the first request with a key is still running. It expires on its own,
+# so a key whose request crashed the worker can be retried after IN_PROGRESS_TIMEOUT seconds.
+IN_PROGRESS = '__in_progress__'
+IN_PROGRESS_TIMEOUT = 60
+
+def _fingerprint(request):
+    """Hash of the path and body. Uploaded files are hashed by content, not by their name."""
+    files = request.FILES
+    if files:
+        body = {key: values for key, values in request.data.lists() if key not in files}
+    else:
+        body = request.data
+    digest = hashlib.sha256(f"{request.path}:{json.dumps(body, sort_keys=True, default=str)}".encode())
+    for name in sorted(files):
+        for upload in files.getlist(name):
+            digest.update(f":{name}:".encode())
+            for chunk in upload.chunks():
+                digest.update(chunk)
+            upload.seek(0)
+    return digest.hexdigest()
+
+def idempotent(scope):
+    """
+    Makes an APIView handler replay its first successful response for a repeated
+    Idempotency-Key header, without running the handler (or touching the database) again.
+
+    Responses live in the 'idempotency' cache, which evicts them after its TIMEOUT. It is
+    shared by the worker processes (Redis), so a retry reaching another worker is replayed too.
+    Requests without the header are handled normally.
+    :param scope: Namespace for the keys (e.g. 'book-hospital'), so endpoints don't share keys.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return handler(view, request, *args, **kwargs)
+
+            store = caches['idempotency']
+            cache_key = f"{scope}:{key}"
+            fingerprint = _fingerprint(request)
+
+            # add() is atomic (SET NX in Redis), so only one of two concurrent retries gets to run the handler
+            if not store.add(cache_key, IN_PROGRESS, IN_PROGRESS_TIMEOUT):
+                saved = store.get(cache_key)
+                if saved is None or saved == IN_PROGRESS:
+                    return Response({'error': 'A request with this Idempotency-Key is already in progress'}, status=status.HTTP_409_CONFLICT)
+                if saved['fingerprint'] != fingerprint:
+                    return Response({'error': 'Idempotency-Key was already used with a different request'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                response = Response(saved['data'], status=saved['status'])
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except Exception:
+                store.delete(cache_key)
+                raise
+
+            if status.is_success(response.status_code):
+                store.set(cache_key, {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data})
+            else:
+                # Errors aren't remembered, the client may fix the cause and retry with the same key
+                store.delete(cache_key)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,34 @@
+import hashlib
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from .table_versions import table_version
+
+PAGE_SIZE = 50
+# Fragments are keyed on table versions, so the timeout only bounds memory use
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+def list_page_context(request, queryset, *model_classes, per_page=PAGE_SIZE):
+    """
+    Context for a paginated, fragment-cached list page (see templates/pagination.html).
+    The fragment is keyed on `page.number`, the page actually shown, so '?page=01',
+    '?page=abc' or an out-of-range number share the entry of the page they resolve to.
+    The row count is cached under the current versions of `model_classes` too, and the
+    page's rows are only fetched when the template renders the fragment, so a cache hit
+    runs no queries.
+    :param queryset: Ordered queryset to paginate.
+    :param model_classes: Models whose rows appear on the page.
+    """
+    version = table_version(*model_classes)
+    paginator = Paginator(queryset, per_page)
+    count_key = f"page_count:{version}:{hashlib.sha256(str(queryset.query).encode()).hexdigest()}"
+    count = cache.get(count_key)
+    if count is None:
+        count = paginator.count
+        cache.set(count_key, count, FRAGMENT_CACHE_TIMEOUT)
+    else:
+        paginator.count = count
+    return {
+        'page': paginator.get_page(request.GET.get('page')),
+        'table_version': version,
+        'fragment_timeout': FRAGMENT_CACHE_TIMEOUT,
+    }
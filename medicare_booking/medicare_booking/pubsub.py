@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+class Subscription:
+    """A subscriber's mailbox on one topic, read from the event loop that created it."""
+
+    def __init__(self, broker, topic, max_pending):
+        self.broker = broker
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        # Runs on the subscriber's loop. A slow client loses its oldest messages rather than growing memory.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InProcessBroker:
+    """
+    Topic based pub/sub within one server process.
+    publish() may be called from any thread (e.g. a sync view running in a worker thread);
+    messages are handed to each subscriber's event loop.
+    Only subscribers in the publishing process receive a message, so this broker is only
+    correct while a single process serves both the API and the streams; otherwise use
+    RedisBroker (or another class with the same publish/subscribe/unsubscribe methods).
+    """
+    max_pending = 100
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        """Must be called from a running event loop."""
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                self.unsubscribe(subscription)
+
+class RedisBroker(InProcessBroker):
+    """
+    Pub/sub across server processes through Redis (settings.REDIS_URL; needs the redis package).
+    publish() sends the message to a Redis channel; a listener thread in every process
+    hands the messages of all channels to that process's own subscribers.
+    """
+    channel_prefix = 'live_queue:'
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.REDIS_URL)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{f"{self.channel_prefix}*": self._relay})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _relay(self, message):
+        topic = message['channel'].decode()[len(self.channel_prefix):]
+        super().publish(topic, json.loads(message['data']))
+
+    def publish(self, topic, message):
+        self._redis.publish(f"{self.channel_prefix}{topic}", json.dumps(message, cls=DjangoJSONEncoder))
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """Returns the process wide broker configured by LIVE_QUEUE_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'LIVE_QUEUE_BROKER', 'medicare_booking.pubsub.InProcessBroker'))()
+    return _broker
@@ -1,11 +1,167 @@
 
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from os.path import commonprefix
+from django.db import router
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Abs
+from geodata.models import PincodeCentroid
+from geodata.spatial_index import index_for
 from medicare_booking.utils import haversine
+from .table_versions import table_version
 from pharmacies.models import Pharmacy
 from hospitals.models import Hospital
 
+# Distance given to rows without a pincode, so they rank last
+UNKNOWN_DISTANCE = float('inf')
+
+# Nearby fallback: how far to look and how many entities to return
+NEARBY_RADIUS_KM = 25
+NEARBY_LIMIT = 20
+
+# Indian pincodes: the first two digits are the postal circle, the first three the sorting district
+POSTAL_CIRCLE_SPAN = 10000
+DISTRICT_SPAN = 1000
+
+def pincode_location(pincode):
+    """(latitude, longitude) of the pincode's centroid, or None if unknown."""
+    return PincodeCentroid.objects.filter(pincode=pincode).values_list('latitude', 'longitude').first()
+
+def nearest_entities(model_class, latitude, longitude, k=NEARBY_LIMIT, radius_km=NEARBY_RADIUS_KM):
+    """
+    The k hospitals/pharmacies nearest to a point within radius_km, nearest first, each with
+    a `distance_km` attribute. Candidates come from the in-memory geohash grid, which only
+    scans cells around the point, and are loaded with a single query.
+    """
+    hits = index_for(model_class).nearest(latitude, longitude, k, radius_km)
+    entities = model_class.objects.in_bulk([pk for pk, _ in hits])
+    results = []
+    for pk, distance in hits:
+        entity = entities.get(pk)
+        if entity is not None:
+            entity.distance_km = round(distance, 2)
+            results.append(entity)
+    return results
+
+def nearest_by_pincode(candidates, target_pincode, limit, offset=0, pincode_field='pincode'):
+    """
+    Returns the `limit` candidates closest to `target_pincode` (by numeric pincode difference),
+    skipping the first `offset`.
+
+    A QuerySet is ranked by the database: the distance is annotated as `distance`,
+    ordered and sliced, so only one page of rows is loaded.
+    Any other iterable falls back to heapq.nsmallest, which keeps just offset + limit rows in memory
+    instead of sorting the full list.
+    :param pincode_field: Lookup path to the pincode, e.g. 'pharmacy__pincode'.
+    """
+    if isinstance(candidates, QuerySet):
+        return list(candidates.annotate(
+            distance=Abs(F(pincode_field) - Value(target_pincode))
+        ).order_by('distance', 'pk')[offset:offset + limit])
+
+    path = pincode_field.split('__')
+
+    def distance(item):
+        value = item
+        for name in path:
+            value = getattr(value, name, None)
+        try:
+            return abs(int(value) - target_pincode)
+        except (TypeError, ValueError):
+            return UNKNOWN_DISTANCE
+
+    ranked = heapq.nsmallest(offset + limit, candidates, key=distance)[offset:]
+    for item in ranked:
+        item.distance = distance(item)
+    return ranked
+
+def pincode_proximity(pincode, target_pincode):
+    """
+    Sort key ranking a pincode's closeness to the target: pincodes sharing more leading
+    digits (same sorting district, then same postal circle) come first, then the smaller
+    numeric difference.
+    """
+    shared = len(commonprefix([str(pincode), str(target_pincode)]))
+    return -shared, abs(pincode - target_pincode)
+
+def nearby_by_pincode(model_class, pincode, limit=NEARBY_LIMIT):
+    """
+    Entities in the same postal circle as `pincode`, ranked by pincode_proximity, for
+    pincodes without a known centroid. Each gets a `distance` attribute (pincode difference).
+    """
+    circle_start = pincode // POSTAL_CIRCLE_SPAN * POSTAL_CIRCLE_SPAN
+    candidates = model_class.objects.filter(pincode__gte=circle_start, pincode__lt=circle_start + POSTAL_CIRCLE_SPAN)
+    ranked = heapq.nsmallest(limit, candidates.iterator(), key=lambda entity: (pincode_proximity(entity.pincode, pincode), entity.pk))
+    for entity in ranked:
+        entity.distance = abs(entity.pincode - pincode)
+    return ranked
+
+def reference_location(ref_model_class, pincode):
+    """
+    Approximate (latitude, longitude) of a pincode without a known centroid: the location
+    of the `ref_model_class` entity with the closest pincode in the same sorting district.
+    Returns None if there is none.
+    """
+    from geodata import geohash
+
+    district_start = pincode // DISTRICT_SPAN * DISTRICT_SPAN
+    anchors = ref_model_class.objects.filter(
+        pincode__gte=district_start, pincode__lt=district_start + DISTRICT_SPAN
+    ).exclude(geohash='').values_list('pincode', 'geohash')
+    closest = min(anchors.iterator(), key=lambda anchor: pincode_proximity(anchor[0], pincode), default=None)
+    return geohash.decode(closest[1]) if closest else None
+
+# Upper bound on the age of a cached nearby search, for writes that skip the version bumps
+PINCODE_SEARCH_TIMEOUT = 10 * 60
+
+# Attributes the nearby searches set on entities, cached along with their field values
+RESULT_ATTRIBUTES = ('distance', 'distance_km')
+
+class PincodeSearchCache:
+    """
+    Process-local LRU of search_entities_by_pincode results keyed by
+    (model, reference model, pincode). Each entry is stored with the shared table versions
+    it was computed under and is only served while they are unchanged, so a write in any
+    worker process invalidates it. Entries also expire after `timeout` seconds.
+    Values are plain data (see _freeze), never model instances a request could modify.
+    """
+
+    def __init__(self, max_entries=2048, timeout=PINCODE_SEARCH_TIMEOUT):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (version, expires_at, value)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+pincode_search_cache = PincodeSearchCache()
+
 def search_entities_by_pincode(model_class, pincode, ref_model_class=None):
     """
     Search for entities (Hospital/Pharmacy) by pincode with geospatial fallback.
+    Results are served from pincode_search_cache after the first search of a pincode.
     
     :param model_class: The model class to search for (e.g., Hospital).
     :param pincode: The pincode to search for.
@@ -13,22 +169,65 @@ def search_entities_by_pincode(model_class, pincode, ref_model_class=None):
                             no entity of 'model_class' exists at 'pincode'.
     :return: (list_of_entities, message_string)
     """
-    entities = []
-    message = ""
-    
     if not pincode:
         return model_class.objects.all(), ""
 
     try:
         pincode = int(pincode)
-        # 1. Exact Match
-        entities = list(model_class.objects.filter(pincode=pincode))
-        
-        if not entities:
-            # 2. Nearby Search - DISABLED (Lat/Long removed)
-            entity_name = model_class._meta.verbose_name_plural
-            message = f"No {entity_name} found exactly at this pincode."
     except ValueError:
-         message = "Invalid pincode format."
-         
+        return [], "Invalid pincode format."
+
+    key = (model_class, ref_model_class, pincode)
+    version = table_version(*[m for m in (model_class, ref_model_class, PincodeCentroid) if m is not None])
+    cached = pincode_search_cache.get(key, version)
+    if cached is not None:
+        rows, message = cached
+        return _thaw(model_class, rows), message
+    entities, message = _search_entities_by_pincode(model_class, pincode, ref_model_class)
+    pincode_search_cache.set(key, version, (_freeze(entities), message))
     return entities, message
+
+def _freeze(entities):
+    """(field values, result attributes) of each entity."""
+    return tuple(
+        (
+            tuple(getattr(entity, field.attname) for field in entity._meta.concrete_fields),
+            {name: getattr(entity, name) for name in RESULT_ATTRIBUTES if hasattr(entity, name)},
+        )
+        for entity in entities
+    )
+
+def _thaw(model_class, rows):
+    """New instances from _freeze() output, as if loaded from the database."""
+    names = [field.attname for field in model_class._meta.concrete_fields]
+    db = router.db_for_read(model_class)
+    entities = []
+    for values, attributes in rows:
+        entity = model_class.from_db(db, names, values)
+        entity.__dict__.update(attributes)
+        entities.append(entity)
+    return entities
+
+def _search_entities_by_pincode(model_class, pincode, ref_model_class):
+    # 1. Exact Match
+    entities = list(model_class.objects.filter(pincode=pincode))
+    if entities:
+        return entities, ""
+
+    entity_name = model_class._meta.verbose_name_plural
+    message = f"No {entity_name} found exactly at this pincode."
+
+    # 2. Nearby Search around the pincode centroid, or around a reference entity at the pincode
+    location = pincode_location(pincode)
+    if location is None and ref_model_class is not None:
+        location = reference_location(ref_model_class, pincode)
+    if location is not None:
+        nearby = nearest_entities(model_class, *location)
+        if nearby:
+            return nearby, message + f" Showing {entity_name} within {NEARBY_RADIUS_KM} km."
+
+    # 3. Closest pincodes in the same postal circle
+    nearby = nearby_by_pincode(model_class, pincode)
+    if nearby:
+        return nearby, message + f" Showing {entity_name} with the closest pincodes."
+    return [], message
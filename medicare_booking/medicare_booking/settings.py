@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,6 +32,11 @@ ALLOWED_HOSTS = ['*']
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    'idempotency-key',
+)
+
 
 # Application definition
 
@@ -55,6 +63,9 @@ INSTALLED_APPS = [
     'medicines',
     'pharmacy_stock',
     'manufacturers',
+    'sequences',
+    'geodata',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -96,10 +107,86 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Writers take the lock when their transaction starts and wait up to `timeout` seconds
+        # for it, instead of failing with "database is locked" when a read is upgraded to a write.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Connections are kept for a minute and reused, including by the unified search's
+        # worker threads, instead of being opened for every request
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # On disk rather than in memory, so the concurrency tests' threads wait for locks
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# State every worker process must see (idempotency records, table versions, queue snapshots)
+# lives in Redis when REDIS_URL is set. Without it those caches are process-local, which is
+# only correct while a single process serves the site (runserver, tests).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+def _shared_cache(name, timeout, max_entries):
+    if REDIS_URL:
+        # Redis evicts by its own maxmemory policy
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': name,
+            'TIMEOUT': timeout,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': name,
+        'TIMEOUT': timeout,
+        'OPTIONS': {
+            'MAX_ENTRIES': max_entries,
+        },
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Responses replayed for retried requests carrying an Idempotency-Key header
+    'idempotency': _shared_cache('idempotency', 60 * 60 * 24, 10000),
+    # Table versions, queue snapshots
+    'shared': _shared_cache('shared', None, 100000),
+}
+
+
+# Live queue updates
+# Pub/sub used to push appointment queue changes to /api/v1/live/ streams (see appointments.live).
+
+# Without Redis, events only reach streams served by the process that published them
+LIVE_QUEUE_BROKER = 'medicare_booking.pubsub.RedisBroker' if REDIS_URL else 'medicare_booking.pubsub.InProcessBroker'
+
+
+# API authentication
+# The login endpoints issue signed tokens, sent back as 'Authorization: Bearer <token>'.
+
+AUTH_TOKEN_MAX_AGE = 60 * 60 * 12
+
+# Seconds a worker trusts its copy of an account's password fingerprint. A password change or
+# deletion made through another worker rejects that account's older tokens within this window.
+AUTH_CREDENTIAL_CACHE_TTL = 30
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'medicare_booking.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -140,6 +227,12 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# Custom ID allocation
+# Number of IDs each worker process reserves per counter round trip.
+# Values above 1 leave gaps in the ID series when a process exits with unused IDs.
+
+ID_SEQUENCE_BLOCK_SIZE = 1
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import defaultdict, deque
+from django.core.cache import caches
+from django.db import connection, transaction
+
+# Per-table version counters for cache keys. Caching a result under the current versions of
+# the tables it reads means a write only has to bump the version, never find stale keys.
+# The counters live in the 'shared' cache so a bump in one worker process reaches all of them;
+# the results keyed on them can stay in a process-local cache.
+
+# Versions this process bumped, per key. A snapshot whose tables only moved by these bumps
+# already holds the change (its signal handlers applied it), so it need not be rebuilt.
+OWN_BUMPS_KEPT = 1000
+_own_bumps = defaultdict(lambda: deque(maxlen=OWN_BUMPS_KEPT))
+_own_bumps_lock = threading.Lock()
+
+def _version_key(model_class):
+    return f"table_version:{model_class._meta.db_table}"
+
+def _versions(keys):
+    """
+    Current counter per key. A missing counter (never set, or evicted) starts from the clock,
+    so it can't repeat a version handed out before.
+    """
+    cache = caches['shared']
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+def table_version(*model_classes):
+    """The current versions of the models' tables joined into one cache key fragment."""
+    return '.'.join(str(version) for version in _versions([_version_key(model_class) for model_class in model_classes]))
+
+def _bump(key):
+    cache = caches['shared']
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        version = cache.incr(key)
+    with _own_bumps_lock:
+        _own_bumps[key].append(version)
+
+def bump_table_version(model_class):
+    """Invalidates everything cached against the table, now and again at commit."""
+    key = _version_key(model_class)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+def _only_own_bumps(keys, old_versions, new_versions):
+    """Whether every version between old and new of each key was bumped by this process."""
+    with _own_bumps_lock:
+        for key, old, new in zip(keys, old_versions, new_versions):
+            if old == new:
+                continue
+            own = _own_bumps[key]
+            if not old < new <= old + len(own) or not all(version in own for version in range(old + 1, new + 1)):
+                return False
+    return True
+
+class TableSnapshot:
+    """
+    Base for process-local in-memory copies of tables, such as the search indexes.
+    Subclasses set `model_classes`, implement _load(), and apply this process's writes to
+    the copy from signal handlers once they commit. Writes made by other worker processes
+    only show up as moved table versions, which are checked every `check_interval` seconds;
+    the copy is rebuilt when they moved by bumps that weren't this process's own.
+    """
+
+    # Seconds a write made by another process can go unnoticed
+    check_interval = 5
+    # Also bounds staleness after writes that skip the version bumps (raw SQL, other apps)
+    max_age = 10 * 60
+
+    def __init__(self, *model_classes):
+        self.model_classes = model_classes
+        self._keys = [_version_key(model_class) for model_class in model_classes]
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._versions = None   # table versions the copy reflects; None once it must be rebuilt
+        self._loaded_at = 0
+        self._checked_at = 0
+
+    def _ensure_current(self):
+        if connection.in_atomic_block:
+            # A copy built now could hold this transaction's uncommitted rows: serve the copy
+            # there is, or build one that is rebuilt on the first lookup outside a transaction
+            if not self._loaded:
+                with self._lock:
+                    if not self._loaded:
+                        self._load()
+                        self._loaded = True
+                        self._versions = None
+            return
+        now = time.monotonic()
+        if self._versions is not None and now - self._loaded_at < self.max_age and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._versions is not None and now - self._loaded_at < self.max_age:
+                if now - self._checked_at < self.check_interval:
+                    return
+                versions = _versions(self._keys)
+                if _only_own_bumps(self._keys, self._versions, versions):
+                    self._versions = versions
+                    self._checked_at = now
+                    return
+            # Read the versions before the rows, so a write committed in between moves them on
+            versions = _versions(self._keys)
+            self._load()
+            self._loaded = True
+            self._versions = versions
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def _load(self):
+        raise NotImplementedError
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._versions = None
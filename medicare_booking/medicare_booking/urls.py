@@ -28,6 +28,7 @@ urlpatterns = [
     path('api/v1/login/doctor/', auth_views.login_doctor, name='login_doctor'),
     path('api/v1/login/hospital/', auth_views.login_hospital, name='login_hospital'),
     path('api/v1/login/pharmacy/', auth_views.login_pharmacy, name='login_pharmacy'),
+    path('api/v1/login/me/', auth_views.current_principal, name='current_principal'),
     
     # Static HTML Pages
     path('hospitals-list/', hospitals_views.hospital_list, name='page_hospital_list'),
@@ -46,4 +47,5 @@ urlpatterns = [
     path('api/v1/medicines/', include('medicines.urls')),
     path('api/v1/pharmacy-stock/', include('pharmacy_stock.urls')),
     path('api/v1/manufacturers/', include('manufacturers.urls')),
+    path('api/v1/', include('search.urls')),
 ]
@@ -1,13 +1,14 @@
-from django.db.models import Max
 import math
+import numpy as np
+from django.db import IntegrityError, transaction
 
-def generate_custom_id(model_class, id_field, prefix):
+# Times a new row is retried under a fresh ID after the generated one turns out to be taken
+CUSTOM_ID_ATTEMPTS = 3
+
+def max_custom_id_number(model_class, id_field, prefix):
     """
-    Generates a custom ID like PH1, PH2, MD1, etc.
-    :param model_class: The Django model class.
-    :param id_field: The name of the ID field (e.g., 'pharmacy_id').
-    :param prefix: The prefix string (e.g., 'PH').
-    :return: A string ID.
+    Returns the highest numeric suffix among existing IDs with the given prefix.
+    This scans the table, so it is only used to seed a new ID counter.
     """
     # Filter IDs starting with the prefix
     ids = model_class.objects.filter(**{f"{id_field}__startswith": prefix}).values_list(id_field, flat=True)
@@ -22,7 +23,59 @@ def generate_custom_id(model_class, id_field, prefix):
         except ValueError:
             continue
             
-    return f"{prefix}{max_num + 1}"
+    return max_num
+
+def generate_custom_id(model_class, id_field, prefix):
+    """
+    Generates a custom ID like PH1, PH2, MD1, etc.
+    Numbers come from the per-prefix counter in the sequences app, so each call is a
+    single atomic increment instead of a scan over existing IDs.
+    :param model_class: The Django model class.
+    :param id_field: The name of the ID field (e.g., 'pharmacy_id').
+    :param prefix: The prefix string (e.g., 'PH').
+    :return: A string ID.
+    """
+    from sequences.allocator import next_value
+
+    num = next_value(prefix, seed=lambda: max_custom_id_number(model_class, id_field, prefix))
+    return f"{prefix}{num}"
+
+def save_with_custom_id(instance, id_field, prefix, save, *args, **kwargs):
+    """
+    Saves a new instance under a generated custom ID. The INSERT is forced, so an ID that
+    is already taken (a row added with an explicit ID ahead of the counter, e.g. by a
+    fixture or import) raises IntegrityError instead of silently updating that row.
+    The counter is then moved past the highest existing ID and the save retried.
+    :param save: The model's super().save.
+    """
+    from sequences.allocator import advance_to
+
+    model_class = type(instance)
+    kwargs['force_insert'] = True
+    for attempt in range(CUSTOM_ID_ATTEMPTS):
+        custom_id = generate_custom_id(model_class, id_field, prefix)
+        setattr(instance, id_field, custom_id)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            setattr(instance, id_field, '')
+            taken = model_class.objects.filter(**{id_field: custom_id}).exists()
+            if not taken or attempt == CUSTOM_ID_ATTEMPTS - 1:
+                raise
+            advance_to(prefix, max_custom_id_number(model_class, id_field, prefix))
+
+def generate_custom_ids(model_class, id_field, prefix, count):
+    """
+    Generates `count` consecutive custom IDs with one counter update, for bulk_create.
+    :return: A list of string IDs.
+    """
+    from sequences.allocator import reserve
+
+    if count < 1:
+        return []
+    start = reserve(prefix, count, seed=lambda: max_custom_id_number(model_class, id_field, prefix))
+    return [f"{prefix}{num}" for num in range(start, start + count)]
 
 def haversine(lat1, lon1, lat2, lon2):
     """
@@ -42,3 +95,19 @@ def haversine(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a)) 
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles
     return c * r
+
+def haversine_many(lat, lon, lats, lons):
+    """
+    Vectorized haversine: distances in kilometres from one point to many points in a single NumPy pass.
+    :param lat, lon: The origin in decimal degrees.
+    :param lats, lons: Sequences (or arrays) of destination coordinates in decimal degrees.
+    :return: A NumPy array of distances, one per destination.
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=float))
+    lon2 = np.radians(np.asarray(lons, dtype=float))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(a)) # Radius of earth in kilometers
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# SQLite: FTS5 table with a trigram tokenizer, kept in sync with medicines_medicine by triggers
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE medicines_medicine_fts USING fts5(
+        medicine_id UNINDEXED, medicine_name, description, tokenize='trigram'
+    )
+    """,
+    """
+    INSERT INTO medicines_medicine_fts (medicine_id, medicine_name, description)
+    SELECT medicine_id, medicine_name, description FROM medicines_medicine
+    """,
+    """
+    CREATE TRIGGER medicines_medicine_fts_insert AFTER INSERT ON medicines_medicine BEGIN
+        INSERT INTO medicines_medicine_fts (medicine_id, medicine_name, description)
+        VALUES (new.medicine_id, new.medicine_name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER medicines_medicine_fts_update AFTER UPDATE ON medicines_medicine BEGIN
+        DELETE FROM medicines_medicine_fts WHERE medicine_id = old.medicine_id;
+        INSERT INTO medicines_medicine_fts (medicine_id, medicine_name, description)
+        VALUES (new.medicine_id, new.medicine_name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER medicines_medicine_fts_delete AFTER DELETE ON medicines_medicine BEGIN
+        DELETE FROM medicines_medicine_fts WHERE medicine_id = old.medicine_id;
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS medicines_medicine_fts_insert",
+    "DROP TRIGGER IF EXISTS medicines_medicine_fts_update",
+    "DROP TRIGGER IF EXISTS medicines_medicine_fts_delete",
+    "DROP TABLE IF EXISTS medicines_medicine_fts",
+]
+
+# PostgreSQL: trigram GIN indexes serve icontains (UPPER(column) LIKE UPPER('%x%')) directly
+POSTGRESQL_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS medicine_name_trgm_idx ON medicines_medicine USING gin (UPPER(medicine_name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS medicine_description_trgm_idx ON medicines_medicine USING gin (UPPER(description) gin_trgm_ops)",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS medicine_name_trgm_idx",
+    "DROP INDEX IF EXISTS medicine_description_trgm_idx",
+]
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicines', '0002_remove_medicine_category_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
 
 class Medicine(models.Model):
     medicine_id = models.CharField(max_length=45, primary_key=True, blank=True)
@@ -9,7 +9,7 @@ class Medicine(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.medicine_id:
-            self.medicine_id = generate_custom_id(Medicine, 'medicine_id', 'MED')
+            return save_with_custom_id(self, 'medicine_id', 'MED', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
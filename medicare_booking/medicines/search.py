@@ -0,0 +1,33 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# The trigram tokenizer can only match queries of at least three characters
+MIN_INDEXED_LENGTH = 3
+
+FTS_MATCH_SQL = "SELECT medicine_id FROM medicines_medicine_fts WHERE medicines_medicine_fts MATCH %s"
+
+def _fts_phrase(query, include_description):
+    phrase = '"' + query.replace('"', '""') + '"'
+    columns = '{medicine_name description}' if include_description else 'medicine_name'
+    return f"{columns} : {phrase}"
+
+def medicine_search_q(query, prefix='', include_description=False):
+    """
+    Q object matching medicines whose name (and optionally description) contains `query`.
+    On SQLite the lookup goes through the FTS5 trigram index; PostgreSQL serves the plain
+    icontains lookups from trigram GIN indexes (see migration 0003_medicine_search_index).
+
+    :param query: text to search for
+    :param prefix: lookup path to the Medicine from the filtered model, e.g. 'medicine__'
+    :param include_description: also match on the description
+    """
+    query = query.strip()
+    if connection.vendor == 'sqlite' and len(query) >= MIN_INDEXED_LENGTH:
+        ids = RawSQL(FTS_MATCH_SQL, [_fts_phrase(query, include_description)])
+        return Q(**{f'{prefix}medicine_id__in': ids})
+
+    condition = Q(**{f'{prefix}medicine_name__icontains': query})
+    if include_description:
+        condition |= Q(**{f'{prefix}description__icontains': query})
+    return condition
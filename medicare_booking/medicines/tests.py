@@ -1,3 +1,34 @@
 from django.test import TestCase
+from .models import Medicine
+from .search import medicine_search_q
 
-# Create your tests here.
+class MedicineSearchTests(TestCase):
+    names = ['Paracetamol 500', 'PARACETAMOL Syrup', 'Amoxicillin', 'Amoxicillin + Clavulanate', 'Cetirizine', 'Vitamin "D3"', 'Zinc']
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in cls.names:
+            Medicine.objects.create(medicine_name=name, description=f'{name.split()[0].lower()} tablets for adults', dosage_form='Tablet')
+
+    def search(self, query, **kwargs):
+        return set(Medicine.objects.filter(medicine_search_q(query, **kwargs)).values_list('medicine_name', flat=True))
+
+    def test_matches_the_same_rows_as_a_substring_scan(self):
+        queries = ['para', 'CETAMOL', 'amoxi', 'lin + cla', 'in', 'zi', 'D3"', '"D3"', 'mol 5', 'nothing', '  cetiri  ']
+        for query in queries:
+            with self.subTest(query=query):
+                expected = {name for name in self.names if query.strip().lower() in name.lower()}
+                self.assertEqual(self.search(query), expected)
+
+    def test_description_search_is_opt_in(self):
+        self.assertEqual(self.search('adults'), set())
+        self.assertEqual(self.search('adults', include_description=True), set(self.names))
+
+    def test_index_follows_renames_and_deletes(self):
+        medicine = Medicine.objects.get(medicine_name='Zinc')
+        medicine.medicine_name = 'Zinc Sulphate'
+        medicine.save()
+        self.assertEqual(self.search('sulphate'), {'Zinc Sulphate'})
+
+        medicine.delete()
+        self.assertEqual(self.search('sulphate'), set())
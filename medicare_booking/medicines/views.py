@@ -7,15 +7,15 @@ class MedicineViewSet(viewsets.ModelViewSet):
     queryset = Medicine.objects.all()
     serializer_class = MedicineSerializer
 
-from django.db.models import Q
+from medicare_booking.pages import list_page_context
+from .search import medicine_search_q
 
 def medicine_list(request):
     query = request.GET.get('q')
+    medicines = Medicine.objects.order_by('pk')
     if query:
-        medicines = Medicine.objects.filter(
-            Q(medicine_name__icontains=query) |
-            Q(description__icontains=query)
-        )
-    else:
-        medicines = Medicine.objects.all()
-    return render(request, 'medicines/medicine_list.html', {'medicines': medicines, 'query': query})
+        medicines = medicines.filter(medicine_search_q(query, include_description=True))
+    return render(request, 'medicines/medicine_list.html', {
+        'query': query,
+        **list_page_context(request, medicines, Medicine),
+    })
@@ -1,19 +1,23 @@
 from django.db import models
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
+from geodata.spatial_index import GeohashFromPincodeMixin
 
-class Pharmacy(models.Model):
+class Pharmacy(GeohashFromPincodeMixin, models.Model):
     pharmacy_id = models.CharField(max_length=45, primary_key=True, blank=True)
     pharmacy_name = models.CharField(max_length=45)
     street = models.CharField(max_length=255, null=True, blank=True)
     district = models.CharField(max_length=100, null=True, blank=True)
     state = models.CharField(max_length=100, null=True, blank=True)
     pincode = models.IntegerField()
+    # Geohash of the pincode centroid, kept in sync on save for nearest-entity lookups
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
     contact = models.CharField(max_length=45)
     password = models.CharField(max_length=100, default='password')
 
     def save(self, *args, **kwargs):
+        self.refresh_geohash()
         if not self.pharmacy_id:
-            self.pharmacy_id = generate_custom_id(Pharmacy, 'pharmacy_id', 'PH')
+            return save_with_custom_id(self, 'pharmacy_id', 'PH', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -5,4 +5,4 @@ class PharmacySerializer(serializers.ModelSerializer):
     class Meta:
         model = Pharmacy
         fields = '__all__'
-        read_only_fields = ['pharmacy_id']
+        read_only_fields = ['pharmacy_id', 'geohash']
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from medicare_booking.authentication import forget_credentials
+from .models import Pharmacy
+
+@receiver(post_save, sender=Pharmacy)
+@receiver(post_delete, sender=Pharmacy)
+def forget_pharmacy_credentials(sender, instance, **kwargs):
+    # A changed password or a deleted pharmacy rejects the tokens issued before
+    forget_credentials('pharmacy', instance.pk)
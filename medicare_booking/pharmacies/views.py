@@ -35,14 +35,18 @@ class PharmacySearchAPIView(views.APIView):
         })
 
 from django.db.models import Q
+from medicare_booking.pages import list_page_context
 
 def pharmacy_list(request):
     query = request.GET.get('q')
+    pharmacies = Pharmacy.objects.order_by('pk')
     if query:
-        pharmacies = Pharmacy.objects.filter(
+        pharmacies = pharmacies.filter(
             Q(pharmacy_name__icontains=query) |
-            Q(address__icontains=query)
+            Q(street__icontains=query) |
+            Q(district__icontains=query)
         )
-    else:
-        pharmacies = Pharmacy.objects.all()
-    return render(request, 'pharmacies/pharmacy_list.html', {'pharmacies': pharmacies, 'query': query})
+    return render(request, 'pharmacies/pharmacy_list.html', {
+        'query': query,
+        **list_page_context(request, pharmacies, Pharmacy),
+    })
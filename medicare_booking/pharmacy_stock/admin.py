@@ -1,8 +1,18 @@
 from django.contrib import admin
-from .models import Pharmacy_Medicine
+from .models import MedicineAvailabilitySummary, Pharmacy_Medicine, StockReservation
 
 @admin.register(Pharmacy_Medicine)
 class PharmacyMedicineAdmin(admin.ModelAdmin):
     list_display = ('pharmacy', 'medicine', 'manufacturer', 'price', 'stock_quantity', 'expiry_date', 'is_available')
     list_filter = ('pharmacy', 'manufacturer', 'is_available', 'expiry_date')
     search_fields = ('pharmacy__pharmacy_name', 'medicine__medicine_name', 'manufacturer__manufacturer_name')
+
+@admin.register(MedicineAvailabilitySummary)
+class MedicineAvailabilitySummaryAdmin(admin.ModelAdmin):
+    list_display = ('medicine', 'pincode', 'pharmacy_count', 'min_price', 'total_stock')
+    search_fields = ('medicine__medicine_name', 'pincode')
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('reservation_id', 'stock', 'quantity', 'status', 'expires_at')
+    list_filter = ('status',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PharmacyStockConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pharmacy_stock'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,29 @@
+import datetime
+from django.db import transaction
+from medicare_booking.table_versions import bump_table_version
+from .models import Pharmacy_Medicine
+from .summary import refresh_summaries, stock_groups
+
+def expired_stock(today=None):
+    """Stock still marked available whose expiry date has passed."""
+    return Pharmacy_Medicine.objects.filter(is_available=True, expiry_date__lt=today or datetime.date.today())
+
+def sweep_expired_stock(batch_size=1000, today=None):
+    """
+    Marks expired stock unavailable, one UPDATE per chunk of `batch_size` rows so each
+    transaction (and its write lock) stays short.
+    :return: Number of rows marked unavailable.
+    """
+    today = today or datetime.date.today()
+    swept = 0
+    while True:
+        with transaction.atomic():
+            ids = list(expired_stock(today).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return swept
+            chunk = Pharmacy_Medicine.objects.filter(pk__in=ids)
+            groups = stock_groups(chunk)
+            swept += chunk.update(is_available=False)
+            # update() skips the save signals that maintain the summary and table version
+            refresh_summaries(groups)
+            bump_table_version(Pharmacy_Medicine)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from pharmacy_stock.summary import rebuild_summaries
+
+class Command(BaseCommand):
+    help = "Recomputes the medicine availability summary per pincode from the stock table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_summaries(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} availability summary rows"))
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from pharmacy_stock.reservations import release_expired_holds
+
+class Command(BaseCommand):
+    help = (
+        "Returns the units of expired stock holds to stock. Each web process also expires its "
+        "own holds as it serves reservations; this catches holds of processes that restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0, help="Repeat every N seconds instead of exiting.")
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_holds()
+            self.stdout.write(self.style.SUCCESS(f"Expired {released} stock holds"))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from pharmacy_stock.expiry import expired_stock, sweep_expired_stock
+
+class Command(BaseCommand):
+    help = (
+        "Marks stock past its expiry date as unavailable. Run it daily (e.g. from cron), "
+        "or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help="Repeat every N seconds instead of exiting.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows have expired.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['dry_run']:
+            self.stdout.write(f"{expired_stock().count()} expired stock rows are still marked available")
+            return
+
+        while True:
+            swept = sweep_expired_stock(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Marked {swept} expired stock rows unavailable"))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
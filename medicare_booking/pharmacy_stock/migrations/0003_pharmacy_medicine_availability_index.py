@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manufacturers', '0001_initial'),
+        ('medicines', '0003_medicine_search_index'),
+        ('pharmacies', '0007_pharmacy_geohash'),
+        ('pharmacy_stock', '0002_pharmacy_medicine_manufacturer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pharmacy_medicine',
+            index=models.Index(fields=['medicine', 'is_available', 'expiry_date'], name='stock_availability_idx'),
+        ),
+    ]
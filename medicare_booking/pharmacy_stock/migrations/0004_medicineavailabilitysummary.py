@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    Pharmacy_Medicine = apps.get_model('pharmacy_stock', 'Pharmacy_Medicine')
+    MedicineAvailabilitySummary = apps.get_model('pharmacy_stock', 'MedicineAvailabilitySummary')
+    rows = Pharmacy_Medicine.objects.filter(is_available=True, stock_quantity__gt=0).values(
+        'medicine_id', pincode=F('pharmacy__pincode')
+    ).annotate(
+        pharmacy_count=Count('pharmacy', distinct=True),
+        min_price=Min('price'),
+        total_stock=Sum('stock_quantity'),
+    ).order_by()
+    MedicineAvailabilitySummary.objects.bulk_create(
+        (MedicineAvailabilitySummary(**row) for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medicines', '0003_medicine_search_index'),
+        ('pharmacy_stock', '0003_pharmacy_medicine_availability_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicineAvailabilitySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pincode', models.IntegerField()),
+                ('pharmacy_count', models.IntegerField()),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_stock', models.IntegerField()),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='medicines.medicine')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('medicine', 'pincode'), name='unique_medicine_pincode_summary')],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
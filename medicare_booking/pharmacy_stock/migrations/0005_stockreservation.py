@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy_stock', '0004_medicineavailabilitysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('reservation_id', models.CharField(blank=True, max_length=100, primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(default='Held', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pharmacy_stock.pharmacy_medicine')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx')],
+            },
+        ),
+    ]
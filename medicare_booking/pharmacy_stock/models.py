@@ -1,8 +1,9 @@
+import uuid
 from django.db import models
 from pharmacies.models import Pharmacy
 from medicines.models import Medicine
 from manufacturers.models import Manufacturer
-from medicare_booking.utils import generate_custom_id
+from medicare_booking.utils import save_with_custom_id
 
 class Pharmacy_Medicine(models.Model):
     medicine_instance_id = models.CharField(max_length=45, primary_key=True, blank=True)
@@ -12,12 +13,68 @@ class Pharmacy_Medicine(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock_quantity = models.IntegerField()
     expiry_date = models.DateField()
+    # Cleared by the sweep_expired_stock command once expiry_date has passed
     is_available = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['medicine', 'is_available', 'expiry_date'], name='stock_availability_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.medicine_instance_id:
-            self.medicine_instance_id = generate_custom_id(Pharmacy_Medicine, 'medicine_instance_id', 'PHME')
+            return save_with_custom_id(self, 'medicine_instance_id', 'PHME', super().save, *args, **kwargs)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.pharmacy.pharmacy_name} - {self.medicine.medicine_name}"
+
+class MedicineAvailabilitySummary(models.Model):
+    """
+    Available stock of a medicine per pincode, maintained by pharmacy_stock.summary.
+    Only rows with is_available and stock_quantity > 0 are counted.
+    """
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE)
+    pincode = models.IntegerField()
+    pharmacy_count = models.IntegerField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    total_stock = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['medicine', 'pincode'], name='unique_medicine_pincode_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine_id} @ {self.pincode}: {self.pharmacy_count} pharmacies"
+
+# StockReservation statuses
+HELD = 'Held'
+COMMITTED = 'Committed'
+RELEASED = 'Released'
+EXPIRED = 'Expired'
+
+class StockReservation(models.Model):
+    """
+    Units taken out of a stock row's stock_quantity until the hold is committed (sold),
+    released, or expires. See pharmacy_stock.reservations.
+    """
+    reservation_id = models.CharField(max_length=100, primary_key=True, blank=True)
+    stock = models.ForeignKey(Pharmacy_Medicine, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, default=HELD) # Held, Committed, Released, Expired
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.reservation_id:
+            self.reservation_id = str(uuid.uuid4())
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.reservation_id} ({self.quantity} x {self.stock_id}, {self.status})"
@@ -0,0 +1,16 @@
+import csv
+import io
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+class CSVParser(BaseParser):
+    """Parses a text/csv body with a header row into a list of dicts."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        charset = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            text = stream.read().decode(charset)
+        except UnicodeDecodeError:
+            raise ParseError("CSV body is not valid text")
+        return list(csv.DictReader(io.StringIO(text)))
@@ -0,0 +1,68 @@
+import datetime
+from decimal import Decimal
+from django.db.models import Count, F, Max, Min, Window
+from django.db.models.functions import RowNumber
+
+# Pincodes sharing their leading digits (pincode // REGION_SIZE) form one region
+REGION_SIZE = 1000
+GROUP_FIELDS = ['medicine_id', 'manufacturer_id', 'region']
+CENTS = Decimal('0.01')
+
+def _offers(queryset):
+    """Available, unexpired stock with its pincode region."""
+    return queryset.filter(
+        is_available=True,
+        stock_quantity__gt=0,
+        expiry_date__gte=datetime.date.today(),
+    ).annotate(region=F('pharmacy__pincode') / REGION_SIZE)
+
+def _medians(offers):
+    """
+    (medicine_id, manufacturer_id, region) -> median price. Window functions number each
+    group's prices in order, so only the one or two middle rows of every group are fetched.
+    """
+    partition = [F(field) for field in GROUP_FIELDS]
+    middle = offers.annotate(
+        position=Window(RowNumber(), partition_by=partition, order_by=F('price').asc()),
+        group_size=Window(Count('pk'), partition_by=partition),
+    ).filter(
+        position__gte=(F('group_size') + 1) / 2,
+        position__lte=(F('group_size') + 2) / 2,
+    ).values_list(*GROUP_FIELDS, 'price')
+
+    prices = {}
+    for *group, price in middle:
+        prices.setdefault(tuple(group), []).append(Decimal(str(price)))
+    return {group: sum(values) / len(values) for group, values in prices.items()}
+
+def price_comparison(queryset, limit):
+    """
+    Min, median and max price of the stock in `queryset` per medicine, manufacturer and
+    pincode region, cheapest first within each medicine. Two queries: a grouped aggregate
+    and the window query for the medians.
+    """
+    offers = _offers(queryset)
+    groups = list(offers.values(
+        *GROUP_FIELDS, 'medicine__medicine_name', 'manufacturer__manufacturer_name'
+    ).annotate(
+        offers=Count('pk'),
+        pharmacies=Count('pharmacy', distinct=True),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    ).order_by('medicine_id', 'min_price', 'manufacturer_id', 'region')[:limit])
+    if not groups:
+        return []
+
+    medians = _medians(offers.filter(medicine_id__in={group['medicine_id'] for group in groups}))
+    return [{
+        'medicine_id': group['medicine_id'],
+        'medicine_name': group['medicine__medicine_name'],
+        'manufacturer_id': group['manufacturer_id'],
+        'manufacturer_name': group['manufacturer__manufacturer_name'],
+        'region': group['region'],
+        'offers': group['offers'],
+        'pharmacies': group['pharmacies'],
+        'min_price': str(Decimal(str(group['min_price'])).quantize(CENTS)),
+        'median_price': str(medians[tuple(group[field] for field in GROUP_FIELDS)].quantize(CENTS)),
+        'max_price': str(Decimal(str(group['max_price'])).quantize(CENTS)),
+    } for group in groups]
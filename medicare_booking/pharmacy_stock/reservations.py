@@ -0,0 +1,121 @@
+import datetime
+import heapq
+import threading
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from medicare_booking.table_versions import bump_table_version
+from .models import COMMITTED, EXPIRED, HELD, RELEASED, Pharmacy_Medicine, StockReservation
+from .summary import refresh_summaries, stock_groups
+
+DEFAULT_HOLD_SECONDS = 15 * 60
+MAX_HOLD_SECONDS = 24 * 60 * 60
+
+def _take(stock_id, quantity):
+    """
+    Decrements stock with a single conditional UPDATE. The stock_quantity >= quantity guard
+    is checked by the database on the row being written, so concurrent sales can't oversell
+    or overwrite each other. Returns False when there isn't enough available stock.
+    """
+    return bool(Pharmacy_Medicine.objects.filter(
+        pk=stock_id, is_available=True, stock_quantity__gte=quantity
+    ).update(stock_quantity=F('stock_quantity') - quantity))
+
+def _stock_changed(stock_id):
+    # update() skips the save signals that maintain the summary and table version
+    refresh_summaries(stock_groups(Pharmacy_Medicine.objects.filter(pk=stock_id)))
+    bump_table_version(Pharmacy_Medicine)
+
+def dispense_stock(stock_id, quantity):
+    """Sells `quantity` units straight away (no hold). Returns False if stock is short."""
+    with transaction.atomic():
+        if not _take(stock_id, quantity):
+            return False
+        _stock_changed(stock_id)
+    return True
+
+def reserve_stock(stock_id, quantity, hold_seconds=DEFAULT_HOLD_SECONDS):
+    """
+    Holds `quantity` units for `hold_seconds`. The units leave stock_quantity now and come
+    back if the hold is released or expires before it is committed.
+    :return: The StockReservation, or None if stock is short.
+    """
+    sweeper.sweep()
+    with transaction.atomic():
+        if not _take(stock_id, quantity):
+            return None
+        reservation = StockReservation.objects.create(
+            stock_id=stock_id,
+            quantity=quantity,
+            expires_at=timezone.now() + datetime.timedelta(seconds=hold_seconds),
+        )
+        _stock_changed(stock_id)
+        transaction.on_commit(lambda: sweeper.push(reservation.expires_at, reservation.pk))
+    return reservation
+
+def commit_reservation(reservation_id):
+    """
+    Turns a hold into a sale. Returns False if the hold is no longer held (released, committed)
+    or has run past expires_at, even if no sweep has expired it yet.
+    """
+    return bool(StockReservation.objects.filter(
+        pk=reservation_id, status=HELD, expires_at__gt=timezone.now()
+    ).update(status=COMMITTED))
+
+def release_reservation(reservation_id, status=RELEASED):
+    """Puts a held reservation's units back into stock. Returns False if it wasn't held."""
+    with transaction.atomic():
+        reservation = StockReservation.objects.filter(pk=reservation_id, status=HELD).values('stock_id', 'quantity').first()
+        # Conditional on the status, so a concurrent commit or release wins exactly once
+        if reservation is None or not StockReservation.objects.filter(pk=reservation_id, status=HELD).update(status=status):
+            return False
+        Pharmacy_Medicine.objects.filter(pk=reservation['stock_id']).update(
+            stock_quantity=F('stock_quantity') + reservation['quantity']
+        )
+        _stock_changed(reservation['stock_id'])
+    return True
+
+def release_expired_holds(now=None):
+    """Expires every overdue hold in the database, for the periodic command. Returns the count."""
+    overdue = StockReservation.objects.filter(status=HELD, expires_at__lte=now or timezone.now())
+    return sum(release_reservation(pk, EXPIRED) for pk in list(overdue.values_list('pk', flat=True)))
+
+class HoldSweeper:
+    """
+    Min-heap of (expires_at, reservation_id) for holds made by this process (plus those
+    held at startup). sweep() only pops due entries, so checking for expired holds on every
+    reservation costs nothing until one is actually due.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = None
+
+    def _ensure_loaded(self):
+        if self._heap is None:
+            with self._lock:
+                if self._heap is None:
+                    heap = list(StockReservation.objects.filter(status=HELD).values_list('expires_at', 'pk'))
+                    heapq.heapify(heap)
+                    self._heap = heap
+
+    def push(self, expires_at, reservation_id):
+        with self._lock:
+            if self._heap is not None:
+                heapq.heappush(self._heap, (expires_at, reservation_id))
+
+    def clear(self):
+        with self._lock:
+            self._heap = None
+
+    def sweep(self, now=None):
+        """Expires the due holds still held; committed or released ones are skipped."""
+        self._ensure_loaded()
+        now = now or timezone.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return sum(release_reservation(pk, EXPIRED) for pk in due)
+
+sweeper = HoldSweeper()
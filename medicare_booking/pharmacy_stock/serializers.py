@@ -14,6 +14,28 @@ class PharmacyMedicineSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['medicine_instance_id']
 
+    # values() lookups of the fields to_representation returns, for the list fast path
+    LIST_VALUES = {
+        'medicine_instance_id': 'medicine_instance_id',
+        'medicine_name': 'medicine__medicine_name',
+        'pharmacy_name': 'pharmacy__pharmacy_name',
+        'manufacturer_name': 'manufacturer__manufacturer_name',
+        'price': 'price',
+        'stock_quantity': 'stock_quantity',
+    }
+
+    @classmethod
+    def list_data(cls, queryset):
+        """
+        Same output as serializing `queryset` with many=True, built from a single joined
+        values() query without instantiating models. Keep in step with to_representation.
+        """
+        rows = queryset.values_list(*cls.LIST_VALUES.values())
+        data = [dict(zip(cls.LIST_VALUES, row)) for row in rows]
+        for item in data:
+            item['price'] = str(item['price'])
+        return data
+
     def to_representation(self, instance):
         return {
             'medicine_instance_id': instance.medicine_instance_id,
@@ -0,0 +1,55 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from manufacturers.models import Manufacturer
+from medicare_booking.table_versions import bump_table_version
+from medicines.models import Medicine
+from pharmacies.models import Pharmacy
+from .models import Pharmacy_Medicine
+from .summary import refresh_summaries, stock_groups
+
+@receiver(pre_save, sender=Pharmacy_Medicine)
+def remember_stock_group(sender, instance, **kwargs):
+    # The stored row may belong to another medicine or pharmacy than the edited one
+    instance._previous_groups = set() if instance._state.adding else stock_groups(
+        Pharmacy_Medicine.objects.filter(pk=instance.pk)
+    )
+
+@receiver(post_save, sender=Pharmacy_Medicine)
+def refresh_summary_on_save(sender, instance, **kwargs):
+    current = (instance.medicine_id, instance.pharmacy.pincode)
+    refresh_summaries(getattr(instance, '_previous_groups', set()) | {current})
+
+@receiver(pre_delete, sender=Pharmacy_Medicine)
+def remember_deleted_group(sender, instance, **kwargs):
+    # Read now: when a pharmacy is deleted its row is gone by post_delete
+    instance._previous_groups = stock_groups(Pharmacy_Medicine.objects.filter(pk=instance.pk))
+
+@receiver(post_delete, sender=Pharmacy_Medicine)
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    refresh_summaries(getattr(instance, '_previous_groups', set()))
+
+@receiver(pre_save, sender=Pharmacy)
+def remember_pharmacy_pincode(sender, instance, **kwargs):
+    instance._previous_pincode = None if instance._state.adding else (
+        Pharmacy.objects.filter(pk=instance.pk).values_list('pincode', flat=True).first()
+    )
+
+@receiver(post_save, sender=Pharmacy)
+def move_summaries_with_pharmacy(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_pincode', None)
+    if created or previous is None or previous == instance.pincode:
+        return
+    medicine_ids = set(Pharmacy_Medicine.objects.filter(pharmacy=instance).values_list('medicine_id', flat=True))
+    refresh_summaries({(medicine_id, pincode) for medicine_id in medicine_ids for pincode in (previous, instance.pincode)})
+
+@receiver(post_save, sender=Pharmacy_Medicine)
+@receiver(post_delete, sender=Pharmacy_Medicine)
+@receiver(post_save, sender=Pharmacy)
+@receiver(post_delete, sender=Pharmacy)
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_save, sender=Manufacturer)
+@receiver(post_delete, sender=Manufacturer)
+def bump_stock_table_versions(sender, instance, **kwargs):
+    # Cached price comparisons are keyed on these tables' versions
+    bump_table_version(sender)
@@ -0,0 +1,68 @@
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from .models import MedicineAvailabilitySummary, Pharmacy_Medicine
+
+# Groups refreshed per aggregate query
+CHUNK_SIZE = 200
+SUMMARY_FIELDS = ['pharmacy_count', 'min_price', 'total_stock']
+
+def available_stock():
+    return Pharmacy_Medicine.objects.filter(is_available=True, stock_quantity__gt=0)
+
+def _aggregate(queryset):
+    return queryset.values('medicine_id', pincode=F('pharmacy__pincode')).annotate(
+        pharmacy_count=Count('pharmacy', distinct=True),
+        min_price=Min('price'),
+        total_stock=Sum('stock_quantity'),
+    ).order_by()
+
+def refresh_summaries(groups):
+    """
+    Recomputes the summary rows of the given (medicine_id, pincode) groups from the
+    stock table: one grouped query and one upsert per chunk of groups. Groups without
+    available stock lose their row.
+    Call it inside the transaction that changed the stock.
+    """
+    groups = list(set(groups))
+    for start in range(0, len(groups), CHUNK_SIZE):
+        chunk = set(groups[start:start + CHUNK_SIZE])
+        medicine_ids = {medicine_id for medicine_id, _ in chunk}
+        pincodes = {pincode for _, pincode in chunk}
+        rows = _aggregate(available_stock().filter(medicine_id__in=medicine_ids, pharmacy__pincode__in=pincodes))
+        summaries = [
+            MedicineAvailabilitySummary(**row)
+            for row in rows if (row['medicine_id'], row['pincode']) in chunk
+        ]
+        with transaction.atomic():
+            MedicineAvailabilitySummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['medicine', 'pincode'],
+                update_fields=SUMMARY_FIELDS,
+            )
+            emptied = chunk - {(summary.medicine_id, summary.pincode) for summary in summaries}
+            if emptied:
+                MedicineAvailabilitySummary.objects.filter(reduce(or_, (
+                    Q(medicine_id=medicine_id, pincode=pincode) for medicine_id, pincode in emptied
+                ))).delete()
+
+def stock_groups(queryset):
+    """The (medicine_id, pincode) groups touched by a queryset of Pharmacy_Medicine."""
+    return set(queryset.values_list('medicine_id', 'pharmacy__pincode').distinct())
+
+def rebuild_summaries(batch_size=1000):
+    """Recomputes the whole summary table from the stock table."""
+    with transaction.atomic():
+        MedicineAvailabilitySummary.objects.all().delete()
+        batch = []
+        created = 0
+        for row in _aggregate(available_stock()).iterator():
+            batch.append(MedicineAvailabilitySummary(**row))
+            if len(batch) >= batch_size:
+                MedicineAvailabilitySummary.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        MedicineAvailabilitySummary.objects.bulk_create(batch)
+        return created + len(batch)
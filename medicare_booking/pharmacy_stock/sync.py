@@ -0,0 +1,149 @@
+import datetime
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from manufacturers.models import Manufacturer
+from medicare_booking.table_versions import bump_table_version
+from medicare_booking.utils import generate_custom_ids
+from medicines.models import Medicine
+from .models import Pharmacy_Medicine
+from .summary import refresh_summaries
+
+BATCH_SIZE = 500
+SYNCED_FIELDS = ['price', 'stock_quantity', 'is_available']
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+PRICE_FIELD = Pharmacy_Medicine._meta.get_field('price')
+CENTS = Decimal('0.01')
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+def _parse_price(value):
+    """Price rounded to cents; rejects NaN, Infinity and prices the column can't hold."""
+    too_long = ValidationError(f"price: Ensure that there are no more than {PRICE_FIELD.max_digits} digits in total.")
+    try:
+        price = PRICE_FIELD.to_python(str(value).strip())
+    except ValidationError:
+        raise ValidationError(f"price: Invalid value {value}")
+    try:
+        price = price.quantize(CENTS)
+    except InvalidOperation:
+        raise too_long
+    try:
+        PRICE_FIELD.run_validators(price)
+    except ValidationError:
+        raise too_long
+    return price
+
+def parse_rows(records):
+    """
+    Validates sync records (dicts from JSON or CSV) into rows keyed by
+    (medicine_id, manufacturer_id, expiry_date).
+    is_available defaults to stock_quantity > 0 and not expired.
+    :return: (rows, errors) where errors is a list of {'row': index, 'error': message}.
+    """
+    rows = {}
+    errors = []
+    for index, record in enumerate(records, start=1):
+        try:
+            if not isinstance(record, dict):
+                raise ValueError("Expected an object")
+            medicine_id = str(record['medicine_id']).strip()
+            manufacturer_id = str(record['manufacturer_id']).strip()
+            expiry_date = datetime.date.fromisoformat(str(record['expiry_date']).strip())
+            price = _parse_price(record['price'])
+            stock_quantity = int(record['stock_quantity'])
+            if price < 0 or stock_quantity < 0:
+                raise ValueError("price and stock_quantity can't be negative")
+            available = record.get('is_available')
+            if available in (None, ''):
+                is_available = stock_quantity > 0 and expiry_date >= datetime.date.today()
+            else:
+                is_available = _parse_bool(available)
+        except KeyError as e:
+            errors.append({'row': index, 'error': f"Missing field {e.args[0]}"})
+            continue
+        except ValidationError as e:
+            errors.append({'row': index, 'error': e.messages[0]})
+            continue
+        except (TypeError, ValueError) as e:
+            errors.append({'row': index, 'error': str(e) or "Invalid value"})
+            continue
+
+        key = (medicine_id, manufacturer_id, expiry_date)
+        if key in rows:
+            errors.append({'row': index, 'error': "Duplicate medicine_id, manufacturer_id, expiry_date"})
+            continue
+        rows[key] = {'price': price, 'stock_quantity': stock_quantity, 'is_available': is_available}
+    return rows, errors
+
+def unknown_references(rows):
+    """Medicine and manufacturer IDs in the rows that don't exist, two queries in total."""
+    medicine_ids = {medicine_id for medicine_id, _, _ in rows}
+    manufacturer_ids = {manufacturer_id for _, manufacturer_id, _ in rows}
+    known_medicines = set(Medicine.objects.filter(pk__in=medicine_ids).values_list('pk', flat=True))
+    known_manufacturers = set(Manufacturer.objects.filter(pk__in=manufacturer_ids).values_list('pk', flat=True))
+    return {
+        'medicine_ids': sorted(medicine_ids - known_medicines),
+        'manufacturer_ids': sorted(manufacturer_ids - known_manufacturers),
+    }
+
+def sync_pharmacy_stock(pharmacy, rows, deactivate_missing=False):
+    """
+    Upserts a pharmacy's stock from parsed rows: reads the current rows once, then writes
+    only what changed with bulk_create/bulk_update in batches.
+    Bulk writes skip the Pharmacy_Medicine save signals, so the availability summary
+    and the stock table version are updated here.
+    :param deactivate_missing: Mark stock the rows don't mention as out of stock.
+    :return: (created, updated, deactivated) lists of Pharmacy_Medicine.
+    """
+    with transaction.atomic():
+        current = {
+            (stock.medicine_id, stock.manufacturer_id, stock.expiry_date): stock
+            for stock in Pharmacy_Medicine.objects.select_for_update().filter(pharmacy=pharmacy)
+        }
+
+        created, updated = [], []
+        for key, values in rows.items():
+            stock = current.get(key)
+            if stock is None:
+                medicine_id, manufacturer_id, expiry_date = key
+                created.append(Pharmacy_Medicine(
+                    pharmacy=pharmacy,
+                    medicine_id=medicine_id,
+                    manufacturer_id=manufacturer_id,
+                    expiry_date=expiry_date,
+                    **values
+                ))
+            elif any(getattr(stock, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stock, field, value)
+                updated.append(stock)
+
+        deactivated = []
+        if deactivate_missing:
+            for key, stock in current.items():
+                if key not in rows and (stock.is_available or stock.stock_quantity):
+                    stock.is_available = False
+                    stock.stock_quantity = 0
+                    deactivated.append(stock)
+
+        ids = generate_custom_ids(Pharmacy_Medicine, 'medicine_instance_id', 'PHME', len(created))
+        for stock, medicine_instance_id in zip(created, ids):
+            stock.medicine_instance_id = medicine_instance_id
+        Pharmacy_Medicine.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        Pharmacy_Medicine.objects.bulk_update(updated + deactivated, SYNCED_FIELDS, batch_size=BATCH_SIZE)
+        refresh_summaries({(stock.medicine_id, pharmacy.pincode) for stock in created + updated + deactivated})
+        if created or updated or deactivated:
+            bump_table_version(Pharmacy_Medicine)
+    return created, updated, deactivated
@@ -1,3 +1,519 @@
-from django.test import TestCase
+import datetime
+import random
+import statistics
+import threading
+import uuid
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from geodata.models import PincodeCentroid
+from geodata.spatial_index import index_for
+from manufacturers.models import Manufacturer
+from medicines.models import Medicine
+from pharmacies.models import Pharmacy
+from .models import COMMITTED, EXPIRED, HELD, RELEASED, MedicineAvailabilitySummary, Pharmacy_Medicine, StockReservation
+from .expiry import sweep_expired_stock
+from .reservations import sweeper
+from .serializers import PharmacyMedicineSerializer
 
-# Create your tests here.
+EXPIRY = datetime.date.today() + datetime.timedelta(days=365)
+
+class StockFixtureMixin:
+    """Four pharmacies in two pincode regions, each stocking every medicine."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pharmacies = [
+            Pharmacy.objects.create(pharmacy_name=f'Pharmacy {i}', pincode=pincode, district='Chennai', state='TN', contact='1')
+            for i, pincode in enumerate([600001, 600040, 641001, 641002])
+        ]
+        cls.medicines = [
+            Medicine.objects.create(medicine_name=name, description='', dosage_form='Tablet')
+            for name in ('Paracetamol 500', 'Cetirizine')
+        ]
+        cls.manufacturers = [Manufacturer.objects.create(manufacturer_name=name) for name in ('Cipla', 'Sun')]
+        cls.stock = [
+            Pharmacy_Medicine.objects.create(
+                pharmacy=pharmacy,
+                medicine=medicine,
+                manufacturer=cls.manufacturers[(i + j) % 2],
+                price=Decimal(10 + i * 3 + j),
+                stock_quantity=20,
+                expiry_date=EXPIRY,
+            )
+            for i, pharmacy in enumerate(cls.pharmacies)
+            for j, medicine in enumerate(cls.medicines)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+class PharmacyStockSyncTests(StockFixtureMixin, TestCase):
+
+    def url(self, pharmacy=None):
+        return f'/api/v1/pharmacy-stock/sync/{(pharmacy or self.pharmacies[0]).pk}/'
+
+    def item(self, medicine, price='12.50', stock_quantity=5, manufacturer=None, expiry_date=EXPIRY):
+        return {
+            'medicine_id': medicine.pk,
+            'manufacturer_id': (manufacturer or self.manufacturers[0]).pk,
+            'expiry_date': expiry_date.isoformat(),
+            'price': price,
+            'stock_quantity': stock_quantity,
+        }
+
+    def test_upserts_only_what_changed(self):
+        later = EXPIRY + datetime.timedelta(days=30)
+        items = [
+            self.item(self.medicines[0], manufacturer=self.manufacturers[0], price='99.00'),
+            self.item(self.medicines[1], manufacturer=self.manufacturers[1], price=str(self.stock[1].price), stock_quantity=20),
+            self.item(self.medicines[0], expiry_date=later),
+        ]
+        response = self.client.post(self.url(), {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'created': 1, 'updated': 1, 'deactivated': 0, 'unchanged': 1})
+        self.assertEqual(Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).price, Decimal('99.00'))
+
+        repeat = self.client.post(self.url(), {'items': items}, format='json')
+        self.assertEqual(repeat.data, {'created': 0, 'updated': 0, 'deactivated': 0, 'unchanged': 3})
+
+    def test_deactivate_missing_marks_unlisted_stock_out_of_stock(self):
+        items = [self.item(self.medicines[0], manufacturer=self.manufacturers[0])]
+        response = self.client.post(self.url(), {'items': items, 'deactivate_missing': True}, format='json')
+        self.assertEqual(response.data['deactivated'], 1)
+        unlisted = Pharmacy_Medicine.objects.get(pk=self.stock[1].pk)
+        self.assertFalse(unlisted.is_available)
+        self.assertEqual(unlisted.stock_quantity, 0)
+
+    def test_csv_body(self):
+        body = (
+            'medicine_id,manufacturer_id,expiry_date,price,stock_quantity\n'
+            f'{self.medicines[0].pk},{self.manufacturers[0].pk},{EXPIRY.isoformat()},15.00,7\n'
+        )
+        response = self.client.post(self.url(), body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+
+    def test_invalid_prices_are_reported_per_row_and_nothing_is_written(self):
+        prices = ['1e20', 'NaN', 'Infinity', '-Infinity', 'abc', '100000000', '-1']
+        items = [
+            self.item(self.medicines[0], manufacturer=self.manufacturers[0], price=price, expiry_date=EXPIRY + datetime.timedelta(days=i))
+            for i, price in enumerate(prices)
+        ]
+        response = self.client.post(self.url(), {'items': items}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['rows']], list(range(1, len(prices) + 1)))
+        for error in response.data['rows']:
+            self.assertNotIn('InvalidOperation', error['error'])
+        self.assertEqual(Pharmacy_Medicine.objects.count(), len(self.stock))
+
+        # The stock endpoints still serialize every price
+        self.assertEqual(self.client.get('/api/v1/pharmacy-stock/').status_code, 200)
+
+    def test_missing_fields_and_unknown_references(self):
+        response = self.client.post(self.url(), {'items': [{'medicine_id': self.medicines[0].pk}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing field', response.data['rows'][0]['error'])
+
+        unknown = self.item(self.medicines[0])
+        unknown['medicine_id'] = 'MED999'
+        response = self.client.post(self.url(), {'items': [unknown]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['medicine_ids'], ['MED999'])
+
+    def test_retry_with_the_same_idempotency_key_is_replayed(self):
+        key = str(uuid.uuid4())
+        items = [self.item(self.medicines[0], expiry_date=EXPIRY + datetime.timedelta(days=1))]
+        first = self.client.post(self.url(), {'items': items}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        self.assertEqual(first.data['created'], 1)
+
+        with self.assertNumQueries(0):
+            retry = self.client.post(self.url(), {'items': items}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Pharmacy_Medicine.objects.count(), len(self.stock) + 1)
+
+    def test_uploads_are_fingerprinted_by_content(self):
+        key = str(uuid.uuid4())
+        header = 'medicine_id,manufacturer_id,expiry_date,price,stock_quantity\n'
+
+        def upload(price):
+            row = f'{self.medicines[0].pk},{self.manufacturers[0].pk},{EXPIRY.isoformat()},{price},7\n'
+            return self.client.post(self.url(), {'file': SimpleUploadedFile('stock.csv', (header + row).encode())}, format='multipart', HTTP_IDEMPOTENCY_KEY=key)
+
+        self.assertEqual(upload('15.00').status_code, 200)
+        self.assertEqual(upload('15.00')['Idempotent-Replayed'], 'true')
+        self.assertEqual(upload('16.00').status_code, 422)
+        self.assertEqual(Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).price, Decimal('15.00'))
+
+    def test_unknown_pharmacy(self):
+        response = self.client.post('/api/v1/pharmacy-stock/sync/PH999/', {'items': [self.item(self.medicines[0])]}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+class PharmacyStockListTests(StockFixtureMixin, TestCase):
+    url = '/api/v1/pharmacy-stock/'
+
+    def test_list_is_one_query_with_names_joined(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), len(self.stock))
+        row = next(row for row in response.data if row['medicine_instance_id'] == self.stock[0].pk)
+        self.assertEqual(row['pharmacy_name'], self.pharmacies[0].pharmacy_name)
+        self.assertEqual(row['medicine_name'], self.medicines[0].medicine_name)
+        self.assertEqual(row['manufacturer_name'], self.manufacturers[0].manufacturer_name)
+
+    def test_matches_the_model_serializer(self):
+        queryset = Pharmacy_Medicine.objects.order_by('pk')
+        self.assertEqual(PharmacyMedicineSerializer.list_data(queryset), PharmacyMedicineSerializer(queryset, many=True).data)
+
+    def test_filters_by_pharmacy(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'pharmacy': self.pharmacies[1].pk})
+        self.assertEqual(
+            sorted(row['medicine_instance_id'] for row in response.data),
+            sorted(stock.pk for stock in self.stock if stock.pharmacy_id == self.pharmacies[1].pk),
+        )
+
+class PriceComparisonTests(StockFixtureMixin, TestCase):
+    url = '/api/v1/pharmacy-stock/prices/'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Groups of every size from 1 to 6 rows, plus stock the comparison must skip
+        rng = random.Random(20)
+        for i in range(24):
+            Pharmacy_Medicine.objects.create(
+                pharmacy=Pharmacy.objects.create(pharmacy_name=f'Extra {i}', pincode=rng.choice([600100, 641500, 560001]), district='X', state='TN', contact='1'),
+                medicine=cls.medicines[i % 2],
+                manufacturer=cls.manufacturers[rng.randrange(2)],
+                price=Decimal(rng.randrange(100, 10000)) / 100,
+                stock_quantity=0 if i % 7 == 0 else 5,
+                expiry_date=EXPIRY if i % 5 else datetime.date.today() - datetime.timedelta(days=1),
+            )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def brute_force(self, medicine, region=None):
+        groups = {}
+        for stock in Pharmacy_Medicine.objects.select_related('pharmacy').filter(medicine=medicine):
+            if not stock.is_available or stock.stock_quantity <= 0 or stock.expiry_date < datetime.date.today():
+                continue
+            if region is not None and stock.pharmacy.pincode // 1000 != region:
+                continue
+            groups.setdefault((stock.manufacturer_id, stock.pharmacy.pincode // 1000), []).append(stock)
+        return {
+            group: {
+                'offers': len(rows),
+                'min_price': str(min(row.price for row in rows).quantize(Decimal('0.01'))),
+                'median_price': str(statistics.median(row.price for row in rows).quantize(Decimal('0.01'))),
+                'max_price': str(max(row.price for row in rows).quantize(Decimal('0.01'))),
+            }
+            for group, rows in groups.items()
+        }
+
+    def compared(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {
+            (row['manufacturer_id'], row['region']): {field: row[field] for field in ('offers', 'min_price', 'median_price', 'max_price')}
+            for row in response.data
+        }
+
+    def test_medians_match_brute_force(self):
+        sizes = {group['offers'] for medicine in self.medicines for group in self.brute_force(medicine).values()}
+        # Odd groups take the middle row, even ones average the middle two
+        self.assertEqual({size % 2 for size in sizes if size > 1}, {0, 1})
+        for medicine in self.medicines:
+            with self.subTest(medicine=medicine.pk):
+                with self.assertNumQueries(2):
+                    response = self.client.get(self.url, {'medicine_id': medicine.pk})
+                expected = self.brute_force(medicine)
+                self.assertGreater(len(expected), 3)
+                self.assertEqual(self.compared(response), expected)
+
+    def test_pincode_limits_to_its_region(self):
+        response = self.client.get(self.url, {'medicine_name': self.medicines[0].medicine_name, 'pincode': 600123})
+        self.assertTrue(response.data)
+        self.assertEqual(self.compared(response), self.brute_force(self.medicines[0], region=600))
+
+    def test_cached_until_stock_changes(self):
+        params = {'medicine_id': self.medicines[0].pk}
+        self.client.get(self.url, params)
+        with self.assertNumQueries(0):
+            self.client.get(self.url, params)
+
+        stock = Pharmacy_Medicine.objects.get(pk=self.stock[0].pk)
+        stock.price = Decimal('1.00')
+        stock.save()
+        response = self.client.get(self.url, params)
+        self.assertEqual(self.compared(response), self.brute_force(self.medicines[0]))
+
+    def test_requires_a_medicine(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'medicine_id': self.medicines[0].pk, 'pincode': 'x'}).status_code, 400)
+
+class StockReservationTests(StockFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        sweeper.clear()
+
+    def reserve(self, stock, quantity, **extra):
+        return self.client.post(f'/api/v1/pharmacy-stock/{stock.pk}/reserve/', {'quantity': quantity, **extra}, format='json')
+
+    def act(self, reservation_id, operation):
+        return self.client.post(f'/api/v1/pharmacy-stock/reservations/{reservation_id}/{operation}/')
+
+    def stock_quantity(self, stock):
+        return Pharmacy_Medicine.objects.get(pk=stock.pk).stock_quantity
+
+    def test_hold_then_commit_sells_the_units(self):
+        response = self.reserve(self.stock[0], 5)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 15)
+
+        self.assertEqual(self.act(response.data['reservation_id'], 'commit').status_code, 200)
+        self.assertEqual(StockReservation.objects.get(pk=response.data['reservation_id']).status, COMMITTED)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 15)
+        self.assertEqual(self.act(response.data['reservation_id'], 'release').status_code, 409)
+
+    def test_release_puts_the_units_back(self):
+        reservation_id = self.reserve(self.stock[0], 5).data['reservation_id']
+        self.assertEqual(self.act(reservation_id, 'release').status_code, 200)
+        self.assertEqual(StockReservation.objects.get(pk=reservation_id).status, RELEASED)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 20)
+        self.assertEqual(self.act(reservation_id, 'commit').status_code, 409)
+
+    def test_overdue_hold_cannot_be_committed(self):
+        reservation_id = self.reserve(self.stock[0], 5).data['reservation_id']
+        StockReservation.objects.filter(pk=reservation_id).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.assertEqual(self.act(reservation_id, 'commit').status_code, 410)
+        self.assertEqual(StockReservation.objects.get(pk=reservation_id).status, EXPIRED)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 20)
+        self.assertEqual(self.act(reservation_id, 'commit').status_code, 410)
+
+    def test_due_holds_are_swept_on_the_next_reservation(self):
+        reservation_id = self.reserve(self.stock[0], 5).data['reservation_id']
+        sweeper.clear()
+        StockReservation.objects.filter(pk=reservation_id).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.reserve(self.stock[1], 1)
+        self.assertEqual(StockReservation.objects.get(pk=reservation_id).status, EXPIRED)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 20)
+
+    def test_short_stock_and_unknown_stock(self):
+        self.assertEqual(self.reserve(self.stock[0], 21).status_code, 409)
+        self.assertEqual(self.client.post('/api/v1/pharmacy-stock/PHME999/reserve/', {'quantity': 1}, format='json').status_code, 404)
+        self.assertEqual(self.client.post('/api/v1/pharmacy-stock/PHME999/dispense/', {'quantity': 1}, format='json').status_code, 404)
+        self.assertEqual(self.act('missing', 'commit').status_code, 404)
+        self.assertEqual(self.stock_quantity(self.stock[0]), 20)
+
+class ConcurrentStockReservationTests(StockFixtureMixin, TransactionTestCase):
+    """Requests race on separate threads, each with its own database connection."""
+    workers = 8
+
+    def setUp(self):
+        self.setUpTestData()
+        super().setUp()
+        sweeper.clear()
+
+    def race(self, request):
+        barrier = threading.Barrier(self.workers)
+        results = [None] * self.workers
+
+        def run(i):
+            try:
+                barrier.wait()
+                results[i] = request(APIClient(), i).status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_holds_never_oversell(self):
+        stock = self.stock[0]
+        results = self.race(lambda client, i: client.post(f'/api/v1/pharmacy-stock/{stock.pk}/reserve/', {'quantity': 3}, format='json'))
+
+        self.assertEqual(sorted(results), [201] * 6 + [409] * 2)
+        self.assertEqual(Pharmacy_Medicine.objects.get(pk=stock.pk).stock_quantity, 2)
+        self.assertEqual(StockReservation.objects.filter(stock=stock, status=HELD).count(), 6)
+
+    def test_concurrent_commit_and_release_of_one_hold_settle_once(self):
+        reservation_id = APIClient().post(f'/api/v1/pharmacy-stock/{self.stock[0].pk}/reserve/', {'quantity': 5}, format='json').data['reservation_id']
+        operations = ['commit', 'release'] * (self.workers // 2)
+        results = self.race(lambda client, i: client.post(f'/api/v1/pharmacy-stock/reservations/{reservation_id}/{operations[i]}/'))
+
+        self.assertEqual(sorted(results), [200] + [409] * (self.workers - 1))
+        status = StockReservation.objects.get(pk=reservation_id).status
+        self.assertEqual(Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).stock_quantity, 15 if status == COMMITTED else 20)
+
+class MedicineAvailabilityTests(StockFixtureMixin, TestCase):
+    centroids = {600001: (13.08, 80.27), 600040: (13.08, 80.21), 641001: (11.00, 76.96), 641002: (11.02, 76.98)}
+
+    @classmethod
+    def setUpTestData(cls):
+        # Centroids first, so the pharmacies are saved with their geohash
+        PincodeCentroid.objects.bulk_create(
+            PincodeCentroid(pincode=pincode, latitude=latitude, longitude=longitude)
+            for pincode, (latitude, longitude) in cls.centroids.items()
+        )
+        super().setUpTestData()
+
+    def setUp(self):
+        super().setUp()
+        # The process-wide index may hold rows of other tests
+        index_for(Pharmacy).clear()
+
+    def url(self, pincode=600001):
+        return f'/api/v1/pharmacy-stock/medicine/{pincode}/'
+
+    def test_blank_medicine_names_are_rejected(self):
+        for name in ('', '   '):
+            with self.subTest(name=name):
+                self.assertEqual(self.client.get(self.url(), {'medicine_name': name}).status_code, 400)
+                self.assertEqual(self.client.get('/api/v1/pharmacy-stock/summary/600001/', {'medicine_name': name}).status_code, 400)
+
+    def found(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['medicine_instance_id'] for row in response.data]
+
+    def test_pages_are_ranked_by_pincode_distance_in_one_query(self):
+        medicine = self.medicines[0]
+        expected = [stock.pk for stock in sorted(
+            (stock for stock in self.stock if stock.medicine_id == medicine.pk),
+            key=lambda stock: (abs(stock.pharmacy.pincode - 641002), stock.pk),
+        )]
+        with self.assertNumQueries(1):
+            first = self.found(self.client.get(self.url(641002), {'medicine_name': medicine.medicine_name, 'limit': 3}))
+        rest = self.found(self.client.get(self.url(641002), {'medicine_name': medicine.medicine_name, 'limit': 3, 'offset': 3}))
+        self.assertEqual(first + rest, expected)
+
+    def test_radius_search_ranks_by_kilometres(self):
+        medicine = self.medicines[1]
+        stock_at = {stock.pharmacy.pincode: stock.pk for stock in self.stock if stock.medicine_id == medicine.pk}
+        nearby = self.found(self.client.get(self.url(600001), {'medicine_name': medicine.medicine_name, 'radius_km': 50}))
+        self.assertEqual(nearby, [stock_at[600001], stock_at[600040]])
+
+        # Chennai is over 400 km away; the radius is capped at max_radius_km
+        capped = self.found(self.client.get(self.url(641002), {'medicine_name': medicine.medicine_name, 'radius_km': 1000}))
+        self.assertEqual(capped, [stock_at[641002], stock_at[641001]])
+
+    def test_swept_stock_is_no_longer_offered(self):
+        medicine = self.medicines[0]
+        stock = [row for row in self.stock if row.medicine_id == medicine.pk]
+        params = {'medicine_name': medicine.medicine_name, 'limit': 100}
+        self.assertEqual(sorted(self.found(self.client.get(self.url(), params))), sorted(row.pk for row in stock))
+        Pharmacy_Medicine.objects.filter(pk=stock[0].pk).update(expiry_date=datetime.date.today() - datetime.timedelta(days=1))
+        sweep_expired_stock()
+        self.assertEqual(sorted(self.found(self.client.get(self.url(), params))), sorted(row.pk for row in stock[1:]))
+
+    def test_invalid_radius_is_rejected_even_without_a_centroid(self):
+        for radius_km in ('-5', '0', 'nan', 'abc'):
+            for pincode in (600001, 999999):
+                with self.subTest(radius_km=radius_km, pincode=pincode):
+                    response = self.client.get(self.url(pincode), {'medicine_name': 'Cetirizine', 'radius_km': radius_km})
+                    self.assertEqual(response.status_code, 400)
+
+class StockExpiryTests(StockFixtureMixin, TestCase):
+
+    def expire(self, *stock):
+        Pharmacy_Medicine.objects.filter(pk__in=[row.pk for row in stock]).update(expiry_date=datetime.date.today() - datetime.timedelta(days=1))
+
+    def test_sweep_marks_only_expired_stock_unavailable(self):
+        self.expire(*self.stock[:3])
+        self.assertEqual(sweep_expired_stock(batch_size=2), 3)
+        self.assertEqual(
+            set(Pharmacy_Medicine.objects.filter(is_available=False).values_list('pk', flat=True)),
+            {row.pk for row in self.stock[:3]},
+        )
+        self.assertEqual(sweep_expired_stock(), 0)
+
+    def test_command(self):
+        self.expire(self.stock[0])
+        out = StringIO()
+        call_command('sweep_expired_stock', '--dry-run', stdout=out)
+        self.assertIn('1 expired stock rows', out.getvalue())
+        self.assertTrue(Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).is_available)
+
+        out = StringIO()
+        call_command('sweep_expired_stock', '--batch-size', '10', stdout=out)
+        self.assertIn('Marked 1 expired stock rows unavailable', out.getvalue())
+        self.assertFalse(Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).is_available)
+        with self.assertRaisesMessage(CommandError, '--batch-size must be positive'):
+            call_command('sweep_expired_stock', '--batch-size', '0')
+
+class AvailabilitySummaryTests(StockFixtureMixin, TestCase):
+
+    def summaries(self):
+        return {
+            (row.medicine_id, row.pincode): (row.pharmacy_count, row.min_price, row.total_stock)
+            for row in MedicineAvailabilitySummary.objects.all()
+        }
+
+    def expected(self):
+        """The summary recomputed in Python from the stock rows."""
+        groups = {}
+        for stock in Pharmacy_Medicine.objects.filter(is_available=True, stock_quantity__gt=0).select_related('pharmacy'):
+            groups.setdefault((stock.medicine_id, stock.pharmacy.pincode), []).append(stock)
+        return {
+            key: (len({stock.pharmacy_id for stock in rows}), min(stock.price for stock in rows), sum(stock.stock_quantity for stock in rows))
+            for key, rows in groups.items()
+        }
+
+    def test_fixture_is_summarized(self):
+        self.assertEqual(len(self.summaries()), len(self.stock))
+        self.assertEqual(self.summaries(), self.expected())
+
+    def test_save_refreshes_the_group(self):
+        stock = Pharmacy_Medicine.objects.get(pk=self.stock[0].pk)
+        stock.price = Decimal('1.50')
+        stock.stock_quantity = 3
+        stock.save()
+        self.assertEqual(self.summaries()[(stock.medicine_id, 600001)], (1, Decimal('1.50'), 3))
+
+        stock.stock_quantity = 0
+        stock.save()
+        self.assertNotIn((stock.medicine_id, 600001), self.summaries())
+        self.assertEqual(self.summaries(), self.expected())
+
+    def test_moving_stock_to_another_medicine_refreshes_both_groups(self):
+        stock = Pharmacy_Medicine.objects.get(pk=self.stock[0].pk)
+        stock.medicine = self.medicines[1]
+        stock.save()
+        self.assertNotIn((self.medicines[0].pk, 600001), self.summaries())
+        self.assertEqual(self.summaries()[(self.medicines[1].pk, 600001)][0], 1)
+        self.assertEqual(self.summaries(), self.expected())
+
+    def test_delete_refreshes_the_group(self):
+        Pharmacy_Medicine.objects.get(pk=self.stock[0].pk).delete()
+        self.assertEqual(self.summaries(), self.expected())
+        self.pharmacies[1].delete()
+        self.assertEqual(self.summaries(), self.expected())
+
+    def test_pharmacy_moving_pincode_moves_its_summaries(self):
+        pharmacy = Pharmacy.objects.get(pk=self.pharmacies[0].pk)
+        pharmacy.pincode = 641001
+        pharmacy.save()
+        self.assertFalse(any(pincode == 600001 for _, pincode in self.summaries()))
+        self.assertEqual(self.summaries()[(self.medicines[0].pk, 641001)][0], 2)
+        self.assertEqual(self.summaries(), self.expected())
+
+    def test_rebuild_matches_the_maintained_table(self):
+        Pharmacy_Medicine.objects.filter(pk=self.stock[0].pk).update(stock_quantity=0)
+        self.assertNotEqual(self.summaries(), self.expected())
+        call_command('rebuild_availability_summary', stdout=StringIO())
+        self.assertEqual(self.summaries(), self.expected())
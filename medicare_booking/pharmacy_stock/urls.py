@@ -7,6 +7,10 @@ router.register(r'', views.PharmacyStockViewSet)
 
 urlpatterns = [
     path('list/', views.stock_list, name='stock_list'),
+    path('prices/', views.PriceComparisonAPIView.as_view(), name='price_comparison'),
+    path('summary/<int:pincode>/', views.AvailabilitySummaryAPIView.as_view(), name='availability_summary'),
+    path('reservations/<str:reservation_id>/<str:operation>/', views.StockReservationActionAPIView.as_view(), name='stock_reservation_action'),
+    path('sync/<str:pharmacy_id>/', views.PharmacyStockSyncAPIView.as_view(), name='pharmacy_stock_sync'),
     path('medicine/<int:pincode>/', views.MedicineAvailabilityAPIView.as_view(), name='medicine_availability'),
     path('', include(router.urls)),
 ]
@@ -7,69 +7,175 @@ from rest_framework.decorators import action
 
 from rest_framework import views, status
 from rest_framework.response import Response
-from django.db.models import F, Func, Value, IntegerField
-from django.db.models.functions import Abs
+from medicare_booking.services import nearest_by_pincode, pincode_location
+from geodata.spatial_index import index_for
+from medicines.search import medicine_search_q
+from pharmacies.models import Pharmacy
+import datetime
+import heapq
 
 class MedicineAvailabilityAPIView(views.APIView):
+    """
+    Stock of a medicine nearest to a pincode, closest pharmacies first.
+    Paginated with ?limit= (default 20, at most 100) and ?offset=.
+    With ?radius_km= and a known centroid for the pincode, pharmacies are ranked by
+    kilometres instead of pincode difference.
+    """
+    default_limit = 20
+    max_limit = 100
+    max_radius_km = 200
+    # Upper bound on pharmacies considered in a kilometre search
+    max_nearby_pharmacies = 500
+
     def get(self, request, pincode):
-        medicine_name = request.query_params.get('medicine_name')
+        medicine_name = (request.query_params.get('medicine_name') or '').strip()
         if not medicine_name:
             return Response({"error": "Medicine name is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Filter by medicine name
+        try:
+            target_pincode = int(pincode)
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            offset = int(request.query_params.get('offset', 0))
+            if limit < 1 or offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Invalid pincode, limit or offset"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Filter by medicine name; pharmacy, medicine and manufacturer are joined for the serializer.
+        # (medicine, is_available, expiry_date) is indexed; the expiry bound only covers
+        # batches that expired since the last sweep_expired_stock run.
         queryset = Pharmacy_Medicine.objects.filter(
-            medicine__medicine_name__icontains=medicine_name,
+            medicine_search_q(medicine_name, prefix='medicine__'),
+            is_available=True,
+            expiry_date__gte=datetime.date.today(),
             stock_quantity__gt=0 # Only show available stock
-        )
+        ).select_related('pharmacy', 'medicine', 'manufacturer')
+
+        radius_km = request.query_params.get('radius_km')
+        if radius_km:
+            try:
+                radius_km = min(float(radius_km), self.max_radius_km)
+                # Also rejects NaN
+                if not radius_km > 0:
+                    raise ValueError
+            except ValueError:
+                return Response({"error": "radius_km must be a positive number"}, status=status.HTTP_400_BAD_REQUEST)
+        location = pincode_location(target_pincode) if radius_km else None
+        if location:
+            # Kilometre search: nearest pharmacies from the geohash grid, then their stock of the medicine
+            distance_of = dict(index_for(Pharmacy).nearest(*location, k=self.max_nearby_pharmacies, radius_km=radius_km))
+            items = heapq.nsmallest(
+                offset + limit,
+                queryset.filter(pharmacy_id__in=distance_of),
+                key=lambda item: (distance_of[item.pharmacy_id], item.pk)
+            )[offset:]
+        else:
+            # Distance is abs(pharmacy_pincode - target_pincode), computed and sorted by the database
+            items = nearest_by_pincode(queryset, target_pincode, limit, offset, pincode_field='pharmacy__pincode')
+        serializer = SimplifiedPharmacyMedicineSerializer(items, many=True)
+        return Response(serializer.data)
+
+from django.db.models import F, Q
+from django.db.models.functions import Abs
+from .models import MedicineAvailabilitySummary
+
+class AvailabilitySummaryAPIView(views.APIView):
+    """
+    Pharmacy count, lowest price and total stock of a medicine per pincode, read from the
+    availability summary table instead of the stock rows.
+    Pass ?medicine_id= or ?medicine_name=; ?pincode_range= (default 0, at most 1000) widens
+    the lookup to pincodes within that numeric distance, nearest first.
+    """
+    max_pincode_range = 1000
+    max_results = 100
 
+    def get(self, request, pincode):
+        medicine_id = request.query_params.get('medicine_id')
+        medicine_name = (request.query_params.get('medicine_name') or '').strip()
+        if not medicine_id and not medicine_name:
+            return Response({"error": "medicine_id or medicine_name is required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            target_pincode = int(pincode)
-            # Annotate with distance: abs(pharmacy_pincode - target_pincode)
-            # We assume pincode is stored as string in model, so we might need casting if it's CharField.
-            # However, looking at previous files, it seems Pincode is often treated as Int or String. 
-            # If it's CharField, we might need Cast. Let's assume simple integer subtraction works if we cast or if it's already int.
-            # But wait, Pharmacy model has pincode. Let's check Pharmacy model if possible. 
-            # Assuming it's convertible to int.
-            
-            # Using Python for sorting to be safe with unknown DB field types (simple enough for this use case)
-            results = []
-            for item in queryset:
-                try:
-                    pharmacy_pin = int(item.pharmacy.pincode) if item.pharmacy.pincode else 0
-                    distance = abs(pharmacy_pin - target_pincode)
-                except ValueError:
-                    distance = 999999 # Treat invalid pincodes as far away
-
-                results.append({
-                    'data': item,
-                    'distance': distance
-                })
-            
-            # Sort by distance
-            results.sort(key=lambda x: x['distance'])
-            
-            # Serialize
-            sorted_items = [r['data'] for r in results]
-            serializer = SimplifiedPharmacyMedicineSerializer(sorted_items, many=True)
-            
-            # Add distance to response if needed, or just rely on order. 
-            # The simplified serializer doesn't have 'distance' field, but the order is correct.
-            # If we want to show distance in UI, we should add it to serializer or wrapper.
-            # User just asked to "sort based on shorter value", not necessarily show logic.
-            # But showing "Near You" vs "Far" is good. 
-            # For now, just returning sorted list is enough as per requirement.
-            
-            return Response(serializer.data)
+            pincode_range = min(int(request.query_params.get('pincode_range', 0)), self.max_pincode_range)
+            if pincode_range < 0:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Invalid pincode_range"}, status=status.HTTP_400_BAD_REQUEST)
+
+        summaries = MedicineAvailabilitySummary.objects.filter(
+            medicine_search_q(medicine_name, prefix='medicine__') if medicine_name else Q(medicine_id=medicine_id),
+            pincode__range=(pincode - pincode_range, pincode + pincode_range),
+        ).annotate(
+            distance=Abs(F('pincode') - pincode)
+        ).order_by('distance', 'medicine_id', 'pincode').values(
+            'medicine_id', 'medicine__medicine_name', 'pincode', 'pharmacy_count', 'min_price', 'total_stock'
+        )[:self.max_results]
+
+        return Response([{
+            'medicine_id': row['medicine_id'],
+            'medicine_name': row['medicine__medicine_name'],
+            'pincode': row['pincode'],
+            'pharmacy_count': row['pharmacy_count'],
+            'min_price': str(row['min_price']),
+            'total_stock': row['total_stock'],
+        } for row in summaries])
 
+import hashlib
+from django.core.cache import cache
+from manufacturers.models import Manufacturer
+from medicines.models import Medicine
+from medicare_booking.table_versions import table_version
+from .prices import REGION_SIZE, price_comparison
+
+class PriceComparisonAPIView(views.APIView):
+    """
+    Min, median and max price of a medicine per manufacturer and pincode region
+    (pincode // 1000), cheapest first. Pass ?medicine_id= or ?medicine_name=; ?pincode=
+    limits the comparison to that pincode's region.
+    Results are cached under the stock, pharmacy, medicine and manufacturer table versions,
+    so any write to those tables invalidates them.
+    """
+    max_groups = 200
+    cache_timeout = 10 * 60
+
+    def get(self, request):
+        medicine_id = request.query_params.get('medicine_id')
+        medicine_name = (request.query_params.get('medicine_name') or '').strip()
+        pincode = request.query_params.get('pincode')
+        if not medicine_id and not medicine_name:
+            return Response({"error": "medicine_id or medicine_name is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            region = int(pincode) // REGION_SIZE if pincode else None
         except ValueError:
-            return Response({"error": "Invalid Pincode"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"error": "Invalid pincode"}, status=status.HTTP_400_BAD_REQUEST)
+
+        versions = table_version(Pharmacy_Medicine, Pharmacy, Medicine, Manufacturer)
+        params = hashlib.sha256(f"{medicine_id}:{medicine_name.lower()}:{region}".encode()).hexdigest()
+        cache_key = f"prices:{versions}:{params}"
+        data = cache.get(cache_key)
+        if data is None:
+            stock = Pharmacy_Medicine.objects.filter(
+                medicine_search_q(medicine_name, prefix='medicine__') if medicine_name else Q(medicine_id=medicine_id)
+            )
+            if region is not None:
+                stock = stock.filter(pharmacy__pincode__gte=region * REGION_SIZE, pharmacy__pincode__lt=(region + 1) * REGION_SIZE)
+            data = price_comparison(stock, self.max_groups)
+            cache.set(cache_key, data, self.cache_timeout)
+        return Response(data)
+
+from medicare_booking.idempotency import idempotent
+from django.utils import timezone
+from .models import COMMITTED, EXPIRED, HELD, RELEASED, StockReservation
+from .reservations import (
+    DEFAULT_HOLD_SECONDS, MAX_HOLD_SECONDS, commit_reservation, dispense_stock, release_reservation, reserve_stock
+)
 
 class PharmacyStockViewSet(viewsets.ModelViewSet):
     queryset = Pharmacy_Medicine.objects.all()
     serializer_class = PharmacyMedicineSerializer
 
     def get_queryset(self):
-        queryset = Pharmacy_Medicine.objects.all()
+        # to_representation reads the pharmacy, medicine and manufacturer names
+        queryset = Pharmacy_Medicine.objects.select_related('pharmacy', 'medicine', 'manufacturer')
         pharmacy_id = self.request.query_params.get('pharmacy', None)
         pharmacy_name = self.request.query_params.get('name', None)
         
@@ -80,19 +186,148 @@ class PharmacyStockViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Rows come straight from a values() join, no model instances or per-field serializer calls
+        return Response(PharmacyMedicineSerializer.list_data(self.filter_queryset(self.get_queryset())))
+
     @action(detail=True, methods=['get'])
     def medicine(self, request, pk=None):
         pass # Not used here, it is in PharmacyViewSet
 
-from django.db.models import Q
+    @action(detail=True, methods=['post'])
+    @idempotent('stock-reserve')
+    def reserve(self, request, pk=None):
+        """Holds {"quantity": n, "hold_seconds": s} units until committed or released."""
+        try:
+            quantity = int(request.data.get('quantity', 1))
+            hold_seconds = min(int(request.data.get('hold_seconds', DEFAULT_HOLD_SECONDS)), MAX_HOLD_SECONDS)
+            if quantity < 1 or hold_seconds < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response({"error": "quantity and hold_seconds must be positive integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        reservation = reserve_stock(pk, quantity, hold_seconds)
+        if reservation is None:
+            if not Pharmacy_Medicine.objects.filter(pk=pk).exists():
+                return Response({"error": "Stock not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"error": "Not enough stock available"}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            "reservation_id": reservation.reservation_id,
+            "medicine_instance_id": pk,
+            "quantity": reservation.quantity,
+            "status": reservation.status,
+            "expires_at": reservation.expires_at,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    @idempotent('stock-dispense')
+    def dispense(self, request, pk=None):
+        """Sells {"quantity": n} units without a hold; safe against concurrent sales."""
+        try:
+            quantity = int(request.data.get('quantity', 1))
+            if quantity < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response({"error": "quantity must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not dispense_stock(pk, quantity):
+            if not Pharmacy_Medicine.objects.filter(pk=pk).exists():
+                return Response({"error": "Stock not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"error": "Not enough stock available"}, status=status.HTTP_409_CONFLICT)
+        return Response({"medicine_instance_id": pk, "dispensed": quantity})
+
+class StockReservationActionAPIView(views.APIView):
+    """POST reservations/<id>/commit/ sells the held units, reservations/<id>/release/ returns them."""
+
+    def post(self, request, reservation_id, operation):
+        if operation not in ('commit', 'release'):
+            return Response({"error": "Unknown operation"}, status=status.HTTP_404_NOT_FOUND)
+        if operation == 'commit':
+            done = commit_reservation(reservation_id)
+        else:
+            done = release_reservation(reservation_id)
+        if not done:
+            reservation = StockReservation.objects.filter(pk=reservation_id).values('status', 'expires_at').first()
+            if reservation is None:
+                return Response({"error": "Reservation not found"}, status=status.HTTP_404_NOT_FOUND)
+            if reservation['status'] == HELD and reservation['expires_at'] <= timezone.now():
+                # Overdue but not swept yet; give the units back now
+                release_reservation(reservation_id, EXPIRED)
+                reservation['status'] = EXPIRED
+            if reservation['status'] == EXPIRED:
+                return Response({"error": "Reservation has expired"}, status=status.HTTP_410_GONE)
+            return Response({"error": "Reservation is no longer held"}, status=status.HTTP_409_CONFLICT)
+        return Response({"reservation_id": reservation_id, "status": COMMITTED if operation == 'commit' else RELEASED})
+
+import csv
+import io
+from rest_framework.parsers import JSONParser, MultiPartParser
+from .parsers import CSVParser
+from .sync import parse_rows, sync_pharmacy_stock, unknown_references
+
+class PharmacyStockSyncAPIView(views.APIView):
+    """
+    Replaces per-row PATCH/POST calls with one upsert of a pharmacy's inventory.
+    Body: JSON {"items": [...], "deactivate_missing": false}, a text/csv body, or a
+    multipart "file" upload. Each item/row has medicine_id, manufacturer_id, expiry_date,
+    price, stock_quantity and optionally is_available; rows are matched on
+    (medicine_id, manufacturer_id, expiry_date).
+    With deactivate_missing (also accepted as ?deactivate_missing=true), stock the feed
+    doesn't mention is marked out of stock.
+    """
+    parser_classes = [JSONParser, CSVParser, MultiPartParser]
+    MAX_ROWS = 20000
+
+    @idempotent('stock-sync')
+    def post(self, request, pharmacy_id):
+        pharmacy = Pharmacy.objects.filter(pk=pharmacy_id).first()
+        if pharmacy is None:
+            return Response({"error": "Pharmacy not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        data = request.data
+        deactivate_missing = request.query_params.get('deactivate_missing', '').lower() == 'true'
+        if 'file' in request.FILES:
+            try:
+                records = list(csv.DictReader(io.TextIOWrapper(request.FILES['file'], encoding='utf-8')))
+            except UnicodeDecodeError:
+                return Response({"error": "CSV file is not valid UTF-8 text"}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(data, list):
+            records = data
+        else:
+            records = data.get('items')
+            deactivate_missing = deactivate_missing or data.get('deactivate_missing') is True
+        if not isinstance(records, list) or not records:
+            return Response({"error": "No stock rows supplied"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(records) > self.MAX_ROWS:
+            return Response({"error": f"At most {self.MAX_ROWS} rows per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, errors = parse_rows(records)
+        if errors:
+            return Response({"error": "Invalid rows", "rows": errors[:100]}, status=status.HTTP_400_BAD_REQUEST)
+        unknown = unknown_references(rows)
+        if unknown['medicine_ids'] or unknown['manufacturer_ids']:
+            return Response({"error": "Unknown medicines or manufacturers", **unknown}, status=status.HTTP_400_BAD_REQUEST)
+
+        created, updated, deactivated = sync_pharmacy_stock(pharmacy, rows, deactivate_missing)
+        return Response({
+            "created": len(created),
+            "updated": len(updated),
+            "deactivated": len(deactivated),
+            "unchanged": len(rows) - len(created) - len(updated),
+        })
+
+from medicare_booking.pages import list_page_context
 
 def stock_list(request):
     query = request.GET.get('q')
+    # Each row shows its pharmacy and medicine, joined in the page query
+    stocks = Pharmacy_Medicine.objects.select_related('pharmacy', 'medicine').order_by('pk')
     if query:
-        stocks = Pharmacy_Medicine.objects.filter(
-            Q(medicine__medicine_name__icontains=query) |
+        stocks = stocks.filter(
+            medicine_search_q(query, prefix='medicine__') |
             Q(pharmacy__pharmacy_name__icontains=query)
         )
-    else:
-        stocks = Pharmacy_Medicine.objects.all()
-    return render(request, 'pharmacy_stock/stock_list.html', {'stocks': stocks, 'query': query})
+    return render(request, 'pharmacy_stock/stock_list.html', {
+        'query': query,
+        **list_page_context(request, stocks, Pharmacy_Medicine, Pharmacy, Medicine),
+    })
@@ -0,0 +1,90 @@
+import bisect
+import threading
+from hospitals.models import Hospital
+from medicare_booking.table_versions import TableSnapshot
+from medicines.models import Medicine
+from specializations.models import Specialization
+
+# Autocomplete type -> (model, name field)
+SOURCES = {
+    'medicines': (Medicine, 'medicine_name'),
+    'hospitals': (Hospital, 'hospital_name'),
+    'specializations': (Specialization, 'specialization_name'),
+}
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+def _keys(name):
+    """Every word start of the name, so 'Apollo Hospital' is found by 'apo' and 'hosp'."""
+    words = normalize(name).split(' ')
+    return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+class PrefixIndex(TableSnapshot):
+    """
+    In-memory sorted array of (key, pk) for one model's name field. A prefix lookup is a
+    binary search to the first key >= prefix followed by a scan of the matching run.
+    Each worker process builds its own copy; writes are applied to it in place once they
+    commit (see search.signals), and writes from other processes trigger a rebuild (see
+    TableSnapshot).
+    """
+
+    def __init__(self, model_class, field_name):
+        super().__init__(model_class)
+        self.model_class = model_class
+        self.field_name = field_name
+        self._entries = []      # sorted [(key, pk)]
+        self._names = {}        # pk -> name
+
+    def _load(self):
+        names = dict(self.model_class.objects.values_list('pk', self.field_name).iterator())
+        self._entries = sorted((key, pk) for pk, name in names.items() for key in _keys(name))
+        self._names = names
+
+    def update(self, pk, name):
+        """Replaces the keys of one row; a name of None removes it."""
+        with self._lock:
+            if not self._loaded:
+                return
+            old_name = self._names.pop(pk, None)
+            if old_name is not None:
+                for key in _keys(old_name):
+                    i = bisect.bisect_left(self._entries, (key, pk))
+                    if i < len(self._entries) and self._entries[i] == (key, pk):
+                        del self._entries[i]
+            if name is not None:
+                for key in _keys(name):
+                    bisect.insort(self._entries, (key, pk))
+                self._names[pk] = name
+
+    def matches(self, prefix, limit):
+        """Up to `limit` (pk, name) pairs with a word starting with `prefix`, in key order."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self._ensure_current()
+        results = []
+        seen = set()
+        with self._lock:
+            entries, names = self._entries, self._names
+            i = bisect.bisect_left(entries, (prefix,))
+            while i < len(entries) and len(results) < limit:
+                key, pk = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append((pk, names[pk]))
+                i += 1
+        return results
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def index_for(model_class):
+    """The process wide autocomplete index of one of the SOURCES models."""
+    with _indexes_lock:
+        if model_class not in _indexes:
+            field_name = next(field for model, field in SOURCES.values() if model is model_class)
+            _indexes[model_class] = PrefixIndex(model_class, field_name)
+        return _indexes[model_class]
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from hospitals.models import Hospital
+from medicare_booking.table_versions import bump_table_version
+from medicines.models import Medicine
+from specializations.models import Specialization
+from .autocomplete import index_for
+
+@receiver(post_save, sender=Hospital)
+@receiver(post_save, sender=Medicine)
+@receiver(post_save, sender=Specialization)
+def update_autocomplete_index(sender, instance, **kwargs):
+    # Applied at commit: until then other requests must not suggest the uncommitted name
+    pk, name = instance.pk, getattr(instance, index_for(sender).field_name)
+    transaction.on_commit(lambda: index_for(sender).update(pk, name))
+
+@receiver(post_delete, sender=Hospital)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_delete, sender=Specialization)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: index_for(sender).update(pk, None))
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_delete, sender=Specialization)
+def bump_specialization_table_version(sender, instance, **kwargs):
+    bump_table_version(sender)
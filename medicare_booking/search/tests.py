@@ -0,0 +1,100 @@
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from doctor_associations.models import Doctor_Hospital
+from doctors.models import Doctor
+from hospitals.models import Hospital
+from medicines.models import Medicine
+from specializations.models import Specialization
+from .autocomplete import SOURCES, index_for
+
+class UnifiedSearchValidationTests(TestCase):
+    url = '/api/v1/search/'
+
+    def test_bad_parameters_are_rejected(self):
+        client = APIClient()
+        for params in ({}, {'pincode': 'x'}, {'pincode': 600001, 'limit': 0}, {'pincode': 600001, 'specialization_id': 'cardio'}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get(self.url, params).status_code, 400)
+
+class AutocompleteTests(TestCase):
+    url = '/api/v1/autocomplete/'
+    names = ['Paracetamol 500', 'PARACETAMOL Syrup', 'Vitamin D3', 'Cough Syrup Plus', 'Pain Relief Plus', 'Zinc']
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in cls.names:
+            Medicine.objects.create(medicine_name=name, dosage_form='Tablet')
+
+    def setUp(self):
+        # The process-wide indexes may hold rows of other tests
+        for model_class, field_name in SOURCES.values():
+            index_for(model_class).clear()
+
+    def names_for(self, query, limit=10):
+        response = self.client.get(self.url, {'q': query, 'type': 'medicines', 'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['medicines']]
+
+    def test_matches_any_word_start_case_insensitively(self):
+        for query in ('para', 'PARACETAMOL', 'syr', 'vitamin d', 'd3', 'syrup p', '  cough   syrup ', 'tamol', 'nothing'):
+            with self.subTest(query=query):
+                words = ' '.join(query.casefold().split())
+                expected = {
+                    name for name in self.names
+                    if any(' '.join(name.casefold().split()[i:]).startswith(words) for i in range(len(name.split())))
+                }
+                self.assertEqual(set(self.names_for(query)), expected)
+
+    def test_each_row_is_suggested_once_up_to_the_limit(self):
+        # 'Pain Relief Plus' has two keys starting with 'p'
+        self.assertEqual(sorted(self.names_for('p')), ['Cough Syrup Plus', 'PARACETAMOL Syrup', 'Pain Relief Plus', 'Paracetamol 500'])
+        self.assertEqual(len(self.names_for('p', limit=2)), 2)
+        self.assertEqual(self.client.get(self.url, {'q': 'p', 'type': 'doctors'}).status_code, 400)
+
+    def test_saves_and_deletes_are_applied_at_commit(self):
+        self.assertEqual(self.names_for('zinc'), ['Zinc'])
+        medicine = Medicine.objects.get(medicine_name='Zinc')
+        with self.captureOnCommitCallbacks(execute=True):
+            medicine.medicine_name = 'Zinc Sulphate'
+            medicine.save()
+        self.assertEqual(self.names_for('sulph'), ['Zinc Sulphate'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Medicine.objects.create(medicine_name='Sulfur Ointment', dosage_form='Ointment')
+        self.assertEqual(sorted(self.names_for('sul')), ['Sulfur Ointment', 'Zinc Sulphate'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            medicine.delete()
+        self.assertEqual(self.names_for('zinc'), [])
+
+    def test_lookups_run_no_queries_once_loaded(self):
+        self.names_for('para')
+        with self.assertNumQueries(0):
+            self.names_for('vit')
+
+class UnifiedSearchTests(TransactionTestCase):
+    """The sections run on worker threads with their own connections, so the rows must be committed."""
+    url = '/api/v1/search/'
+
+    def setUp(self):
+        hospital = Hospital.objects.create(hospital_name='City Hospital', contact='1', working_hours='9-5', pincode=600001)
+        self.specializations = [Specialization.objects.create(specialization_name=name) for name in ('Cardiology', 'Dermatology')]
+        for i, specialization in enumerate(self.specializations):
+            Doctor_Hospital.objects.create(
+                doctor=Doctor.objects.create(doctor_name=f'Doctor {i}', experience=5),
+                hospital=hospital,
+                specialization=specialization,
+                fees='100',
+                working_hours='9-5',
+                is_accepted=True,
+            )
+
+    def test_specialization_narrows_the_doctors(self):
+        client = APIClient()
+        everyone = client.get(self.url, {'pincode': 600001})
+        self.assertEqual(everyone.status_code, 200)
+        self.assertEqual(len(everyone.data['doctors']), 2)
+        self.assertEqual(len(everyone.data['hospitals']['results']), 1)
+
+        cardiology = client.get(self.url, {'pincode': 600001, 'specialization_id': self.specializations[0].pk})
+        self.assertEqual([row['specialization'] for row in cardiology.data['doctors']], [self.specializations[0].pk])
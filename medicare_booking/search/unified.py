@@ -0,0 +1,73 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+from doctor_associations.models import Doctor_Hospital
+from doctor_associations.serializers import DoctorHospitalSerializer
+from hospitals.models import Hospital
+from hospitals.serializers import HospitalSerializer
+from medicare_booking.services import nearest_by_pincode, search_entities_by_pincode
+from medicines.search import medicine_search_q
+from pharmacies.models import Pharmacy
+from pharmacies.serializers import PharmacySerializer
+from pharmacy_stock.models import Pharmacy_Medicine
+from pharmacy_stock.serializers import SimplifiedPharmacyMedicineSerializer
+
+# Shared by all requests, so it bounds the extra database connections a worker process opens.
+# A request hands all but one of its sections to it and runs the last one itself.
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='unified-search')
+
+def _in_worker(lookup, *args):
+    # Like a request: a worker's connection is reused until it outlives CONN_MAX_AGE or errors
+    close_old_connections()
+    try:
+        return lookup(*args)
+    finally:
+        close_old_connections()
+
+def hospitals_section(pincode, limit):
+    hospitals, message = search_entities_by_pincode(Hospital, pincode, Pharmacy)
+    return {'results': HospitalSerializer(hospitals[:limit], many=True).data, 'message': message}
+
+def pharmacies_section(pincode, limit):
+    pharmacies, message = search_entities_by_pincode(Pharmacy, pincode, Hospital)
+    return {'results': PharmacySerializer(pharmacies[:limit], many=True).data, 'message': message}
+
+def doctors_section(pincode, specialization_id, limit):
+    associations = Doctor_Hospital.objects.filter(
+        is_accepted=True,
+        is_available=True,
+        hospital__pincode__isnull=False,
+    ).select_related('doctor', 'hospital', 'specialization')
+    if specialization_id is not None:
+        associations = associations.filter(specialization_id=specialization_id)
+    nearest = nearest_by_pincode(associations, pincode, limit, pincode_field='hospital__pincode')
+    return DoctorHospitalSerializer(nearest, many=True).data
+
+def stock_section(pincode, medicine_name, limit):
+    stock = Pharmacy_Medicine.objects.filter(
+        medicine_search_q(medicine_name, prefix='medicine__'),
+        is_available=True,
+        expiry_date__gte=datetime.date.today(),
+        stock_quantity__gt=0,
+    ).select_related('pharmacy', 'medicine', 'manufacturer')
+    nearest = nearest_by_pincode(stock, pincode, limit, pincode_field='pharmacy__pincode')
+    return SimplifiedPharmacyMedicineSerializer(nearest, many=True).data
+
+def unified_search(pincode, limit, medicine_name=None, specialization_id=None):
+    """
+    Hospitals, pharmacies, doctors and (with a medicine name) stock near a pincode, with the
+    lookups running concurrently so the request takes as long as the slowest one.
+    Every section holds at most `limit` results.
+    """
+    sections = {
+        'hospitals': (hospitals_section, pincode, limit),
+        'pharmacies': (pharmacies_section, pincode, limit),
+        'doctors': (doctors_section, pincode, specialization_id, limit),
+    }
+    if medicine_name:
+        sections['stock'] = (stock_section, pincode, medicine_name, limit)
+    *offloaded, (last_name, (last_lookup, *last_args)) = sections.items()
+    futures = {name: executor.submit(_in_worker, *section) for name, section in offloaded}
+    results = {last_name: last_lookup(*last_args)}
+    results.update((name, future.result()) for name, future in futures.items())
+    return {name: results[name] for name in sections}
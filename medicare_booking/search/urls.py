@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('search/', views.UnifiedSearchAPIView.as_view(), name='unified_search'),
+    path('autocomplete/', views.AutocompleteAPIView.as_view(), name='autocomplete'),
+]
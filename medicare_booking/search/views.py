@@ -0,0 +1,67 @@
+from rest_framework import views, status
+from rest_framework.response import Response
+from .autocomplete import SOURCES, index_for
+
+class AutocompleteAPIView(views.APIView):
+    """
+    Names starting with ?q=, per type, for search boxes.
+    ?type= limits the lookup to one of medicines, hospitals, specializations (default: all).
+    ?limit= caps the matches per type (default 10, at most 50).
+    """
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        types = request.query_params.getlist('type') or list(SOURCES)
+        unknown = [name for name in types if name not in SOURCES]
+        if unknown:
+            return Response({"error": f"Unknown type: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            name: [
+                {'id': pk, 'name': label}
+                for pk, label in index_for(SOURCES[name][0]).matches(query, limit)
+            ]
+            for name in types
+        })
+
+from .unified import unified_search
+
+class UnifiedSearchAPIView(views.APIView):
+    """
+    Everything the landing page shows for a pincode in one request: hospitals, pharmacies
+    and available doctors nearby, plus stock of ?medicine_name= if given.
+    ?specialization_id= narrows the doctors; ?limit= caps every section (default 10, at most 20).
+    """
+    default_limit = 10
+    max_limit = 20
+
+    def get(self, request):
+        try:
+            pincode = int(request.query_params.get('pincode', ''))
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "A numeric pincode is required, and limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+        specialization_id = request.query_params.get('specialization_id') or None
+        if specialization_id is not None:
+            try:
+                specialization_id = int(specialization_id)
+            except ValueError:
+                return Response({"error": "specialization_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = unified_search(
+            pincode,
+            limit,
+            medicine_name=(request.query_params.get('medicine_name') or '').strip() or None,
+            specialization_id=specialization_id,
+        )
+        return Response({'pincode': pincode, **results})
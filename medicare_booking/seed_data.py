@@ -8,6 +8,8 @@ from decimal import Decimal
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medicare_booking.settings')
 django.setup()
 
+from django.core.management import call_command
+
 from doctors.models import Doctor
 from hospitals.models import Hospital
 from patients.models import Patient
@@ -25,6 +27,10 @@ def seed():
     print("  MediCare Booking - Comprehensive Data Seeder")
     print("=" * 60)
 
+    # ─── 0. PINCODE CENTROIDS (for nearby search) ─────────────
+    call_command('load_pincode_centroids')
+    print()
+
     # ─── 1. SPECIALIZATIONS ───────────────────────────────────
     specialization_names = [
         "General Medicine",
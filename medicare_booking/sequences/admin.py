@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Sequence
+
+@admin.register(Sequence)
+class SequenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_value')
+    search_fields = ('name',)
@@ -0,0 +1,70 @@
+import threading
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from .models import Sequence
+
+# Per-process cache of reserved blocks: name -> [next_value, last_value_in_block]
+_blocks = {}
+_lock = threading.Lock()
+
+def reserve(name, count=1, seed=None):
+    """
+    Atomically reserves `count` consecutive values from the named counter.
+    :param name: The counter name (the ID prefix, e.g. 'HOS').
+    :param count: How many values to reserve.
+    :param seed: (Optional) Callable returning the starting value when the counter
+                 row does not exist yet, e.g. the highest ID already in the table.
+    :return: The first value of the reserved range.
+    """
+    with transaction.atomic():
+        # The UPDATE takes the row lock, so the read below sees our own increment.
+        updated = Sequence.objects.filter(name=name).update(last_value=F('last_value') + count)
+        if not updated:
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    Sequence.objects.create(name=name, last_value=start + count)
+                return start + 1
+            except IntegrityError:
+                # Another writer created the row first, fall back to incrementing it.
+                Sequence.objects.filter(name=name).update(last_value=F('last_value') + count)
+        last_value = Sequence.objects.filter(name=name).values_list('last_value', flat=True).get()
+    return last_value - count + 1
+
+def next_value(name, seed=None):
+    """
+    Returns the next value of the named counter.
+    With ID_SEQUENCE_BLOCK_SIZE > 1 each worker process reserves a block of values
+    and hands them out from memory, touching the database once per block.
+    """
+    block_size = getattr(settings, 'ID_SEQUENCE_BLOCK_SIZE', 1)
+    if block_size <= 1:
+        return reserve(name, 1, seed)
+
+    with _lock:
+        block = _blocks.get(name)
+        if block is None or block[0] > block[1]:
+            if connection.in_atomic_block:
+                # A block reserved here could be rolled back after being cached, letting
+                # another process hand out the same values, so reserve just one.
+                return reserve(name, 1, seed)
+            start = reserve(name, block_size, seed)
+            block = _blocks[name] = [start, start + block_size - 1]
+        value = block[0]
+        block[0] += 1
+    return value
+
+def advance_to(name, value):
+    """
+    Moves the named counter up to `value` (never down) and drops this process's reserved
+    block for it, e.g. after rows were inserted with explicit IDs ahead of the counter.
+    """
+    Sequence.objects.filter(name=name, last_value__lt=value).update(last_value=value)
+    with _lock:
+        _blocks.pop(name, None)
+
+def reset_blocks():
+    """Drops the reserved blocks held by this process (unused values are skipped)."""
+    with _lock:
+        _blocks.clear()
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=45, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
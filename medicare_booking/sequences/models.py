@@ -0,0 +1,9 @@
+from django.db import models
+
+class Sequence(models.Model):
+    # One row per ID prefix (e.g. 'HOS', 'PHME'); last_value is the highest number handed out.
+    name = models.CharField(max_length=45, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"